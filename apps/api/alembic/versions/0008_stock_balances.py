@@ -0,0 +1,46 @@
+"""Incrementally maintained stock balances."""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0008_stock_balances"
+down_revision = "0007_ai_documents"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_balances",
+        sa.Column("item_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("location_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("qty", sa.Numeric(14, 3), nullable=False, server_default=sa.text("0")),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["item_id"], ["items.id"]),
+        sa.ForeignKeyConstraint(["location_id"], ["store_locations.id"]),
+        sa.PrimaryKeyConstraint("item_id", "location_id"),
+    )
+    op.create_index("ix_stock_balance_location", "stock_balances", ["location_id"])
+
+    # Backfill from the existing ledger once; from here on posting keeps it current.
+    op.execute(
+        """
+        INSERT INTO stock_balances (item_id, location_id, qty, updated_at)
+        SELECT item_id, location_id, SUM(qty_delta), CURRENT_TIMESTAMP
+        FROM stock_movements
+        GROUP BY item_id, location_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_stock_balance_location", table_name="stock_balances")
+    op.drop_table("stock_balances")
@@ -0,0 +1,43 @@
+"""Period-end stock snapshots."""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0009_stock_snapshots"
+down_revision = "0008_stock_balances"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_snapshots",
+        sa.Column("period_end", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("item_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("location_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("qty", sa.Numeric(14, 3), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["item_id"], ["items.id"]),
+        sa.ForeignKeyConstraint(["location_id"], ["store_locations.id"]),
+        sa.PrimaryKeyConstraint("period_end", "item_id", "location_id"),
+    )
+    op.create_index(
+        "ix_stock_snapshot_item_location_period",
+        "stock_snapshots",
+        ["item_id", "location_id", "period_end"],
+    )
+    op.create_index("ix_stock_movement_created_at", "stock_movements", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_stock_movement_created_at", table_name="stock_movements")
+    op.drop_index("ix_stock_snapshot_item_location_period", table_name="stock_snapshots")
+    op.drop_table("stock_snapshots")
@@ -0,0 +1,176 @@
+"""Monthly range partitions for stock_movements.
+
+PostgreSQL requires every unique constraint on a partitioned table to include the partition
+key, so the idempotency key moves to ``stock_movement_refs`` and the ledger's primary key
+becomes (id, created_at). A DEFAULT partition catches rows for months that have not been
+pre-created; ``scripts.partition_stock_movements`` moves them out when it creates the month.
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0010_partition_stock_movements"
+down_revision = "0009_stock_snapshots"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_movement_refs",
+        sa.Column("ref_type", sa.String(length=64), nullable=False),
+        sa.Column("ref_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "movement_type",
+            postgresql.ENUM(
+                "SALE",
+                "SALE_RETURN",
+                "PURCHASE_RECEIPT",
+                "PURCHASE_RETURN",
+                name="movementtype",
+                create_type=False,
+            ),
+            nullable=False,
+        ),
+        sa.Column("item_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("movement_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("ref_type", "ref_id", "movement_type", "item_id"),
+    )
+
+    op.execute("ALTER TABLE stock_movements RENAME TO stock_movements_legacy")
+    op.execute("ALTER INDEX stock_movements_pkey RENAME TO stock_movements_legacy_pkey")
+    op.execute("ALTER INDEX ix_stock_movement_item RENAME TO ix_stock_movement_item_legacy")
+    op.execute("ALTER INDEX ix_stock_movement_location RENAME TO ix_stock_movement_location_legacy")
+    op.execute(
+        "ALTER INDEX ix_stock_movement_created_at RENAME TO ix_stock_movement_created_at_legacy"
+    )
+
+    op.execute(
+        """
+        CREATE TABLE stock_movements (
+            id UUID NOT NULL,
+            item_id UUID NOT NULL REFERENCES items (id),
+            location_id UUID NOT NULL REFERENCES store_locations (id),
+            ref_type VARCHAR(64) NOT NULL,
+            ref_id UUID NOT NULL,
+            movement_type movementtype NOT NULL,
+            qty_delta NUMERIC(14, 3) NOT NULL,
+            unit_cost NUMERIC(14, 2),
+            details JSONB,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("CREATE TABLE stock_movements_default PARTITION OF stock_movements DEFAULT")
+    # One partition per month from the oldest movement up to MONTHS_AHEAD months from now.
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month_start date := date_trunc(
+                'month', COALESCE((SELECT min(created_at) FROM stock_movements_legacy), now())
+            );
+            last_month date := date_trunc('month', now()) + interval '{MONTHS_AHEAD} months';
+        BEGIN
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF stock_movements FOR VALUES FROM (%L) TO (%L)',
+                    'stock_movements_p' || to_char(month_start, 'YYYYMM'),
+                    month_start,
+                    month_start + interval '1 month'
+                );
+                month_start := month_start + interval '1 month';
+            END LOOP;
+        END $$;
+        """
+    )
+
+    op.execute(
+        """
+        INSERT INTO stock_movements
+            (id, item_id, location_id, ref_type, ref_id, movement_type, qty_delta, unit_cost,
+             details, created_at)
+        SELECT id, item_id, location_id, ref_type, ref_id, movement_type, qty_delta, unit_cost,
+               details, created_at
+        FROM stock_movements_legacy
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO stock_movement_refs
+            (ref_type, ref_id, movement_type, item_id, movement_id, created_at)
+        SELECT ref_type, ref_id, movement_type, item_id, id, created_at
+        FROM stock_movements_legacy
+        """
+    )
+    op.execute("DROP TABLE stock_movements_legacy")
+
+    op.create_index("ix_stock_movement_item", "stock_movements", ["item_id"])
+    op.create_index("ix_stock_movement_location", "stock_movements", ["location_id"])
+    op.create_index("ix_stock_movement_created_at", "stock_movements", ["created_at"])
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE stock_movements RENAME TO stock_movements_partitioned")
+    op.execute("ALTER INDEX stock_movements_pkey RENAME TO stock_movements_partitioned_pkey")
+    op.execute("ALTER INDEX ix_stock_movement_item RENAME TO ix_stock_movement_item_partitioned")
+    op.execute(
+        "ALTER INDEX ix_stock_movement_location RENAME TO ix_stock_movement_location_partitioned"
+    )
+    op.execute(
+        "ALTER INDEX ix_stock_movement_created_at "
+        "RENAME TO ix_stock_movement_created_at_partitioned"
+    )
+    op.create_table(
+        "stock_movements",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("item_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("location_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("ref_type", sa.String(length=64), nullable=False),
+        sa.Column("ref_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "movement_type",
+            postgresql.ENUM(
+                "SALE",
+                "SALE_RETURN",
+                "PURCHASE_RECEIPT",
+                "PURCHASE_RETURN",
+                name="movementtype",
+                create_type=False,
+            ),
+            nullable=False,
+        ),
+        sa.Column("qty_delta", sa.Numeric(14, 3), nullable=False),
+        sa.Column("unit_cost", sa.Numeric(14, 2), nullable=True),
+        sa.Column("details", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["item_id"], ["items.id"]),
+        sa.ForeignKeyConstraint(["location_id"], ["store_locations.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "ref_type", "ref_id", "movement_type", "item_id", name="uq_stock_movement_idempotent"
+        ),
+    )
+    op.execute("INSERT INTO stock_movements SELECT * FROM stock_movements_partitioned")
+    op.execute("DROP TABLE stock_movements_partitioned CASCADE")
+    op.create_index("ix_stock_movement_item", "stock_movements", ["item_id"])
+    op.create_index("ix_stock_movement_location", "stock_movements", ["location_id"])
+    op.create_index("ix_stock_movement_created_at", "stock_movements", ["created_at"])
+    op.drop_table("stock_movement_refs")
@@ -0,0 +1,47 @@
+"""Inventory value on stock balances and FIFO cost layers.
+
+Existing balances start at zero value; run ``python -m scripts.rebuild_valuation`` once after
+upgrading to replay the ledger with the configured valuation method.
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0011_inventory_valuation"
+down_revision = "0010_partition_stock_movements"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "stock_balances",
+        sa.Column("value", sa.Numeric(16, 4), nullable=False, server_default=sa.text("0")),
+    )
+    op.create_table(
+        "cost_layers",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("item_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("location_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("movement_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("unit_cost", sa.Numeric(14, 4), nullable=False),
+        sa.Column("qty_remaining", sa.Numeric(14, 3), nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["item_id"], ["items.id"]),
+        sa.ForeignKeyConstraint(["location_id"], ["store_locations.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_cost_layer_item_location",
+        "cost_layers",
+        ["item_id", "location_id", "received_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cost_layer_item_location", table_name="cost_layers")
+    op.drop_table("cost_layers")
+    op.drop_column("stock_balances", "value")
@@ -0,0 +1,38 @@
+"""Composite and BRIN indexes for stock movement history.
+
+(item_id, location_id, created_at) serves per-item history pages and replaces the
+single-column item index it prefixes. The btree on created_at becomes a BRIN index: the
+ledger is append-only, so block ranges are naturally ordered and the index stays a few
+pages per partition.
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0012_stock_movement_history_indexes"
+down_revision = "0011_inventory_valuation"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_stock_movement_item_location_created",
+        "stock_movements",
+        ["item_id", "location_id", "created_at"],
+    )
+    op.create_index(
+        "ix_stock_movement_created_at_brin",
+        "stock_movements",
+        ["created_at"],
+        postgresql_using="brin",
+    )
+    op.drop_index("ix_stock_movement_created_at", table_name="stock_movements")
+    op.drop_index("ix_stock_movement_item", table_name="stock_movements")
+
+
+def downgrade() -> None:
+    op.create_index("ix_stock_movement_item", "stock_movements", ["item_id"])
+    op.create_index("ix_stock_movement_created_at", "stock_movements", ["created_at"])
+    op.drop_index("ix_stock_movement_created_at_brin", table_name="stock_movements")
+    op.drop_index("ix_stock_movement_item_location_created", table_name="stock_movements")
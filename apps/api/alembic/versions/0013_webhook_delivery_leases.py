@@ -0,0 +1,34 @@
+"""Lease columns for claiming webhook deliveries across workers."""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0013_webhook_delivery_leases"
+down_revision = "0012_stock_movement_history_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "webhook_deliveries",
+        sa.Column("locked_by", sa.String(length=128), nullable=True),
+    )
+    op.add_column(
+        "webhook_deliveries",
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_webhook_delivery_pending",
+        "webhook_deliveries",
+        ["created_at"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_delivery_pending", table_name="webhook_deliveries")
+    op.drop_column("webhook_deliveries", "locked_until")
+    op.drop_column("webhook_deliveries", "locked_by")
@@ -0,0 +1,27 @@
+"""Per-endpoint circuit breaker state for webhook delivery."""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0014_webhook_circuit_breaker"
+down_revision = "0013_webhook_delivery_leases"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "webhook_endpoints",
+        sa.Column("consecutive_failures", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "webhook_endpoints",
+        sa.Column("circuit_open_until", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("webhook_endpoints", "circuit_open_until")
+    op.drop_column("webhook_endpoints", "consecutive_failures")
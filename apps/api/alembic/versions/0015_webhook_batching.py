@@ -0,0 +1,27 @@
+"""Opt-in batched delivery for webhook endpoints."""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0015_webhook_batching"
+down_revision = "0014_webhook_circuit_breaker"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "webhook_endpoints",
+        sa.Column("batch_max_events", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.add_column(
+        "webhook_endpoints",
+        sa.Column("batch_max_wait_ms", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("webhook_endpoints", "batch_max_wait_ms")
+    op.drop_column("webhook_endpoints", "batch_max_events")
@@ -0,0 +1,89 @@
+"""Archive tables and status/updated_at indexes for retention."""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0017_retention_archive"
+down_revision = "0016_outbox_events"
+branch_labels = None
+depends_on = None
+
+
+def _common_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    ]
+
+
+def _archived_at() -> sa.Column:
+    return sa.Column(
+        "archived_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False
+    )
+
+
+def upgrade() -> None:
+    op.drop_index("ix_webhook_delivery_status", table_name="webhook_deliveries")
+    op.create_index(
+        "ix_webhook_delivery_status_updated", "webhook_deliveries", ["status", "updated_at"]
+    )
+    op.drop_index("ix_alert_status", table_name="alerts")
+    op.create_index("ix_alert_status_updated", "alerts", ["status", "updated_at"])
+
+    op.create_table(
+        "webhook_deliveries_archive",
+        *_common_columns(),
+        sa.Column("endpoint_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("event_type", sa.String(length=128), nullable=False),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="webhookdeliverystatus", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_retry_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("locked_by", sa.String(length=128), nullable=True),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        _archived_at(),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_webhook_deliveries_archive_archived_at", "webhook_deliveries_archive", ["archived_at"]
+    )
+    op.create_table(
+        "alerts_archive",
+        *_common_columns(),
+        sa.Column("type", postgresql.ENUM(name="alerttype", create_type=False), nullable=False),
+        sa.Column(
+            "severity", postgresql.ENUM(name="alertseverity", create_type=False), nullable=False
+        ),
+        sa.Column("location_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("item_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("context", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("status", postgresql.ENUM(name="alertstatus", create_type=False), nullable=False),
+        sa.Column("ack_by", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("ack_at", sa.DateTime(timezone=True), nullable=True),
+        _archived_at(),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_alerts_archive_archived_at", "alerts_archive", ["archived_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_alerts_archive_archived_at", table_name="alerts_archive")
+    op.drop_table("alerts_archive")
+    op.drop_index(
+        "ix_webhook_deliveries_archive_archived_at", table_name="webhook_deliveries_archive"
+    )
+    op.drop_table("webhook_deliveries_archive")
+    op.drop_index("ix_alert_status_updated", table_name="alerts")
+    op.create_index("ix_alert_status", "alerts", ["status"])
+    op.drop_index("ix_webhook_delivery_status_updated", table_name="webhook_deliveries")
+    op.create_index("ix_webhook_delivery_status", "webhook_deliveries", ["status"])
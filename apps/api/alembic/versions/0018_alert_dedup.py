@@ -0,0 +1,73 @@
+"""Alert de-duplication key and occurrence counting."""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0018_alert_dedup"
+down_revision = "0017_retention_archive"
+branch_labels = None
+depends_on = None
+
+
+def _columns() -> list[sa.Column]:
+    return [
+        sa.Column("dedup_key", sa.String(length=255), nullable=True),
+        sa.Column("occurrences", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column(
+            "last_seen_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    ]
+
+
+def upgrade() -> None:
+    for column in _columns():
+        op.add_column("alerts", column)
+    for column in _columns():
+        op.add_column("alerts_archive", column)
+
+    op.execute(
+        """
+        UPDATE alerts
+        SET dedup_key = type::text || ':' || coalesce(item_id::text, '')
+                        || ':' || coalesce(location_id::text, ''),
+            last_seen_at = created_at
+        """
+    )
+    # Collapse existing duplicates: the newest unresolved alert per key carries the count,
+    # the rest are resolved so the unique index can be built.
+    op.execute(
+        """
+        WITH ranked AS (
+            SELECT id,
+                   row_number() OVER (PARTITION BY dedup_key ORDER BY created_at DESC, id) AS rn,
+                   count(*) OVER (PARTITION BY dedup_key) AS n
+            FROM alerts
+            WHERE status <> 'DONE'
+        )
+        UPDATE alerts AS a
+        SET occurrences = CASE WHEN ranked.rn = 1 THEN ranked.n ELSE a.occurrences END,
+            status = CASE WHEN ranked.rn = 1 THEN a.status ELSE 'DONE' END
+        FROM ranked
+        WHERE a.id = ranked.id AND (ranked.n > 1)
+        """
+    )
+    op.create_index(
+        "uq_alert_open_dedup_key",
+        "alerts",
+        ["dedup_key"],
+        unique=True,
+        postgresql_where=sa.text("status <> 'DONE'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_alert_open_dedup_key", table_name="alerts")
+    for table in ("alerts_archive", "alerts"):
+        op.drop_column(table, "last_seen_at")
+        op.drop_column(table, "occurrences")
+        op.drop_column(table, "dedup_key")
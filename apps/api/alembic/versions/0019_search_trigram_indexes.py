@@ -0,0 +1,50 @@
+"""pg_trgm GIN indexes for substring search on items, customers and suppliers.
+
+``lower(col) LIKE '%term%'`` cannot use the existing btrees; trigram GIN indexes on the
+lowercased columns serve it (and ``similarity()`` ranking). Built CONCURRENTLY so the
+catalog stays writable while they build.
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0019_search_trigram_indexes"
+down_revision = "0018_alert_dedup"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_items_name_trgm", "items", "name"),
+    ("ix_items_item_code_trgm", "items", "item_code"),
+    ("ix_items_barcode_trgm", "items", "barcode"),
+    ("ix_customers_name_trgm", "customers", "name"),
+    ("ix_customers_customer_code_trgm", "customers", "customer_code"),
+    ("ix_customers_phone_trgm", "customers", "phone"),
+    ("ix_suppliers_name_trgm", "suppliers", "name"),
+    ("ix_suppliers_supplier_code_trgm", "suppliers", "supplier_code"),
+    ("ix_suppliers_phone_trgm", "suppliers", "phone"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(
+                name,
+                table,
+                [sa.text(f"lower({column}) gin_trgm_ops")],
+                postgresql_using="gin",
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table, postgresql_concurrently=True, if_exists=True
+            )
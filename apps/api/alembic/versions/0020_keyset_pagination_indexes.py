@@ -0,0 +1,34 @@
+"""Composite indexes for keyset pagination of list endpoints.
+
+Catalog lists page by (name, id) and alerts by (created_at, id), newest first. The name
+indexes gain the id tie-breaker so a cursor seeks straight to its position; alerts had no
+index on created_at at all.
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0020_keyset_pagination_indexes"
+down_revision = "0019_search_trigram_indexes"
+branch_labels = None
+depends_on = None
+
+_NAME_INDEXES = (
+    ("items", "ix_items_name"),
+    ("customers", "ix_customers_name"),
+    ("suppliers", "ix_suppliers_name"),
+)
+
+
+def upgrade() -> None:
+    for table, name in _NAME_INDEXES:
+        op.create_index(f"{name}_id", table, ["name", "id"])
+        op.drop_index(name, table_name=table)
+    op.create_index("ix_alert_created_id", "alerts", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_alert_created_id", table_name="alerts")
+    for table, name in _NAME_INDEXES:
+        op.create_index(name, table, ["name"])
+        op.drop_index(f"{name}_id", table_name=table)
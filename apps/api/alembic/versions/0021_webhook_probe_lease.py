@@ -0,0 +1,33 @@
+"""Half-open probe lease for webhook endpoints and a per-endpoint pending index.
+
+circuit_probe_until marks the single probe a half-open endpoint may have in flight. The
+(endpoint_id, created_at) partial index serves the per-endpoint top-N claim query.
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0021_webhook_probe_lease"
+down_revision = "0020_keyset_pagination_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "webhook_endpoints",
+        sa.Column("circuit_probe_until", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_webhook_delivery_endpoint_pending",
+        "webhook_deliveries",
+        ["endpoint_id", "created_at"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_delivery_endpoint_pending", table_name="webhook_deliveries")
+    op.drop_column("webhook_endpoints", "circuit_probe_until")
@@ -0,0 +1,26 @@
+"""Purchase-suggestion marker on reorder rules.
+
+suggested_at records when a rule's shortfall below max_level was announced, so the
+scheduled sweep emits purchase.suggested only when a rule falls below it again.
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0022_reorder_rule_suggested_at"
+down_revision = "0021_webhook_probe_lease"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "reorder_rules",
+        sa.Column("suggested_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("reorder_rules", "suggested_at")
@@ -0,0 +1,35 @@
+"""Record detached stock movement partitions and value the snapshot that replaces them."""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0023_stock_ledger_horizon"
+down_revision = "0022_reorder_rule_suggested_at"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("stock_snapshots", sa.Column("value", sa.Numeric(14, 4), nullable=True))
+    op.create_table(
+        "stock_movement_detached_partitions",
+        sa.Column("name", sa.String(length=128), nullable=False),
+        sa.Column("range_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("range_end", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("archive_schema", sa.String(length=128), nullable=True),
+        sa.Column("dropped", sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column(
+            "detached_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("stock_movement_detached_partitions")
+    op.drop_column("stock_snapshots", "value")
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """Process-local stand-in for Redis: tests, single-process dev, and Redis outages."""
+
+    def __init__(self) -> None:
+        self._data: dict[str, tuple[Optional[float], str]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    async def incr(self, key: str) -> int:
+        value = int(await self.get(key) or 0) + 1
+        self._data[key] = (None, str(value))
+        return value
+
+    async def aclose(self) -> None:
+        self._data.clear()
+
+
+class RedisBackend:
+    def __init__(self, url: str) -> None:
+        self._client = aioredis.from_url(
+            url, decode_responses=True, socket_connect_timeout=1, socket_timeout=1
+        )
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self._client.set(key, value, ex=ttl)
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class ReadThroughCache:
+    """Read-through cache for reference data, keyed per entity ("items", "locations", ...).
+
+    Every key embeds the entity's version counter (``<prefix>:<entity>:v<n>:<key>``), so
+    :meth:`invalidate` is a single INCR that orphans all cached values of that entity at once;
+    the orphans expire after the entity's TTL. Values are stored as JSON, so hits and misses
+    return the same plain structures. When Redis errors, the cache serves from process memory
+    for ``retry_seconds`` before trying Redis again; invalidations made in the meantime are
+    replayed on Redis once it answers, and the memory copy is dropped.
+    """
+
+    def __init__(
+        self,
+        backend,
+        ttls: dict[str, int],
+        prefix: str,
+        default_ttl: int = 300,
+        retry_seconds: float = 30,
+    ):
+        self.backend = backend
+        self.ttls = ttls
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.retry_seconds = retry_seconds
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.errors = 0
+        self._fallback = MemoryBackend()
+        self._retry_at = 0.0
+        # Version keys bumped only in memory while Redis was unavailable.
+        self._missed: set[str] = set()
+
+    async def _recover(self) -> None:
+        # Versions in memory and in Redis drifted apart during the outage: replay the missed
+        # invalidations on Redis, and forget what memory cached so the next outage does not
+        # serve values that Redis-side invalidations never reached.
+        for version_key in sorted(self._missed):
+            await self.backend.incr(version_key)
+        self._missed.clear()
+        self._fallback = MemoryBackend()
+        self._retry_at = 0.0
+
+    async def _call(self, op: str, *args):
+        if self._retry_at <= time.monotonic():
+            try:
+                if self._retry_at:
+                    await self._recover()
+                return await getattr(self.backend, op)(*args)
+            except (RedisError, OSError) as exc:
+                logger.warning("Cache backend unavailable, serving from memory: %s", exc)
+                self.errors += 1
+                self._retry_at = time.monotonic() + self.retry_seconds
+        if op == "incr":
+            self._missed.add(args[0])
+        return await getattr(self._fallback, op)(*args)
+
+    async def _key(self, entity: str, key: Any) -> str:
+        version = await self._call("get", f"{self.prefix}:{entity}:version") or 0
+        return f"{self.prefix}:{entity}:v{version}:{key}"
+
+    async def get_or_load(
+        self, entity: str, key: Any, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return the cached value for ``key``, or ``await loader()`` and cache its result.
+
+        ``None`` results are not cached, so a lookup of a missing row does not hide the row
+        once it is created.
+        """
+        cache_key = await self._key(entity, key)
+        cached = await self._call("get", cache_key)
+        if cached is not None:
+            self.hits[entity] += 1
+            return json.loads(cached)
+        self.misses[entity] += 1
+        value = jsonable_encoder(await loader())
+        if value is not None:
+            ttl = self.ttls.get(entity, self.default_ttl)
+            await self._call("set", cache_key, json.dumps(value, separators=(",", ":")), ttl)
+        return value
+
+    async def invalidate(self, *entities: str) -> None:
+        """Drop everything cached for ``entities``; call after committing a write to them."""
+        for entity in entities:
+            await self._call("incr", f"{self.prefix}:{entity}:version")
+
+    def stats(self) -> dict[str, Any]:
+        entities = sorted(set(self.hits) | set(self.misses))
+        return {
+            "backend": type(self.backend).__name__,
+            "errors": self.errors,
+            "entities": {
+                entity: {"hits": self.hits[entity], "misses": self.misses[entity]}
+                for entity in entities
+            },
+        }
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+
+
+def _backend():
+    if settings.cache_backend == "memory":
+        return MemoryBackend()
+    return RedisBackend(settings.redis_url)
+
+
+cache = ReadThroughCache(
+    _backend(),
+    ttls=settings.cache_ttl_seconds,
+    prefix=settings.cache_prefix,
+    retry_seconds=settings.cache_redis_retry_seconds,
+)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+
+
+@dataclass(frozen=True)
+class Validators:
+    """ETag and Last-Modified for one representation, derived from row timestamps."""
+
+    etag: str
+    last_modified: Optional[datetime]
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {"ETag": self.etag}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def dump(self) -> dict[str, Optional[str]]:
+        last_modified = self.last_modified and self.last_modified.isoformat()
+        return {"etag": self.etag, "last_modified": last_modified}
+
+    @classmethod
+    def restore(cls, data: dict[str, Optional[str]]) -> Validators:
+        last_modified = data["last_modified"]
+        return cls(data["etag"], last_modified and datetime.fromisoformat(last_modified))
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored as UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+
+def validators_for(*parts: Any, last_modified: Optional[datetime]) -> Validators:
+    """Build validators from ``parts`` (resource name, id, version...) and a timestamp.
+
+    The ETag is weak: it names a version of the underlying rows, not the exact bytes.
+    """
+    if last_modified is not None:
+        last_modified = _utc(last_modified)
+    key = "|".join(str(part) for part in (*parts, last_modified and last_modified.isoformat()))
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+    # Last-Modified has one-second resolution.
+    return Validators(f'W/"{digest}"', last_modified and last_modified.replace(microsecond=0))
+
+
+async def collection_validators(session: AsyncSession, model, name: str) -> Validators:
+    """Validators for a whole table from its row count and newest ``updated_at``.
+
+    The count catches deletes, which leave no timestamp behind.
+    """
+    count, newest = (
+        await session.execute(select(func.count(), func.max(model.updated_at)))
+    ).one()
+    return validators_for(name, count, last_modified=newest)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): ignore W/ prefixes on either side.
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(request: Request, validators: Validators) -> Optional[Response]:
+    """Return a 304 response when the request's conditional headers match ``validators``.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted without it.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        matched = _etag_matches(if_none_match, validators.etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or validators.last_modified is None:
+            return None
+        try:
+            since = _utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return None
+        matched = validators.last_modified <= since
+    if not matched:
+        return None
+    return Response(status_code=304, headers=validators.headers)
+
+
+async def cached_representation(
+    request: Request,
+    response: Response,
+    entity: str,
+    key: Any,
+    load: Callable[[], Awaitable[Optional[tuple[Validators, Any]]]],
+) -> Any:
+    """Answer a GET from the read-through cache, validators included.
+
+    ``load`` returns ``(validators, body)``, or None when the resource does not exist. Both
+    are cached together under ``entity``, so a hit answers with a 304 or the full body
+    without touching the database; freshness rests on the entity's invalidation and TTL.
+    Returns None for a missing resource, a 304 response, or the body (with the validator
+    headers set on ``response``).
+    """
+
+    async def load_entry() -> Optional[dict[str, Any]]:
+        loaded = await load()
+        if loaded is None:
+            return None
+        validators, body = loaded
+        return {"validators": validators.dump(), "body": body}
+
+    entry = await cache.get_or_load(entity, key, load_entry)
+    if entry is None:
+        return None
+    validators = Validators.restore(entry["validators"])
+    if unchanged := not_modified(request, validators):
+        return unchanged
+    response.headers.update(validators.headers)
+    return entry["body"]
@@ -1,5 +1,7 @@
 from collections.abc import AsyncGenerator
 
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
@@ -26,3 +28,28 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+def dialect_name(session: AsyncSession) -> str:
+    """Return the SQL dialect name the session is bound to (e.g. ``postgresql``)."""
+    return session.get_bind().dialect.name
+
+
+def upsert_insert(session: AsyncSession):
+    """Return the dialect-specific ``insert`` construct that supports ON CONFLICT clauses.
+
+    Production runs on PostgreSQL; the test-suite runs on SQLite, which exposes the same
+    ``on_conflict_do_nothing``/``on_conflict_do_update`` API.
+    """
+    if dialect_name(session) == "sqlite":
+        return sqlite.insert
+    return postgresql.insert
+
+
+async def insert_many(
+    session: AsyncSession, model, rows: list[dict], chunk_size: int = 500
+) -> None:
+    """Insert ``rows`` as multi-row ``INSERT ... VALUES`` statements of ``chunk_size`` rows.
+
+    Every row must carry the same keys; column defaults such as generated ids still apply.
+    """
+    for start in range(0, len(rows), chunk_size):
+        await session.execute(insert(model).values(rows[start : start + chunk_size]))
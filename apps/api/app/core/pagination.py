@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import Select, and_, func, or_, select, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.db import dialect_name
+
+# A keyset sort key: the expression and whether it sorts descending. The last key must be
+# unique (usually the primary key) so every row has a distinct position.
+SortKey = tuple[ColumnElement, bool]
+
+
+class TotalMode(str, Enum):
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort-key values of the last row on a page into a URL-safe token."""
+    payload = json.dumps([_plain(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    """Decode a token from :func:`encode_cursor`; raises ``ValueError`` if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _coerce(expr: ColumnElement, value: Any) -> Any:
+    try:
+        python_type = expr.type.python_type
+    except NotImplementedError:
+        return value
+    if value is None or isinstance(value, python_type):
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    return python_type(value)
+
+
+def _after(keys: Sequence[SortKey], values: Sequence[Any]) -> ColumnElement:
+    exprs = [expr for expr, _ in keys]
+    directions = {descending for _, descending in keys}
+    if len(directions) == 1:
+        # One direction: a row comparison, which PostgreSQL can serve from a composite index.
+        if directions.pop():
+            return tuple_(*exprs) < tuple_(*values)
+        return tuple_(*exprs) > tuple_(*values)
+    clauses = []
+    for n, (expr, descending) in enumerate(keys):
+        ties = [e == v for e, v in zip(exprs[:n], values[:n], strict=True)]
+        clauses.append(and_(*ties, expr < values[n] if descending else expr > values[n]))
+    return or_(*clauses)
+
+
+async def keyset_page(
+    session: AsyncSession,
+    stmt: Select,
+    keys: Sequence[SortKey],
+    cursor: Optional[str],
+    limit: int,
+) -> tuple[Sequence[Row], Optional[str]]:
+    """Run ``stmt`` ordered by ``keys`` and return ``(rows, next_cursor)`` for one page.
+
+    ``cursor`` is the ``next_cursor`` of the previous page; rows start strictly after it, so
+    deep pages cost the same as the first instead of scanning past an OFFSET. The key values
+    are appended to each row as extra trailing columns. Raises ``ValueError`` for a cursor
+    that does not fit ``keys``.
+    """
+    if cursor:
+        try:
+            raw = decode_cursor(cursor, len(keys))
+            values = [_coerce(expr, value) for (expr, _), value in zip(keys, raw, strict=True)]
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
+        stmt = stmt.where(_after(keys, values))
+    stmt = stmt.add_columns(*(expr.label(f"_key{n}") for n, (expr, _) in enumerate(keys)))
+    stmt = stmt.order_by(*(expr.desc() if descending else expr.asc() for expr, descending in keys))
+    rows = (await session.execute(stmt.limit(limit + 1))).all()
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1][-len(keys):]) if page and len(rows) > limit else None
+    return page, next_cursor
+
+
+async def count_total(session: AsyncSession, stmt: Select, mode: TotalMode) -> Optional[int]:
+    """Row count of ``stmt`` for a list response, or None when ``mode`` is ``none``.
+
+    ``estimate`` asks the PostgreSQL planner (``EXPLAIN``) instead of counting, which is
+    instant but only as fresh as the last ANALYZE; other databases count exactly.
+    """
+    if mode is TotalMode.NONE:
+        return None
+    stmt = stmt.order_by(None).limit(None).offset(None)
+    if mode is TotalMode.ESTIMATE and dialect_name(session) == "postgresql":
+        compiled = stmt.compile(
+            dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True}
+        )
+        conn = await session.connection()
+        plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return await session.scalar(select(func.count()).select_from(stmt.subquery())) or 0
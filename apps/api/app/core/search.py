@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.db import dialect_name
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def text_search(
+    session: AsyncSession, columns: Sequence[Any], term: str
+) -> tuple[ColumnElement, Optional[ColumnElement]]:
+    """Return ``(filter, rank)`` for a case-insensitive substring search over ``columns``.
+
+    The filter is ``lower(col) LIKE '%term%'`` per column, which the ``*_trgm`` GIN indexes
+    serve on PostgreSQL (terms of three characters or more). There ``rank`` is the best
+    trigram similarity across the columns, for ordering closest matches first; on other
+    databases (SQLite in tests) it is None and callers keep their default order.
+    """
+    needle = term.strip().lower()
+    pattern = f"%{_escape_like(needle)}%"
+    lowered = [func.lower(column) for column in columns]
+    condition = or_(*(value.like(pattern, escape="\\") for value in lowered))
+    if dialect_name(session) != "postgresql":
+        return condition, None
+    # similarity() is NULL for NULL columns; greatest() skips those.
+    rank = func.greatest(*(func.similarity(value, needle) for value in lowered))
+    return condition, rank
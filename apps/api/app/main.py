@@ -1,16 +1,21 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.cache import cache
 from app.core.config import settings
 from app.core.errors import add_exception_handlers
 from app.core.logging import setup_logging
+from app.core.security import require_roles
 from app.routers import auth as auth_router
 from app.routers import integrations as integrations_router
 from app.routers import reorder as reorder_router
 from app.routers import alerts as alerts_router
 from app.routers import catalog as catalog_router
-from app.services.webhook_service import webhook_worker
+from app.services.reorder_evaluator import reorder_evaluator
+from app.services.typeahead_service import item_typeahead
+from app.services.webhook_service import webhook_dispatcher, webhook_worker
 from app.core.db import async_session
+from app.models.entities import StaffRole
 import asyncio
 
 
@@ -50,6 +55,14 @@ def create_app() -> FastAPI:
     async def health() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get(
+        "/health/cache",
+        summary="Read-through cache hit/miss counters",
+        dependencies=[Depends(require_roles([StaffRole.MANAGER, StaffRole.ADMIN]))],
+    )
+    async def cache_stats() -> dict:
+        return cache.stats()
+
     @app.get("/version", summary="API version")
     async def version() -> dict[str, str]:
         return {"version": settings.version}
@@ -58,6 +71,31 @@ def create_app() -> FastAPI:
     async def start_webhook_worker():
         asyncio.create_task(webhook_worker(async_session))
 
+    @app.on_event("startup")
+    async def start_reorder_evaluator():
+        if settings.reorder_eval_mode == "async":
+            reorder_evaluator.start(async_session)
+
+    @app.on_event("startup")
+    async def start_item_typeahead():
+        item_typeahead.start(async_session)
+
+    @app.on_event("shutdown")
+    async def stop_item_typeahead():
+        await item_typeahead.stop()
+
+    @app.on_event("shutdown")
+    async def stop_reorder_evaluator():
+        await reorder_evaluator.stop()
+
+    @app.on_event("shutdown")
+    async def close_webhook_client():
+        await webhook_dispatcher.aclose()
+
+    @app.on_event("shutdown")
+    async def close_cache():
+        await cache.aclose()
+
     return app
 
 
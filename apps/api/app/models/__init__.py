@@ -2,19 +2,28 @@
 
 from app.core.db import Base
 from app.models.entities import (
+    CostLayer,
     Customer,
     CustomerSourceFields,
+    DetachedStockPartition,
     Item,
     ItemCategory,
     ItemSourceFields,
     GoodsReceipt,
     GoodsReceiptLine,
+    GoodsReceiptStatus,
+    MovementType,
+    OutboxEvent,
     PriceBook,
     PurchaseOrder,
+    ReorderRule,
     SalesInvoice,
     SalesInvoiceLine,
     StoreLocation,
     StockMovement,
+    StockMovementRef,
+    StockBalance,
+    StockSnapshot,
     StaffUser,
     ApiKey,
     Alert,
@@ -36,9 +45,18 @@ __all__ = [
     "SalesInvoiceLine",
     "Payment",
     "PurchaseOrder",
+    "ReorderRule",
     "GoodsReceipt",
     "GoodsReceiptLine",
+    "GoodsReceiptStatus",
+    "MovementType",
+    "OutboxEvent",
     "StockMovement",
+    "StockMovementRef",
+    "StockBalance",
+    "CostLayer",
+    "StockSnapshot",
+    "DetachedStockPartition",
     "StaffUser",
     "ApiKey",
     "Alert",
@@ -8,6 +8,7 @@ from typing import Optional
 from sqlalchemy import (
     Boolean,
     CheckConstraint,
+    Column,
     DateTime,
     Enum as SAEnum,
     ForeignKey,
@@ -15,9 +16,11 @@ from sqlalchemy import (
     Integer,
     Numeric,
     String,
+    Table,
     Text,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -164,7 +167,7 @@ class Item(UUIDMixin, TimestampMixin, Base):
     __table_args__ = (
         UniqueConstraint("item_code", name="uq_items_item_code"),
         UniqueConstraint("tenant_id", "sku", name="uq_items_sku_per_tenant"),
-        Index("ix_items_name", "name"),
+        Index("ix_items_name_id", "name", "id"),
         Index("ix_items_barcode", "barcode"),
     )
 
@@ -196,7 +199,7 @@ class Customer(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "customers"
     __table_args__ = (
         UniqueConstraint("customer_code", name="uq_customers_code"),
-        Index("ix_customers_name", "name"),
+        Index("ix_customers_name_id", "name", "id"),
         Index("ix_customers_phone", "phone"),
     )
 
@@ -224,7 +227,7 @@ class Supplier(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "suppliers"
     __table_args__ = (
         UniqueConstraint("supplier_code", name="uq_suppliers_code"),
-        Index("ix_suppliers_name", "name"),
+        Index("ix_suppliers_name_id", "name", "id"),
     )
 
     tenant_id: Mapped[uuid.UUID | None] = mapped_column(
@@ -245,6 +248,29 @@ class Supplier(UUIDMixin, TimestampMixin, Base):
     goods_receipts: Mapped[list["GoodsReceipt"]] = relationship("GoodsReceipt", back_populates="supplier")
 
 
+def _trigram_index(name: str, column) -> Index:
+    """GIN trigram index on ``lower(column)`` serving ``LIKE '%term%'`` search on PostgreSQL."""
+    label = f"{column.name}_lower"
+    return Index(
+        name,
+        func.lower(column).label(label),
+        postgresql_using="gin",
+        postgresql_ops={label: "gin_trgm_ops"},
+    )
+
+
+# Substring search indexes (see app.core.search); require the pg_trgm extension.
+_trigram_index("ix_items_name_trgm", Item.__table__.c.name)
+_trigram_index("ix_items_item_code_trgm", Item.__table__.c.item_code)
+_trigram_index("ix_items_barcode_trgm", Item.__table__.c.barcode)
+_trigram_index("ix_customers_name_trgm", Customer.__table__.c.name)
+_trigram_index("ix_customers_customer_code_trgm", Customer.__table__.c.customer_code)
+_trigram_index("ix_customers_phone_trgm", Customer.__table__.c.phone)
+_trigram_index("ix_suppliers_name_trgm", Supplier.__table__.c.name)
+_trigram_index("ix_suppliers_supplier_code_trgm", Supplier.__table__.c.supplier_code)
+_trigram_index("ix_suppliers_phone_trgm", Supplier.__table__.c.phone)
+
+
 class PriceBook(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "price_books"
 
@@ -456,13 +482,16 @@ class GoodsReceiptLine(UUIDMixin, TimestampMixin, Base):
 
 
 class StockMovement(UUIDMixin, Base):
+    # PostgreSQL range-partitions this table by month on created_at (migration 0010), so the
+    # database key is (id, created_at) and the idempotency key lives in stock_movement_refs.
+    # History reads use the (item, location, created_at) index; date-range scans over the
+    # append-only ledger use a BRIN index, which stays tiny because created_at follows
+    # insertion order.
     __tablename__ = "stock_movements"
     __table_args__ = (
-        UniqueConstraint(
-            "ref_type", "ref_id", "movement_type", "item_id", name="uq_stock_movement_idempotent"
-        ),
-        Index("ix_stock_movement_item", "item_id"),
+        Index("ix_stock_movement_item_location_created", "item_id", "location_id", "created_at"),
         Index("ix_stock_movement_location", "location_id"),
+        Index("ix_stock_movement_created_at_brin", "created_at", postgresql_using="brin"),
     )
 
     item_id: Mapped[uuid.UUID] = mapped_column(
@@ -485,6 +514,111 @@ class StockMovement(UUIDMixin, Base):
     location: Mapped[StoreLocation] = relationship("StoreLocation")
 
 
+class StockMovementRef(Base):
+    """Idempotency key for posted movements, kept outside the partitioned ledger."""
+
+    __tablename__ = "stock_movement_refs"
+
+    ref_type: Mapped[str] = mapped_column(String(64), primary_key=True)
+    ref_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    movement_type: Mapped[MovementType] = mapped_column(SAEnum(MovementType), primary_key=True)
+    item_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    movement_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class StockBalance(Base):
+    """Running on-hand quantity and inventory value per item/location.
+
+    Both are maintained alongside the movement ledger; ``value`` follows the configured
+    valuation method (see ``app.services.valuation_service``).
+    """
+
+    __tablename__ = "stock_balances"
+    __table_args__ = (Index("ix_stock_balance_location", "location_id"),)
+
+    item_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("items.id"), primary_key=True
+    )
+    location_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("store_locations.id"), primary_key=True
+    )
+    qty: Mapped[Numeric] = mapped_column(Numeric(14, 3), default=0, nullable=False)
+    value: Mapped[Numeric] = mapped_column(Numeric(16, 4), default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+    item: Mapped[Item] = relationship("Item")
+    location: Mapped[StoreLocation] = relationship("StoreLocation")
+
+
+class CostLayer(UUIDMixin, Base):
+    """Open FIFO receipt layer; consumed oldest-first by outbound movements."""
+
+    __tablename__ = "cost_layers"
+    __table_args__ = (
+        Index("ix_cost_layer_item_location", "item_id", "location_id", "received_at"),
+    )
+
+    item_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("items.id"), nullable=False
+    )
+    location_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("store_locations.id"), nullable=False
+    )
+    movement_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    unit_cost: Mapped[Numeric] = mapped_column(Numeric(14, 4), nullable=False)
+    qty_remaining: Mapped[Numeric] = mapped_column(Numeric(14, 3), nullable=False)
+    received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class StockSnapshot(Base):
+    """Closing on-hand quantity per item/location at a period boundary (exclusive)."""
+
+    __tablename__ = "stock_snapshots"
+    __table_args__ = (
+        Index("ix_stock_snapshot_item_location_period", "item_id", "location_id", "period_end"),
+    )
+
+    period_end: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    item_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("items.id"), primary_key=True
+    )
+    location_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("store_locations.id"), primary_key=True
+    )
+    qty: Mapped[Numeric] = mapped_column(Numeric(14, 3), nullable=False)
+    # Inventory value at the boundary; filled in for the snapshot that opens the retained
+    # ledger so valuation can be rebuilt once older movement partitions are detached.
+    value: Mapped[Numeric | None] = mapped_column(Numeric(14, 4), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class DetachedStockPartition(Base):
+    """Monthly ``stock_movements`` partition that was detached (archived or dropped).
+
+    The latest ``range_end`` marks where the retained ledger begins; history before the
+    first snapshot at or after it can no longer be reconstructed from movements.
+    """
+
+    __tablename__ = "stock_movement_detached_partitions"
+
+    name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    range_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    range_end: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Schema the table was moved to; NULL when it was dropped or left in place.
+    archive_schema: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    dropped: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    detached_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
 class StaffUser(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "staff_users"
     __table_args__ = (UniqueConstraint("email", name="uq_staff_email"),)
@@ -529,6 +663,9 @@ class ReorderRule(UUIDMixin, TimestampMixin, Base):
     )
     lead_time_days: Mapped[int] = mapped_column(Integer, nullable=True)
     active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # When the current shortfall below max_level was first announced (purchase.suggested);
+    # cleared once stock is back at max_level, so the sweep only announces new shortfalls.
+    suggested_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     item: Mapped[Item] = relationship("Item")
     location: Mapped[StoreLocation] = relationship("StoreLocation")
@@ -544,13 +681,36 @@ class WebhookEndpoint(UUIDMixin, TimestampMixin, Base):
     secret: Mapped[str] = mapped_column(String(255), nullable=False)
     events: Mapped[list[str]] = mapped_column(JSONB, nullable=False)
     active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # Circuit breaker: open (skipped) until circuit_open_until, then half-open (one probe).
+    # circuit_probe_until is the lease of the probe in flight while half-open.
+    consecutive_failures: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    circuit_open_until: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    circuit_probe_until: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Opt-in batching: up to batch_max_events deliveries per POST, held at most batch_max_wait_ms.
+    batch_max_events: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    batch_max_wait_ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
 
 class WebhookDelivery(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "webhook_deliveries"
     __table_args__ = (
-        Index("ix_webhook_delivery_status", "status"),
+        Index("ix_webhook_delivery_status_updated", "status", "updated_at"),
         Index("ix_webhook_delivery_next_retry", "next_retry_at"),
+        Index(
+            "ix_webhook_delivery_pending",
+            "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+        Index(
+            "ix_webhook_delivery_endpoint_pending",
+            "endpoint_id",
+            "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
     )
 
     endpoint_id: Mapped[uuid.UUID] = mapped_column(
@@ -564,16 +724,38 @@ class WebhookDelivery(UUIDMixin, TimestampMixin, Base):
     attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     next_retry_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     last_error: Mapped[str | None] = mapped_column(Text(), nullable=True)
+    # Lease taken by the worker currently sending this delivery; expired leases are reclaimed.
+    locked_by: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     endpoint: Mapped[WebhookEndpoint] = relationship("WebhookEndpoint")
 
 
+class OutboxEvent(UUIDMixin, TimestampMixin, Base):
+    """Domain event written in the producing transaction and drained by a relay."""
+
+    __tablename__ = "outbox_events"
+    __table_args__ = (Index("ix_outbox_event_topic_created", "topic", "created_at"),)
+
+    topic: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+
+
 class Alert(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "alerts"
     __table_args__ = (
-        Index("ix_alert_status", "status"),
+        Index("ix_alert_status_updated", "status", "updated_at"),
+        Index("ix_alert_created_id", "created_at", "id"),
         Index("ix_alert_type", "type"),
         Index("ix_alert_location", "location_id"),
+        # At most one unresolved alert per (type, item, location); repeats bump occurrences.
+        Index(
+            "uq_alert_open_dedup_key",
+            "dedup_key",
+            unique=True,
+            postgresql_where=text("status <> 'DONE'"),
+            sqlite_where=text("status <> 'DONE'"),
+        ),
     )
 
     type: Mapped[AlertType] = mapped_column(SAEnum(AlertType), nullable=False)
@@ -591,6 +773,30 @@ class Alert(UUIDMixin, TimestampMixin, Base):
     )
     ack_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
     ack_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    dedup_key: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    occurrences: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    last_seen_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+def _archive_table(source: Table) -> Table:
+    """Same columns as ``source`` (no indexes or foreign keys) plus ``archived_at``."""
+    return Table(
+        f"{source.name}_archive",
+        Base.metadata,
+        *(
+            Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+            for c in source.columns
+        ),
+        Column("archived_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Index(f"ix_{source.name}_archive_archived_at", "archived_at"),
+    )
+
+
+# Rows moved out of the live tables by the retention job (see retention_service).
+webhook_deliveries_archive = _archive_table(WebhookDelivery.__table__)
+alerts_archive = _archive_table(Alert.__table__)
 
 
 class AiDocument(UUIDMixin, TimestampMixin, Base):
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from collections.abc import Sequence
-from typing import Any, Generic, Type, TypeVar
+from typing import Any, Generic, Optional, Type, TypeVar
 
-from sqlalchemy import select
+from sqlalchemy import inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cache
 from app.core.db import Base
+from app.core.pagination import SortKey, keyset_page
 
 ModelType = TypeVar("ModelType", bound=Base)
 
@@ -15,6 +17,8 @@ class BaseRepository(Generic[ModelType]):
     """Lightweight async CRUD helper."""
 
     model: Type[ModelType]
+    # Cache entity (see app.core.cache) invalidated after create/update, if the model is cached.
+    cache_entity: Optional[str] = None
 
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -28,10 +32,25 @@ class BaseRepository(Generic[ModelType]):
         )
         return result.scalars().all()
 
+    def sort_keys(self) -> list[SortKey]:
+        """Keyset order for :meth:`list_page`; the primary key unless a subclass overrides it."""
+        return [(column, False) for column in inspect(self.model).primary_key]
+
+    async def list_page(
+        self, cursor: Optional[str] = None, limit: int = 100
+    ) -> tuple[Sequence[ModelType], Optional[str]]:
+        """Return one page after ``cursor`` plus the cursor of the next page (None at the end)."""
+        rows, next_cursor = await keyset_page(
+            self.session, select(self.model), self.sort_keys(), cursor, limit
+        )
+        return [row[0] for row in rows], next_cursor
+
     async def create(self, obj_in: dict[str, Any]) -> ModelType:
         obj = self.model(**obj_in)
         self.session.add(obj)
         await self.session.commit()
+        if self.cache_entity:
+            await cache.invalidate(self.cache_entity)
         await self.session.refresh(obj)
         return obj
 
@@ -40,6 +59,8 @@ class BaseRepository(Generic[ModelType]):
             setattr(obj, field, value)
         self.session.add(obj)
         await self.session.commit()
+        if self.cache_entity:
+            await cache.invalidate(self.cache_entity)
         await self.session.refresh(obj)
         return obj
 
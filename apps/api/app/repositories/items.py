@@ -6,5 +6,4 @@ from app.repositories.base import BaseRepository
 
 class ItemRepository(BaseRepository[Item]):
     model = Item
-
-
+    cache_entity = "items"
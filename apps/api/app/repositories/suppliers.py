@@ -6,5 +6,4 @@ from app.repositories.base import BaseRepository
 
 class SupplierRepository(BaseRepository[Supplier]):
     model = Supplier
-
-
+    cache_entity = "suppliers"
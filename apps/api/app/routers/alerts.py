@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import and_, select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db import get_session
+from app.core.pagination import SortKey, TotalMode, count_total, keyset_page
 from app.core.security import require_roles, get_current_user
 from app.models.entities import Alert, AlertSeverity, AlertStatus, AlertType, StaffRole
 from app.schemas.alerts import AlertListResponse, AlertResponse
@@ -23,6 +24,8 @@ async def list_alerts(
     location_id: str | None = None,
     limit: int = Query(50, le=200),
     offset: int = 0,
+    cursor: str | None = None,
+    total: TotalMode = TotalMode.EXACT,
     session: AsyncSession = Depends(get_session),
 ):
     conditions = []
@@ -35,22 +38,20 @@ async def list_alerts(
     if location_id:
         conditions.append(Alert.location_id == location_id)
 
-    where_clause = and_(*conditions) if conditions else None
-
-    total = (
-        await session.execute(
-            select(func.count()).select_from(Alert).where(where_clause) if where_clause else select(func.count()).select_from(Alert)
-        )
-    ).scalar_one()
-
-    query = select(Alert)
-    if where_clause is not None:
-        query = query.where(where_clause)
-    query = query.order_by(Alert.created_at.desc()).offset(offset).limit(limit)
-    alerts = (await session.execute(query)).scalars().all()
+    query = select(Alert).where(*conditions)
+    count = await count_total(session, query, total)
+    keys: list[SortKey] = [(Alert.created_at, True), (Alert.id, True)]
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="offset cannot be combined with cursor")
+    try:
+        rows, next_cursor = await keyset_page(session, query.offset(offset), keys, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+    alerts = [row[0] for row in rows]
 
     return AlertListResponse(
-        total=total,
+        total=count,
+        next_cursor=next_cursor,
         items=[
             AlertResponse(
                 id=str(a.id),
@@ -64,6 +65,8 @@ async def list_alerts(
                 created_at=a.created_at,
                 ack_by=str(a.ack_by) if a.ack_by else None,
                 ack_at=a.ack_at,
+                occurrences=a.occurrences,
+                last_seen_at=a.last_seen_at,
             )
             for a in alerts
         ],
@@ -75,7 +78,7 @@ async def ack(alert_id: str, session: AsyncSession = Depends(get_session), curre
     try:
         alert = await ack_alert(session, alert_id, user_id=str(current_user.id))
     except ValueError:
-        raise HTTPException(status_code=404, detail="Not found")
+        raise HTTPException(status_code=404, detail="Not found") from None
     return AlertResponse(
         id=str(alert.id),
         type=alert.type,
@@ -88,6 +91,8 @@ async def ack(alert_id: str, session: AsyncSession = Depends(get_session), curre
         created_at=alert.created_at,
         ack_by=str(alert.ack_by) if alert.ack_by else None,
         ack_at=alert.ack_at,
+        occurrences=alert.occurrences,
+        last_seen_at=alert.last_seen_at,
     )
 
 
@@ -96,7 +101,7 @@ async def resolve(alert_id: str, session: AsyncSession = Depends(get_session), c
     try:
         alert = await resolve_alert(session, alert_id, user_id=str(current_user.id))
     except ValueError:
-        raise HTTPException(status_code=404, detail="Not found")
+        raise HTTPException(status_code=404, detail="Not found") from None
     return AlertResponse(
         id=str(alert.id),
         type=alert.type,
@@ -109,5 +114,7 @@ async def resolve(alert_id: str, session: AsyncSession = Depends(get_session), c
         created_at=alert.created_at,
         ack_by=str(alert.ack_by) if alert.ack_by else None,
         ack_at=alert.ack_at,
+        occurrences=alert.occurrences,
+        last_seen_at=alert.last_seen_at,
     )
 
@@ -1,19 +1,34 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Optional
 import uuid
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
-from sqlalchemy import func, select
+from sqlalchemy import Select, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.conditional import (
+    cached_representation,
+    collection_validators,
+    not_modified,
+    validators_for,
+)
 from app.core.db import get_session
+from app.core.pagination import SortKey, TotalMode, count_total, keyset_page
+from app.core.search import text_search
+from app.core.config import settings
+from app.services.snapshot_service import get_balances_as_of
+from app.services.typeahead_service import item_typeahead
+from app.services.valuation_service import get_valuation
 from app.models.entities import (
     Item,
     Customer,
+    MovementType,
     Supplier,
     StoreLocation,
+    StockBalance,
     StockMovement,
     ReorderRule,
 )
@@ -35,6 +50,16 @@ class ItemOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class TypeaheadItemOut(BaseModel):
+    id: uuid.UUID
+    item_code: str
+    sku: str
+    name: str
+    barcode: Optional[str] = None
+    uom: Optional[str] = None
+    score: float
+
+
 class CustomerOut(BaseModel):
     id: uuid.UUID
     customer_code: Optional[str] = None
@@ -76,34 +101,111 @@ class StockBalanceOut(BaseModel):
     max_level: Optional[float] = None
 
 
+class StockAsOfOut(BaseModel):
+    item_id: uuid.UUID
+    location_id: uuid.UUID
+    available: float
+
+
+class StockMovementOut(BaseModel):
+    id: uuid.UUID
+    item_id: uuid.UUID
+    location_id: uuid.UUID
+    movement_type: MovementType
+    qty_delta: float
+    unit_cost: Optional[float] = None
+    ref_type: str
+    ref_id: uuid.UUID
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class ValuationGroupOut(BaseModel):
+    id: Optional[uuid.UUID]
+    name: Optional[str]
+    qty: float
+    value: float
+
+
+async def _page(
+    session: AsyncSession,
+    stmt: Select,
+    keys: list[SortKey],
+    cursor: Optional[str],
+    offset: int,
+    limit: int,
+):
+    if cursor and offset:
+        # The cursor already marks the position; an offset on top would skip rows past it.
+        raise HTTPException(status_code=400, detail="offset cannot be combined with cursor")
+    try:
+        return await keyset_page(session, stmt.offset(offset), keys, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
 @router.get("/items")
 async def list_items(
     session: AsyncSession = Depends(get_session),
     offset: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=200),
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    total: TotalMode = TotalMode.EXACT,
 ):
     stmt = select(Item)
+    keys: list[SortKey] = [(Item.name, False), (Item.id, False)]
     if search:
-        like = f"%{search.lower()}%"
-        stmt = stmt.where(
-            func.lower(Item.name).like(like)
-            | func.lower(Item.item_code).like(like)
-            | func.lower(Item.barcode).like(like)
+        condition, rank = text_search(
+            session, [Item.name, Item.item_code, Item.barcode], search
         )
-    total = await session.scalar(select(func.count()).select_from(stmt.subquery()))
-    result = await session.execute(stmt.offset(offset).limit(limit))
-    items = result.scalars().all()
-    return {"items": [ItemOut.model_validate(i) for i in items], "total": total or 0}
+        stmt = stmt.where(condition)
+        if rank is not None:
+            keys.insert(0, (rank, True))
+    count = await count_total(session, stmt, total)
+    rows, next_cursor = await _page(session, stmt, keys, cursor, offset, limit)
+    return {
+        "items": [ItemOut.model_validate(row[0]) for row in rows],
+        "total": count,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/items/typeahead")
+async def item_typeahead_lookup(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(get_session),
+):
+    """Best matches for a partial name, code or barcode from the in-memory index (POS)."""
+    await item_typeahead.ensure_loaded(session)
+    return {
+        "items": [
+            TypeaheadItemOut(**vars(entry), score=round(score, 1))
+            for entry, score in item_typeahead.search(q, limit)
+        ]
+    }
 
 
 @router.get("/items/{item_id}")
-async def get_item(item_id: str, session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(Item).where(Item.id == item_id))
-    item = result.scalar_one_or_none()
-    if not item:
-        return {"detail": "Not found"}, 404
-    return ItemOut.model_validate(item)
+async def get_item(
+    item_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+):
+    async def load():
+        item = (await session.execute(select(Item).where(Item.id == item_id))).scalar_one_or_none()
+        if item is None:
+            return None
+        validators = validators_for("item", item_id, last_modified=item.updated_at)
+        return validators, ItemOut.model_validate(item)
+
+    item = await cached_representation(request, response, "items", item_id, load)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return item
 
 
 @router.get("/customers")
@@ -112,30 +214,47 @@ async def list_customers(
     offset: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=200),
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    total: TotalMode = TotalMode.EXACT,
 ):
     stmt = select(Customer)
+    keys: list[SortKey] = [(Customer.name, False), (Customer.id, False)]
     if search:
-        like = f"%{search.lower()}%"
-        stmt = stmt.where(
-            func.lower(Customer.name).like(like)
-            | func.lower(Customer.customer_code).like(like)
-            | func.lower(Customer.phone).like(like)
+        condition, rank = text_search(
+            session, [Customer.name, Customer.customer_code, Customer.phone], search
         )
-    total = await session.scalar(select(func.count()).select_from(stmt.subquery()))
-    result = await session.execute(stmt.offset(offset).limit(limit))
-    customers = result.scalars().all()
+        stmt = stmt.where(condition)
+        if rank is not None:
+            keys.insert(0, (rank, True))
+    count = await count_total(session, stmt, total)
+    rows, next_cursor = await _page(session, stmt, keys, cursor, offset, limit)
     return {
-        "items": [CustomerOut.model_validate(c) for c in customers],
-        "total": total or 0,
+        "items": [CustomerOut.model_validate(row[0]) for row in rows],
+        "total": count,
+        "next_cursor": next_cursor,
     }
 
 
 @router.get("/customers/{customer_id}")
-async def get_customer(customer_id: str, session: AsyncSession = Depends(get_session)):
+async def get_customer(
+    customer_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+):
+    updated_at = await session.scalar(
+        select(Customer.updated_at).where(Customer.id == customer_id)
+    )
+    if updated_at is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    validators = validators_for("customer", customer_id, last_modified=updated_at)
+    if unchanged := not_modified(request, validators):
+        return unchanged
+    response.headers.update(validators.headers)
     result = await session.execute(select(Customer).where(Customer.id == customer_id))
     customer = result.scalar_one_or_none()
     if not customer:
-        return {"detail": "Not found"}, 404
+        raise HTTPException(status_code=404, detail="Not found")
     return CustomerOut.model_validate(customer)
 
 
@@ -145,38 +264,58 @@ async def list_suppliers(
     offset: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=200),
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    total: TotalMode = TotalMode.EXACT,
 ):
     stmt = select(Supplier)
+    keys: list[SortKey] = [(Supplier.name, False), (Supplier.id, False)]
     if search:
-        like = f"%{search.lower()}%"
-        stmt = stmt.where(
-            func.lower(Supplier.name).like(like)
-            | func.lower(Supplier.supplier_code).like(like)
-            | func.lower(Supplier.phone).like(like)
+        condition, rank = text_search(
+            session, [Supplier.name, Supplier.supplier_code, Supplier.phone], search
         )
-    total = await session.scalar(select(func.count()).select_from(stmt.subquery()))
-    result = await session.execute(stmt.offset(offset).limit(limit))
-    suppliers = result.scalars().all()
+        stmt = stmt.where(condition)
+        if rank is not None:
+            keys.insert(0, (rank, True))
+    count = await count_total(session, stmt, total)
+    rows, next_cursor = await _page(session, stmt, keys, cursor, offset, limit)
     return {
-        "items": [SupplierOut.model_validate(s) for s in suppliers],
-        "total": total or 0,
+        "items": [SupplierOut.model_validate(row[0]) for row in rows],
+        "total": count,
+        "next_cursor": next_cursor,
     }
 
 
 @router.get("/suppliers/{supplier_id}")
-async def get_supplier(supplier_id: str, session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(Supplier).where(Supplier.id == supplier_id))
-    supplier = result.scalar_one_or_none()
-    if not supplier:
-        return {"detail": "Not found"}, 404
-    return SupplierOut.model_validate(supplier)
+async def get_supplier(
+    supplier_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+):
+    async def load():
+        result = await session.execute(select(Supplier).where(Supplier.id == supplier_id))
+        supplier = result.scalar_one_or_none()
+        if supplier is None:
+            return None
+        validators = validators_for("supplier", supplier_id, last_modified=supplier.updated_at)
+        return validators, SupplierOut.model_validate(supplier)
+
+    supplier = await cached_representation(request, response, "suppliers", supplier_id, load)
+    if supplier is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return supplier
 
 
 @router.get("/locations")
-async def list_locations(session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(StoreLocation))
-    locations = result.scalars().all()
-    return {"items": [LocationOut.model_validate(l) for l in locations]}
+async def list_locations(
+    request: Request, response: Response, session: AsyncSession = Depends(get_session)
+):
+    async def load():
+        validators = await collection_validators(session, StoreLocation, "locations")
+        locations = (await session.execute(select(StoreLocation))).scalars().all()
+        return validators, {"items": [LocationOut.model_validate(l) for l in locations]}
+
+    return await cached_representation(request, response, "locations", "all", load)
 
 
 @router.get("/inventory/balances")
@@ -185,18 +324,10 @@ async def inventory_balances(
     offset: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=200),
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    total: TotalMode = TotalMode.EXACT,
     location_id: Optional[str] = Query(None),
 ):
-    base = (
-        select(
-            StockMovement.item_id,
-            StockMovement.location_id,
-            func.sum(StockMovement.qty_delta).label("available"),
-        )
-        .group_by(StockMovement.item_id, StockMovement.location_id)
-        .subquery()
-    )
-
     stmt = (
         select(
             Item.id.label("item_id"),
@@ -204,12 +335,13 @@ async def inventory_balances(
             Item.name.label("item_name"),
             StoreLocation.id.label("location_id"),
             StoreLocation.name.label("location_name"),
-            base.c.available,
+            StockBalance.qty.label("available"),
             ReorderRule.min_level,
             ReorderRule.max_level,
         )
-        .join(Item, Item.id == base.c.item_id)
-        .join(StoreLocation, StoreLocation.id == base.c.location_id)
+        .select_from(StockBalance)
+        .join(Item, Item.id == StockBalance.item_id)
+        .join(StoreLocation, StoreLocation.id == StockBalance.location_id)
         .outerjoin(
             ReorderRule,
             (ReorderRule.item_id == Item.id)
@@ -219,14 +351,15 @@ async def inventory_balances(
 
     if location_id:
         stmt = stmt.where(StoreLocation.id == location_id)
+    keys: list[SortKey] = [(Item.name, False), (Item.id, False), (StoreLocation.id, False)]
     if search:
-        like = f"%{search.lower()}%"
-        stmt = stmt.where(
-            func.lower(Item.name).like(like) | func.lower(Item.item_code).like(like)
-        )
+        condition, rank = text_search(session, [Item.name, Item.item_code], search)
+        stmt = stmt.where(condition)
+        if rank is not None:
+            keys.insert(0, (rank, True))
 
-    total = await session.scalar(select(func.count()).select_from(stmt.subquery()))
-    rows = await session.execute(stmt.offset(offset).limit(limit))
+    count = await count_total(session, stmt, total)
+    rows, next_cursor = await _page(session, stmt, keys, cursor, offset, limit)
     items = [
         StockBalanceOut(
             item_id=r.item_id,
@@ -240,5 +373,74 @@ async def inventory_balances(
         )
         for r in rows
     ]
-    return {"items": items, "total": total or 0}
+    return {"items": items, "total": count, "next_cursor": next_cursor}
+
 
+@router.get("/inventory/balances/as-of")
+async def inventory_balances_as_of(
+    as_of: datetime,
+    session: AsyncSession = Depends(get_session),
+    item_id: Optional[uuid.UUID] = Query(None),
+    location_id: Optional[uuid.UUID] = Query(None),
+):
+    try:
+        balances = await get_balances_as_of(
+            session, as_of, item_id=item_id, location_id=location_id
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from None
+    items = [
+        StockAsOfOut(item_id=item, location_id=location, available=float(qty))
+        for (item, location), qty in balances.items()
+    ]
+    return {"as_of": as_of, "items": items}
+
+
+@router.get("/inventory/valuation")
+async def inventory_valuation(
+    session: AsyncSession = Depends(get_session),
+    location_id: Optional[uuid.UUID] = Query(None),
+):
+    valuation = await get_valuation(session, location_id=location_id)
+    by_location = [ValuationGroupOut(**group) for group in valuation["by_location"]]
+    by_category = [ValuationGroupOut(**group) for group in valuation["by_category"]]
+    return {
+        "method": settings.stock_valuation_method,
+        "total_value": sum(group.value for group in by_location),
+        "by_location": by_location,
+        "by_category": by_category,
+    }
+
+
+@router.get("/inventory/movements")
+async def inventory_movements(
+    session: AsyncSession = Depends(get_session),
+    item_id: Optional[uuid.UUID] = Query(None),
+    location_id: Optional[uuid.UUID] = Query(None),
+    ref_type: Optional[str] = Query(None),
+    movement_type: Optional[MovementType] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+):
+    """Movement history, newest first, paged by an opaque (created_at, id) cursor."""
+    stmt = select(StockMovement)
+    if item_id:
+        stmt = stmt.where(StockMovement.item_id == item_id)
+    if location_id:
+        stmt = stmt.where(StockMovement.location_id == location_id)
+    if ref_type:
+        stmt = stmt.where(StockMovement.ref_type == ref_type)
+    if movement_type:
+        stmt = stmt.where(StockMovement.movement_type == movement_type)
+    if date_from:
+        stmt = stmt.where(StockMovement.created_at >= date_from)
+    if date_to:
+        stmt = stmt.where(StockMovement.created_at < date_to)
+    keys: list[SortKey] = [(StockMovement.created_at, True), (StockMovement.id, True)]
+    rows, next_cursor = await _page(session, stmt, keys, cursor, 0, limit)
+    return {
+        "items": [StockMovementOut.model_validate(row[0]) for row in rows],
+        "next_cursor": next_cursor,
+    }
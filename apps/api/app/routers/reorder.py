@@ -3,17 +3,19 @@ from __future__ import annotations
 from decimal import Decimal
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cache
+from app.core.conditional import cached_representation, collection_validators
 from app.core.db import get_session
 from app.core.security import require_roles
 from app.models.entities import (
     ReorderRule,
     StaffRole,
     WebhookEndpoint,
-    StockMovement,
+    StockBalance,
     Item,
     StoreLocation,
 )
@@ -23,6 +25,7 @@ from app.schemas.reorder import (
     WebhookEndpointCreate,
     WebhookEndpointResponse,
 )
+from app.services.reorder_evaluator import request_reorder_check
 
 router = APIRouter()
 
@@ -30,17 +33,25 @@ router = APIRouter()
 Admin = Depends(require_roles([StaffRole.MANAGER, StaffRole.ADMIN]))
 
 
+async def _evaluate_rule(session: AsyncSession, rule: ReorderRule) -> None:
+    """Apply a created or edited rule right away instead of waiting for the next movement."""
+    if rule.active:
+        await request_reorder_check(session, [(rule.item_id, rule.location_id)])
+        await session.commit()
+
+
 @router.post("/reorder-rules", response_model=ReorderRuleResponse, dependencies=[Admin])
 async def create_reorder_rule(payload: ReorderRuleCreate, session: AsyncSession = Depends(get_session)):
     rule = ReorderRule(**payload.model_dump())
     session.add(rule)
     await session.commit()
+    await cache.invalidate("reorder_rules")
     await session.refresh(rule)
+    await _evaluate_rule(session, rule)
     return ReorderRuleResponse(id=str(rule.id), **payload.model_dump())
 
 
-@router.get("/reorder-rules", response_model=List[ReorderRuleResponse], dependencies=[Admin])
-async def list_reorder_rules(session: AsyncSession = Depends(get_session)):
+async def _load_reorder_rules(session: AsyncSession) -> list[ReorderRuleResponse]:
     rules = (await session.execute(select(ReorderRule))).scalars().all()
     return [
         ReorderRuleResponse(
@@ -58,6 +69,17 @@ async def list_reorder_rules(session: AsyncSession = Depends(get_session)):
     ]
 
 
+@router.get("/reorder-rules", response_model=List[ReorderRuleResponse], dependencies=[Admin])
+async def list_reorder_rules(
+    request: Request, response: Response, session: AsyncSession = Depends(get_session)
+):
+    async def load():
+        validators = await collection_validators(session, ReorderRule, "reorder_rules")
+        return validators, await _load_reorder_rules(session)
+
+    return await cached_representation(request, response, "reorder_rules", "all", load)
+
+
 @router.put("/reorder-rules/{rule_id}", response_model=ReorderRuleResponse, dependencies=[Admin])
 async def update_reorder_rule(
     rule_id: str, payload: ReorderRuleCreate, session: AsyncSession = Depends(get_session)
@@ -69,7 +91,9 @@ async def update_reorder_rule(
         setattr(rule, k, v)
     session.add(rule)
     await session.commit()
+    await cache.invalidate("reorder_rules")
     await session.refresh(rule)
+    await _evaluate_rule(session, rule)
     return ReorderRuleResponse(id=str(rule.id), **payload.model_dump())
 
 
@@ -80,6 +104,7 @@ async def delete_reorder_rule(rule_id: str, session: AsyncSession = Depends(get_
         raise HTTPException(status_code=404, detail="Not found")
     await session.delete(rule)
     await session.commit()
+    await cache.invalidate("reorder_rules")
     return None
 
 
@@ -105,6 +130,8 @@ async def list_webhook_endpoints(session: AsyncSession = Depends(get_session)):
             secret=ep.secret,
             events=ep.events,
             active=ep.active,
+            batch_max_events=ep.batch_max_events,
+            batch_max_wait_ms=ep.batch_max_wait_ms,
         )
         for ep in endpoints
     ]
@@ -137,27 +164,21 @@ async def delete_webhook_endpoint(endpoint_id: str, session: AsyncSession = Depe
 
 @router.get("/dashboard/low-stock", dependencies=[Admin])
 async def low_stock_dashboard(session: AsyncSession = Depends(get_session)):
-    subq = (
-        select(
-            StockMovement.item_id,
-            StockMovement.location_id,
-            func.coalesce(func.sum(StockMovement.qty_delta), 0).label("available"),
-        )
-        .group_by(StockMovement.item_id, StockMovement.location_id)
-        .subquery()
-    )
-
     results = await session.execute(
         select(
             ReorderRule,
-            subq.c.available,
+            StockBalance.qty,
             Item.name,
             StoreLocation.name,
         )
-        .join(subq, (ReorderRule.item_id == subq.c.item_id) & (ReorderRule.location_id == subq.c.location_id))
+        .join(
+            StockBalance,
+            (ReorderRule.item_id == StockBalance.item_id)
+            & (ReorderRule.location_id == StockBalance.location_id),
+        )
         .join(Item, Item.id == ReorderRule.item_id)
         .join(StoreLocation, StoreLocation.id == ReorderRule.location_id)
-        .where(ReorderRule.active.is_(True), subq.c.available <= ReorderRule.min_level)
+        .where(ReorderRule.active.is_(True), StockBalance.qty <= ReorderRule.min_level)
     )
 
     return [
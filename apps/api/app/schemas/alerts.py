@@ -20,9 +20,12 @@ class AlertResponse(BaseModel):
     created_at: datetime
     ack_by: Optional[str] = None
     ack_at: Optional[datetime] = None
+    occurrences: int = 1
+    last_seen_at: Optional[datetime] = None
 
 
 class AlertListResponse(BaseModel):
-    total: int
+    total: Optional[int] = None
     items: list[AlertResponse]
+    next_cursor: Optional[str] = None
 
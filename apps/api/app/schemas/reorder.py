@@ -3,7 +3,7 @@ from __future__ import annotations
 from decimal import Decimal
 from typing import List, Optional
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 
 
 class ReorderRuleCreate(BaseModel):
@@ -27,6 +27,9 @@ class WebhookEndpointCreate(BaseModel):
     secret: str
     events: List[str]
     active: bool = True
+    # 1 sends every delivery on its own; >1 packs deliveries into one signed JSON array.
+    batch_max_events: int = Field(1, ge=1, le=1000)
+    batch_max_wait_ms: int = Field(0, ge=0, le=60000)
 
 
 class WebhookEndpointResponse(WebhookEndpointCreate):
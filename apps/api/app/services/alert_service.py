@@ -1,18 +1,27 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Iterable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import func, or_, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.db import upsert_insert
 from app.models.entities import Alert, AlertSeverity, AlertStatus, AlertType
 
+# Predicate of the partial unique index on ``alerts.dedup_key``.
+_UNRESOLVED = text("status <> 'DONE'")
+
 
 def now() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def alert_dedup_key(type: AlertType, item_id=None, location_id=None) -> str:
+    """Identity of the underlying problem: one unresolved alert exists per key."""
+    return f"{AlertType(type).value}:{item_id or ''}:{location_id or ''}"
+
+
 async def emit_alert(
     session: AsyncSession,
     *,
@@ -23,19 +32,64 @@ async def emit_alert(
     location_id=None,
     item_id=None,
 ) -> Alert:
-    alert = Alert(
-        type=type,
-        severity=severity,
-        message=message,
-        context=context,
-        location_id=location_id,
-        item_id=item_id,
-        status=AlertStatus.OPEN,
+    await emit_alerts(
+        session,
+        [
+            dict(
+                type=type,
+                severity=severity,
+                message=message,
+                context=context,
+                location_id=location_id,
+                item_id=item_id,
+            )
+        ],
     )
-    session.add(alert)
     await session.commit()
-    await session.refresh(alert)
-    return alert
+    return (
+        await session.execute(
+            select(Alert)
+            .where(Alert.dedup_key == alert_dedup_key(type, item_id, location_id), _UNRESOLVED)
+            .execution_options(populate_existing=True)
+        )
+    ).scalar_one()
+
+
+async def emit_alerts(session: AsyncSession, alerts: Iterable[dict], chunk_size: int = 500) -> None:
+    """Stage several alerts (``emit_alert`` keyword dicts) in the current transaction.
+
+    Alerts are de-duplicated on (type, item, location): if an unresolved alert with the same
+    key exists, its occurrence count, ``last_seen_at`` and latest context are updated
+    instead of adding a row. Rows go out as multi-row upserts; the caller owns the commit
+    so alerts land atomically with the change that raised them.
+    """
+    merged: dict[str, dict] = {}
+    for alert in alerts:
+        row = {"location_id": None, "item_id": None, **alert}
+        key = alert_dedup_key(row["type"], row["item_id"], row["location_id"])
+        seen = merged.get(key)
+        merged[key] = {
+            **row,
+            "status": AlertStatus.OPEN,
+            "dedup_key": key,
+            "occurrences": seen["occurrences"] + 1 if seen else 1,
+        }
+    rows = list(merged.values())
+    for start in range(0, len(rows), chunk_size):
+        stmt = upsert_insert(session)(Alert).values(rows[start : start + chunk_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Alert.dedup_key],
+            index_where=_UNRESOLVED,
+            set_={
+                "occurrences": Alert.occurrences + stmt.excluded.occurrences,
+                "last_seen_at": func.now(),
+                "severity": stmt.excluded.severity,
+                "message": stmt.excluded.message,
+                "context": stmt.excluded.context,
+                "updated_at": func.now(),
+            },
+        )
+        await session.execute(stmt)
 
 
 async def ack_alert(session: AsyncSession, alert_id: str, user_id: Optional[str] = None) -> Alert:
@@ -64,23 +118,17 @@ async def resolve_alert(session: AsyncSession, alert_id: str, user_id: Optional[
     return alert
 
 
-async def maybe_resolve_open_low_stock(
-    session: AsyncSession, type: AlertType, item_id, location_id
-) -> None:
-    """Helper to resolve stale alerts if conditions clear (optional future use)."""
+async def resolve_alerts(session: AsyncSession, *conditions) -> int:
+    """Resolve every unresolved alert matching any of ``conditions`` with one UPDATE.
+
+    Nothing is committed; returns the number of alerts resolved.
+    """
+    if not conditions:
+        return 0
     result = await session.execute(
-        select(Alert).where(
-            Alert.type == type,
-            Alert.item_id == item_id,
-            Alert.location_id == location_id,
-            Alert.status != AlertStatus.DONE,
-        )
+        update(Alert)
+        .where(Alert.status != AlertStatus.DONE, or_(*conditions))
+        .values(status=AlertStatus.DONE, ack_at=now(), updated_at=func.now())
+        .execution_options(synchronize_session=False)
     )
-    alerts = result.scalars().all()
-    for alert in alerts:
-        alert.status = AlertStatus.DONE
-        alert.ack_at = now()
-        session.add(alert)
-    if alerts:
-        await session.commit()
-
+    return result.rowcount
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import insert_many
+from app.models.entities import OutboxEvent
+
+
+async def add_outbox_events(session: AsyncSession, topic: str, payloads: list[dict]) -> None:
+    """Stage events in the caller's transaction; they exist only if it commits."""
+    await insert_many(
+        session, OutboxEvent, [{"topic": topic, "payload": payload} for payload in payloads]
+    )
+
+
+async def claim_outbox_events(
+    session: AsyncSession, topic: str, limit: int
+) -> list[tuple[Any, dict]]:
+    """Lock up to ``limit`` of the oldest events of ``topic`` and return ``(id, payload)``.
+
+    Rows are taken with ``FOR UPDATE SKIP LOCKED`` so relays on several replicas drain
+    disjoint events. The caller deletes them with :func:`complete_outbox_events` in the
+    transaction that applies them, which makes the handoff exactly-once.
+    """
+    rows = await session.execute(
+        select(OutboxEvent.id, OutboxEvent.payload)
+        .where(OutboxEvent.topic == topic)
+        .order_by(OutboxEvent.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return [(event_id, payload) for event_id, payload in rows]
+
+
+async def complete_outbox_events(session: AsyncSession, event_ids: list) -> None:
+    await session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids)))
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import dialect_name, insert_many
+from app.models.entities import DetachedStockPartition
+from app.services.snapshot_service import earliest_snapshot_from, ledger_horizon
+from app.services.valuation_service import value_snapshot
+
+PARENT = "stock_movements"
+DEFAULT_PARTITION = "stock_movements_default"
+_PARTITION_RE = re.compile(r"^stock_movements_p(\d{4})(\d{2})$")
+
+
+@dataclass
+class Partition:
+    name: str
+    month: date
+
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + (value.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _month_bound(month: date) -> datetime:
+    return datetime(month.year, month.month, 1, tzinfo=UTC)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_p{month:%Y%m}"
+
+
+def _require_postgres(session: AsyncSession) -> None:
+    if dialect_name(session) != "postgresql":
+        raise RuntimeError("Stock movement partitions are only maintained on PostgreSQL")
+
+
+async def list_partitions(session: AsyncSession) -> list[Partition]:
+    """Return the monthly partitions currently attached to ``stock_movements``."""
+    _require_postgres(session)
+    rows = await session.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:parent AS regclass)
+            """
+        ),
+        {"parent": PARENT},
+    )
+    partitions = []
+    for (name,) in rows:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions.append(Partition(name, date(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda p: p.month)
+
+
+async def create_month_partition(session: AsyncSession, month: date) -> str:
+    """Create and attach the partition for ``month``.
+
+    Rows that already landed in the DEFAULT partition for that month are moved into the new
+    table before it is attached, otherwise ATTACH would be rejected.
+    """
+    month = _month_start(month)
+    name = partition_name(month)
+    bounds = {"start": month, "end": _add_months(month, 1)}
+    await session.execute(
+        text(f'CREATE TABLE "{name}" (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    )
+    await session.execute(
+        text(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE created_at >= :start AND created_at < :end
+                RETURNING *
+            )
+            INSERT INTO "{name}" SELECT * FROM moved
+            """
+        ),
+        bounds,
+    )
+    await session.execute(
+        text(
+            f'ALTER TABLE {PARENT} ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        )
+    )
+    return name
+
+
+async def ensure_future_partitions(
+    session: AsyncSession, months_ahead: int, today: Optional[date] = None
+) -> list[str]:
+    """Pre-create monthly partitions from the current month through ``months_ahead``."""
+    _require_postgres(session)
+    today = today or datetime.now(UTC).date()
+    existing = {p.month for p in await list_partitions(session)}
+    created = []
+    current = _month_start(today)
+    for offset in range(months_ahead + 1):
+        month = _add_months(current, offset)
+        if month not in existing:
+            created.append(await create_month_partition(session, month))
+    await session.commit()
+    return created
+
+
+async def detach_partitions_before(
+    session: AsyncSession,
+    before: date,
+    *,
+    archive_schema: Optional[str] = None,
+    drop: bool = False,
+) -> list[str]:
+    """Detach monthly partitions that end on or before ``before``.
+
+    Detached tables are moved to ``archive_schema`` or dropped. A stock snapshot must exist
+    at or after the cut-off: it is valued first so ``rebuild_valuation`` can start from it,
+    and each detached partition is recorded so as-of reads before that snapshot are refused
+    (see ``ledger_horizon``) instead of silently missing the archived movements.
+    """
+    _require_postgres(session)
+    before = _month_start(before)
+    snapshot_at = await earliest_snapshot_from(session, _month_bound(before))
+    if snapshot_at is None:
+        raise ValueError("Write a stock snapshot at or after the cut-off before detaching")
+
+    partitions = [p for p in await list_partitions(session) if _add_months(p.month, 1) <= before]
+    if not partitions:
+        return []
+    horizon = await ledger_horizon(session)
+    if horizon is None or snapshot_at > horizon:
+        await value_snapshot(session, snapshot_at)
+
+    detached = []
+    records = []
+    for partition in partitions:
+        await session.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION "{partition.name}"'))
+        if drop:
+            await session.execute(text(f'DROP TABLE "{partition.name}"'))
+        elif archive_schema:
+            await session.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"'))
+            await session.execute(
+                text(f'ALTER TABLE "{partition.name}" SET SCHEMA "{archive_schema}"')
+            )
+        detached.append(partition.name)
+        records.append(
+            {
+                "name": partition.name,
+                "range_start": _month_bound(partition.month),
+                "range_end": _month_bound(_add_months(partition.month, 1)),
+                "archive_schema": None if drop else archive_schema,
+                "dropped": drop,
+            }
+        )
+    await insert_many(session, DetachedStockPartition, records)
+    await session.commit()
+    return detached
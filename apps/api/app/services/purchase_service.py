@@ -11,7 +11,7 @@ from app.models.entities import (
     PurchaseOrder,
     PurchaseOrderStatus,
 )
-from app.services.stock_service import post_stock_movement
+from app.services.stock_service import MovementLine, post_stock_movements
 
 
 async def _get_grn_with_lines(session: AsyncSession, grn_id) -> GoodsReceipt | None:
@@ -32,17 +32,17 @@ async def post_goods_receipt(session: AsyncSession, grn_id) -> GoodsReceipt:
     if grn.status == GoodsReceiptStatus.POSTED:
         return grn
 
-    for line in grn.lines:
-        await post_stock_movement(
-            session,
-            item_id=line.item_id,
-            location_id=grn.location_id,
-            movement_type=MovementType.PURCHASE_RECEIPT,
-            qty_delta=line.qty,
-            unit_cost=line.unit_cost,
-            ref_type="goods_receipt",
-            ref_id=grn.id,
-        )
+    await post_stock_movements(
+        session,
+        location_id=grn.location_id,
+        movement_type=MovementType.PURCHASE_RECEIPT,
+        ref_type="goods_receipt",
+        ref_id=grn.id,
+        lines=[
+            MovementLine(item_id=line.item_id, qty_delta=line.qty, unit_cost=line.unit_cost)
+            for line in grn.lines
+        ],
+    )
 
     grn.status = GoodsReceiptStatus.POSTED
     session.add(grn)
@@ -57,17 +57,18 @@ async def post_purchase_return(session: AsyncSession, grn_id) -> GoodsReceipt:
     if not grn:
         raise ValueError("Goods receipt not found")
 
-    for line in grn.lines:
-        await post_stock_movement(
-            session,
-            item_id=line.item_id,
-            location_id=grn.location_id,
-            movement_type=MovementType.PURCHASE_RETURN,
-            qty_delta=-line.qty,
-            unit_cost=line.unit_cost,
-            ref_type="purchase_return",
-            ref_id=grn.id,
-        )
+    await post_stock_movements(
+        session,
+        location_id=grn.location_id,
+        movement_type=MovementType.PURCHASE_RETURN,
+        ref_type="purchase_return",
+        ref_id=grn.id,
+        lines=[
+            MovementLine(item_id=line.item_id, qty_delta=-line.qty, unit_cost=line.unit_cost)
+            for line in grn.lines
+        ],
+    )
+    await session.commit()
 
     return grn
 
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.outbox_service import (
+    add_outbox_events,
+    claim_outbox_events,
+    complete_outbox_events,
+)
+from app.services.reorder_service import handle_stock_movements
+
+logger = logging.getLogger(__name__)
+
+STOCK_CHANGED_TOPIC = "stock.changed"
+_WAKE_KEY = "reorder_outbox_written"
+
+
+async def relay_stock_changes(session: AsyncSession, limit: int) -> int:
+    """Evaluate the pairs of up to ``limit`` outbox events and delete them, then commit.
+
+    Alerts, webhook deliveries and the outbox deletion share one transaction, so every
+    stock change is handed over exactly once. Returns the number of events relayed.
+    """
+    events = await claim_outbox_events(session, STOCK_CHANGED_TOPIC, limit)
+    if not events:
+        return 0
+    pairs = {
+        (uuid.UUID(item_id), uuid.UUID(location_id))
+        for _, payload in events
+        for item_id, location_id in payload["pairs"]
+    }
+    await handle_stock_movements(session, pairs)
+    await complete_outbox_events(session, [event_id for event_id, _ in events])
+    await session.commit()
+    return len(events)
+
+
+class ReorderEvaluator:
+    """Background relay that drains stock-change events from the transactional outbox.
+
+    Posting writes the touched (item_id, location_id) pairs to ``outbox_events`` in its own
+    transaction; once it commits, the relay waits ``window`` seconds so bursts on the same
+    SKU collapse into one evaluation, then relays ``batch_size`` events per commit. It also
+    drains on start and every ``poll_interval`` seconds, so events survive a crash or a
+    restart and are picked up by any replica.
+    """
+
+    def __init__(self, window: float, batch_size: int, poll_interval: float):
+        self.window = window
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._session_maker: Optional[async_sessionmaker[AsyncSession]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def start(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        if self.running:
+            return
+        self._session_maker = session_maker
+        self._task = asyncio.create_task(self._run())
+        self.wake()  # drain whatever was left in the outbox before this process started
+
+    async def stop(self) -> None:
+        """Stop the loop and relay whatever is still in the outbox."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        self._wake.clear()
+        relayed = 0
+        while True:
+            try:
+                async with self._session_maker() as session:
+                    count = await relay_stock_changes(session, self.batch_size)
+            except Exception:  # noqa: BLE001
+                # The events stay in the outbox and are retried on the next wake or poll.
+                logger.exception("Reorder evaluation of outbox events failed")
+                return relayed
+            if not count:
+                return relayed
+            relayed += count
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except TimeoutError:
+                pass
+            await asyncio.sleep(self.window)
+            await self.flush()
+
+
+reorder_evaluator = ReorderEvaluator(
+    window=settings.reorder_eval_window_ms / 1000,
+    batch_size=settings.reorder_eval_batch_size,
+    poll_interval=settings.reorder_outbox_poll_seconds,
+)
+
+
+async def request_reorder_check(session: AsyncSession, pairs: Iterable[tuple]) -> None:
+    """Evaluate reorder rules for ``pairs`` as part of the caller's transaction.
+
+    When the background relay runs, the pairs are written to the outbox in the caller's
+    transaction and the relay is woken once it commits (so it sees the new balances);
+    otherwise they are evaluated inline.
+    """
+    if reorder_evaluator.running:
+        pairs = sorted({(str(item_id), str(location_id)) for item_id, location_id in pairs})
+        if pairs:
+            await add_outbox_events(session, STOCK_CHANGED_TOPIC, [{"pairs": pairs}])
+            session.info[_WAKE_KEY] = True
+        return
+    await handle_stock_movements(session, pairs)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_relay(session: Session) -> None:
+    if session.info.pop(_WAKE_KEY, None):
+        reorder_evaluator.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_wake(session: Session) -> None:
+    session.info.pop(_WAKE_KEY, None)
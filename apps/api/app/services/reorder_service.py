@@ -3,13 +3,13 @@ from __future__ import annotations
 from decimal import Decimal
 from typing import Iterable
 
-from sqlalchemy import func, select
+from sqlalchemy import and_, case, func, or_, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.entities import ReorderRule, StockMovement
-from app.services.webhook_service import enqueue_event
-from app.services.alert_service import emit_alert
-from app.models.entities import AlertSeverity, AlertType, AlertStatus
+from app.models.entities import ReorderRule, StockBalance
+from app.services.webhook_service import enqueue_events
+from app.services.alert_service import emit_alerts, resolve_alerts
+from app.models.entities import Alert, AlertSeverity, AlertType, AlertStatus
 
 EVENT_LOW_STOCK = "inventory.low_stock"
 EVENT_NEGATIVE_STOCK = "inventory.negative_stock"
@@ -18,89 +18,257 @@ EVENT_PURCHASE_SUGGESTED = "purchase.suggested"
 
 async def get_available_qty(session: AsyncSession, item_id, location_id) -> Decimal:
     result = await session.execute(
-        select(func.coalesce(func.sum(StockMovement.qty_delta), 0)).where(
-            StockMovement.item_id == item_id,
-            StockMovement.location_id == location_id,
+        select(StockBalance.qty).where(
+            StockBalance.item_id == item_id,
+            StockBalance.location_id == location_id,
         )
     )
-    return Decimal(result.scalar_one() or 0)
+    return Decimal(result.scalar_one_or_none() or 0)
 
 
 async def handle_stock_movement(session: AsyncSession, item_id, location_id) -> None:
-    available = await get_available_qty(session, item_id, location_id)
-    rules = (
-        await session.execute(
-            select(ReorderRule).where(
-                ReorderRule.item_id == item_id,
-                ReorderRule.location_id == location_id,
-                ReorderRule.active.is_(True),
-            )
+    await handle_stock_movements(session, [(item_id, location_id)])
+    await session.commit()
+
+
+async def handle_stock_movements(session: AsyncSession, pairs: Iterable[tuple]) -> None:
+    """Evaluate reorder rules for many ``(item_id, location_id)`` pairs at once.
+
+    Resulting webhook deliveries and alerts are staged in the current transaction and
+    committed by the caller.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    await evaluate_reorder_rules(
+        session, tuple_(ReorderRule.item_id, ReorderRule.location_id).in_(list(pairs))
+    )
+
+
+async def sweep_reorder_rules(session: AsyncSession) -> dict[str, int]:
+    """Evaluate every active rule against current balances and commit the outcomes.
+
+    Used by the scheduled sweep so rule edits and drift take effect without waiting for
+    the next movement on the SKU. Only changes are reported: a rule that already has an
+    unresolved stock alert, or whose shortfall was already suggested, stays quiet, so a
+    periodic sweep does not repeat the same webhooks on every run.
+    """
+    counts = await evaluate_reorder_rules(session, changes_only=True)
+    await session.commit()
+    return counts
+
+
+def _available():
+    return func.coalesce(StockBalance.qty, 0)
+
+
+def _rules_with_balance(*columns):
+    return select(*columns).outerjoin(
+        StockBalance,
+        and_(
+            StockBalance.item_id == ReorderRule.item_id,
+            StockBalance.location_id == ReorderRule.location_id,
+        ),
+    )
+
+
+async def _resolve_recovered_alerts(session: AsyncSession, *criteria) -> int:
+    """Resolve open stock alerts of rules matching ``criteria`` whose stock has recovered.
+
+    LOW_STOCK clears once available stock is back above ``min_level`` and NEGATIVE_STOCK
+    once it is no longer negative; all pairs are handled by a single UPDATE with a correlated
+    EXISTS on the rule and its balance.
+    """
+    recovered = (
+        _rules_with_balance(ReorderRule.id)
+        .where(
+            ReorderRule.item_id == Alert.item_id,
+            ReorderRule.location_id == Alert.location_id,
+            ReorderRule.active.is_(True),
+            or_(
+                (Alert.type == AlertType.LOW_STOCK) & (_available() > ReorderRule.min_level),
+                (Alert.type == AlertType.NEGATIVE_STOCK) & (_available() >= 0),
+            ),
+            *criteria,
+        )
+        .exists()
+    )
+    return await resolve_alerts(
+        session,
+        Alert.type.in_([AlertType.LOW_STOCK, AlertType.NEGATIVE_STOCK]) & recovered,
+    )
+
+
+def _open_alert(alert_type: AlertType):
+    """Whether the rule's item/location has an unresolved alert of ``alert_type``."""
+    return (
+        select(Alert.id)
+        .where(
+            Alert.type == alert_type,
+            Alert.item_id == ReorderRule.item_id,
+            Alert.location_id == ReorderRule.location_id,
+            Alert.status != AlertStatus.DONE,
+        )
+        .exists()
+    )
+
+
+async def _clear_satisfied_suggestions(session: AsyncSession, *criteria) -> None:
+    """Forget announced shortfalls of rules matching ``criteria`` that are back at max_level."""
+    balance = (
+        select(StockBalance.qty)
+        .where(
+            StockBalance.item_id == ReorderRule.item_id,
+            StockBalance.location_id == ReorderRule.location_id,
         )
-    ).scalars()
-
-    for rule in rules:
-        if available <= rule.min_level:
-            await enqueue_event(
-                session,
-                EVENT_LOW_STOCK,
-                {
-                    "item_id": str(item_id),
-                    "location_id": str(location_id),
-                    "available": str(available),
-                    "min_level": str(rule.min_level),
-                },
+        .scalar_subquery()
+    )
+    await session.execute(
+        update(ReorderRule)
+        .where(
+            ReorderRule.suggested_at.is_not(None),
+            func.coalesce(balance, 0) >= ReorderRule.max_level,
+            *criteria,
+        )
+        # A bookkeeping change, not a rule edit: keep updated_at (and the rules' ETag).
+        .values(suggested_at=None, updated_at=ReorderRule.updated_at)
+    )
+
+
+def _rule_outcomes(*criteria):
+    """One statement returning, per triggered active rule, its balance and suggested qty."""
+    available = _available()
+    shortfall = ReorderRule.max_level - available
+    suggested = case(
+        (shortfall <= 0, None),
+        (
+            ReorderRule.reorder_qty.is_not(None) & (ReorderRule.reorder_qty > shortfall),
+            ReorderRule.reorder_qty,
+        ),
+        else_=shortfall,
+    )
+    return (
+        _rules_with_balance(
+            ReorderRule.id,
+            ReorderRule.item_id,
+            ReorderRule.location_id,
+            ReorderRule.min_level,
+            ReorderRule.preferred_supplier_id,
+            ReorderRule.suggested_at,
+            available.label("available"),
+            suggested.label("suggested_qty"),
+            _open_alert(AlertType.LOW_STOCK).label("low_stock_open"),
+            _open_alert(AlertType.NEGATIVE_STOCK).label("negative_stock_open"),
+        )
+        .where(
+            ReorderRule.active.is_(True),
+            or_(available <= ReorderRule.min_level, available < 0, shortfall > 0),
+            *criteria,
+        )
+    )
+
+
+async def evaluate_reorder_rules(
+    session: AsyncSession, *criteria, changes_only: bool = False
+) -> dict[str, int]:
+    """Evaluate active rules matching ``criteria`` (all rules when omitted) in bulk.
+
+    Thresholds are compared in SQL; only rules that fire come back, and their alerts and
+    webhook deliveries are staged with multi-row inserts. Open stock alerts of rules whose
+    stock has recovered are resolved in the same pass. With ``changes_only``, rules that
+    already have an unresolved alert of a kind, or an announced shortfall, emit nothing
+    for it. Returns counts per outcome.
+    """
+    resolved = await _resolve_recovered_alerts(session, *criteria)
+    await _clear_satisfied_suggestions(session, *criteria)
+    rows = await session.execute(_rule_outcomes(*criteria))
+
+    events: list[tuple[str, dict]] = []
+    alerts: list[dict] = []
+    announced: list = []
+    counts = {"low_stock": 0, "negative_stock": 0, "purchase_suggested": 0, "resolved": resolved}
+    for row in rows.all():
+        item_id, location_id, min_level = row.item_id, row.location_id, row.min_level
+        available = Decimal(row.available)
+        if available <= min_level and not (changes_only and row.low_stock_open):
+            counts["low_stock"] += 1
+            events.append(
+                (
+                    EVENT_LOW_STOCK,
+                    {
+                        "item_id": str(item_id),
+                        "location_id": str(location_id),
+                        "available": str(available),
+                        "min_level": str(min_level),
+                    },
+                )
             )
-            await emit_alert(
-                session,
-                type=AlertType.LOW_STOCK,
-                severity=AlertSeverity.WARNING,
-                message="Low stock detected",
-                context={
-                    "available": str(available),
-                    "min_level": str(rule.min_level),
-                    "item_id": str(item_id),
-                    "location_id": str(location_id),
-                },
-                item_id=item_id,
-                location_id=location_id,
+            alerts.append(
+                dict(
+                    type=AlertType.LOW_STOCK,
+                    severity=AlertSeverity.WARNING,
+                    message="Low stock detected",
+                    context={
+                        "available": str(available),
+                        "min_level": str(min_level),
+                        "item_id": str(item_id),
+                        "location_id": str(location_id),
+                    },
+                    item_id=item_id,
+                    location_id=location_id,
+                )
             )
-        if available < 0:
-            await enqueue_event(
-                session,
-                EVENT_NEGATIVE_STOCK,
-                {
-                    "item_id": str(item_id),
-                    "location_id": str(location_id),
-                    "available": str(available),
-                },
+        if available < 0 and not (changes_only and row.negative_stock_open):
+            counts["negative_stock"] += 1
+            events.append(
+                (
+                    EVENT_NEGATIVE_STOCK,
+                    {
+                        "item_id": str(item_id),
+                        "location_id": str(location_id),
+                        "available": str(available),
+                    },
+                )
             )
-            await emit_alert(
-                session,
-                type=AlertType.NEGATIVE_STOCK,
-                severity=AlertSeverity.CRITICAL,
-                message="Negative stock detected",
-                context={
-                    "available": str(available),
-                    "item_id": str(item_id),
-                    "location_id": str(location_id),
-                },
-                item_id=item_id,
-                location_id=location_id,
+            alerts.append(
+                dict(
+                    type=AlertType.NEGATIVE_STOCK,
+                    severity=AlertSeverity.CRITICAL,
+                    message="Negative stock detected",
+                    context={
+                        "available": str(available),
+                        "item_id": str(item_id),
+                        "location_id": str(location_id),
+                    },
+                    item_id=item_id,
+                    location_id=location_id,
+                )
             )
-
-        suggested = max(Decimal(0), Decimal(rule.max_level) - available)
-        if suggested > 0:
-            qty = suggested if rule.reorder_qty is None else max(suggested, rule.reorder_qty)
-            await enqueue_event(
-                session,
-                EVENT_PURCHASE_SUGGESTED,
-                {
-                    "item_id": str(item_id),
-                    "location_id": str(location_id),
-                    "suggested_qty": str(qty),
-                    "preferred_supplier_id": str(rule.preferred_supplier_id)
-                    if rule.preferred_supplier_id
-                    else None,
-                },
+        if row.suggested_qty is not None:
+            if row.suggested_at is None:
+                announced.append(row.id)
+            elif changes_only:
+                continue
+            supplier_id = row.preferred_supplier_id
+            counts["purchase_suggested"] += 1
+            events.append(
+                (
+                    EVENT_PURCHASE_SUGGESTED,
+                    {
+                        "item_id": str(item_id),
+                        "location_id": str(location_id),
+                        "suggested_qty": str(Decimal(row.suggested_qty)),
+                        "preferred_supplier_id": str(supplier_id) if supplier_id else None,
+                    },
+                )
             )
 
+    if announced:
+        await session.execute(
+            update(ReorderRule)
+            .where(ReorderRule.id.in_(announced))
+            .values(suggested_at=func.now(), updated_at=ReorderRule.updated_at)
+        )
+    await enqueue_events(session, events)
+    await emit_alerts(session, alerts)
+    return counts
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import Table, delete, func, insert, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import dialect_name
+from app.models.entities import (
+    Alert,
+    AlertStatus,
+    WebhookDelivery,
+    WebhookDeliveryStatus,
+    alerts_archive,
+    webhook_deliveries_archive,
+)
+
+# Live table -> (archive table, statuses that may be purged). PENDING deliveries and OPEN
+# or ACK alerts are still being worked on and are never eligible; an acknowledged alert is
+# also the row alert de-duplication counts occurrences on.
+RETENTION_TABLES: dict[str, tuple[Table, Table, set]] = {
+    "webhook_deliveries": (
+        WebhookDelivery.__table__,
+        webhook_deliveries_archive,
+        {WebhookDeliveryStatus.SUCCESS, WebhookDeliveryStatus.FAILED},
+    ),
+    "alerts": (Alert.__table__, alerts_archive, {AlertStatus.DONE}),
+}
+
+
+@dataclass
+class RetentionPolicy:
+    table: str
+    status: str
+    days: int
+
+
+@dataclass
+class RetentionResult:
+    table: str
+    status: str
+    rows: int = 0
+    archived: bool = False
+    # Approximate on-disk size of the purged rows (PostgreSQL only); the space becomes
+    # reusable after the next (auto)vacuum.
+    bytes: Optional[int] = None
+
+
+def parse_policies(spec: dict[str, int]) -> list[RetentionPolicy]:
+    """Turn ``{"<table>:<STATUS>": days}`` settings into policies; raises ``ValueError``."""
+    policies = []
+    for key, days in spec.items():
+        table, _, status = key.partition(":")
+        if table not in RETENTION_TABLES:
+            raise ValueError(f"Unknown retention table: {table}")
+        allowed = {s.value for s in RETENTION_TABLES[table][2]}
+        if status not in allowed:
+            raise ValueError(f"{table} rows with status {status!r} cannot be purged")
+        if days < 0:
+            raise ValueError(f"Retention for {key} must not be negative")
+        policies.append(RetentionPolicy(table=table, status=status, days=days))
+    return policies
+
+
+async def _purge_batch(
+    session: AsyncSession,
+    policy: RetentionPolicy,
+    cutoff: datetime,
+    limit: int,
+    archive: bool,
+) -> tuple[int, Optional[int]]:
+    """Delete (or archive) one batch of expired rows in its own short transaction."""
+    table, archive_table, _ = RETENTION_TABLES[policy.table]
+    status = table.c.status.type.enum_class(policy.status)
+    ids = (
+        await session.execute(
+            select(table.c.id)
+            .where(table.c.status == status, table.c.updated_at < cutoff)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+    ).scalars().all()
+    if not ids:
+        return 0, None
+    size = None
+    if dialect_name(session) == "postgresql":
+        size = await session.scalar(
+            select(func.sum(func.pg_column_size(literal_column(f"{table.name}.*"))))
+            .select_from(table)
+            .where(table.c.id.in_(ids))
+        )
+    if archive:
+        columns = [c.name for c in table.columns]
+        await session.execute(
+            insert(archive_table).from_select(
+                columns, select(*table.columns).where(table.c.id.in_(ids))
+            )
+        )
+    await session.execute(delete(table).where(table.c.id.in_(ids)))
+    await session.commit()
+    return len(ids), size
+
+
+async def apply_retention(
+    session: AsyncSession,
+    policies: Optional[list[RetentionPolicy]] = None,
+    *,
+    archive: Optional[bool] = None,
+    batch_size: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> list[RetentionResult]:
+    """Purge rows past their retention period, one small committed batch at a time.
+
+    Each batch locks at most ``batch_size`` rows (skipping rows other sessions hold) and
+    commits before the next one, so neither the delivery workers nor the alert screens
+    wait behind a long-running delete.
+    """
+    policies = policies if policies is not None else parse_policies(settings.retention_policies)
+    archive = settings.retention_archive if archive is None else archive
+    batch_size = batch_size or settings.retention_batch_size
+    now = now or datetime.now(UTC)
+    results = []
+    for policy in policies:
+        result = RetentionResult(table=policy.table, status=policy.status, archived=archive)
+        cutoff = now - timedelta(days=policy.days)
+        while True:
+            rows, size = await _purge_batch(session, policy, cutoff, batch_size, archive)
+            result.rows += rows
+            if size is not None:
+                result.bytes = (result.bytes or 0) + size
+            if rows < batch_size:
+                break
+        results.append(result)
+    return results
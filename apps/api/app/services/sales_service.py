@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.entities import MovementType, SalesInvoice, SalesInvoiceStatus
-from app.services.stock_service import post_stock_movement
+from app.services.stock_service import MovementLine, post_stock_movements
 
 
 async def _get_invoice_with_lines(session: AsyncSession, invoice_id) -> SalesInvoice | None:
@@ -26,17 +26,19 @@ async def post_sales_invoice(session: AsyncSession, invoice_id) -> SalesInvoice:
     if invoice.status == SalesInvoiceStatus.POSTED:
         return invoice
 
-    for line in invoice.lines:
-        await post_stock_movement(
-            session,
-            item_id=line.item_id,
-            location_id=invoice.location_id,
-            movement_type=MovementType.SALE,
-            qty_delta=-line.qty,
-            unit_cost=line.unit_cost_snapshot,
-            ref_type="sales_invoice",
-            ref_id=invoice.id,
-        )
+    await post_stock_movements(
+        session,
+        location_id=invoice.location_id,
+        movement_type=MovementType.SALE,
+        ref_type="sales_invoice",
+        ref_id=invoice.id,
+        lines=[
+            MovementLine(
+                item_id=line.item_id, qty_delta=-line.qty, unit_cost=line.unit_cost_snapshot
+            )
+            for line in invoice.lines
+        ],
+    )
 
     invoice.status = SalesInvoiceStatus.POSTED
     session.add(invoice)
@@ -51,17 +53,20 @@ async def post_sales_return(session: AsyncSession, invoice_id) -> SalesInvoice:
     if not invoice:
         raise ValueError("Invoice not found")
 
-    for line in invoice.lines:
-        await post_stock_movement(
-            session,
-            item_id=line.item_id,
-            location_id=invoice.location_id,
-            movement_type=MovementType.SALE_RETURN,
-            qty_delta=line.qty,
-            unit_cost=line.unit_cost_snapshot,
-            ref_type="sales_return",
-            ref_id=invoice.id,
-        )
+    await post_stock_movements(
+        session,
+        location_id=invoice.location_id,
+        movement_type=MovementType.SALE_RETURN,
+        ref_type="sales_return",
+        ref_id=invoice.id,
+        lines=[
+            MovementLine(
+                item_id=line.item_id, qty_delta=line.qty, unit_cost=line.unit_cost_snapshot
+            )
+            for line in invoice.lines
+        ],
+    )
+    await session.commit()
 
     return invoice
 
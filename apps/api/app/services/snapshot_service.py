@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import and_, func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.entities import DetachedStockPartition, StockMovement, StockSnapshot
+
+PERIODS = ("day", "week", "month")
+
+
+def _as_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=UTC)
+    return moment.astimezone(UTC)
+
+
+def period_floor(moment: datetime, period: str) -> datetime:
+    """Return the latest period boundary at or before ``moment`` (UTC)."""
+    moment = _as_utc(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "day":
+        return moment
+    if period == "week":
+        return moment - timedelta(days=moment.weekday())
+    if period == "month":
+        return moment.replace(day=1)
+    raise ValueError(f"Unknown snapshot period: {period}")
+
+
+def next_boundary(boundary: datetime, period: str) -> datetime:
+    if period == "day":
+        return boundary + timedelta(days=1)
+    if period == "week":
+        return boundary + timedelta(days=7)
+    if period == "month":
+        if boundary.month == 12:
+            return boundary.replace(year=boundary.year + 1, month=1)
+        return boundary.replace(month=boundary.month + 1)
+    raise ValueError(f"Unknown snapshot period: {period}")
+
+
+async def latest_snapshot_before(session: AsyncSession, moment: datetime) -> Optional[datetime]:
+    """Return the most recent snapshot boundary at or before ``moment``."""
+    result = await session.execute(
+        select(func.max(StockSnapshot.period_end)).where(StockSnapshot.period_end <= moment)
+    )
+    latest = result.scalar_one_or_none()
+    return _as_utc(latest) if latest else None
+
+
+async def earliest_snapshot_from(session: AsyncSession, moment: datetime) -> Optional[datetime]:
+    """Return the oldest snapshot boundary at or after ``moment``."""
+    result = await session.execute(
+        select(func.min(StockSnapshot.period_end)).where(StockSnapshot.period_end >= moment)
+    )
+    earliest = result.scalar_one_or_none()
+    return _as_utc(earliest) if earliest else None
+
+
+async def ledger_horizon(session: AsyncSession) -> Optional[datetime]:
+    """Return the oldest moment stock history can be rebuilt from, None if nothing is detached.
+
+    That is the first snapshot at or after the end of the last detached partition: older
+    snapshots would need movements that are no longer in ``stock_movements``.
+    """
+    boundary = (
+        await session.execute(select(func.max(DetachedStockPartition.range_end)))
+    ).scalar_one_or_none()
+    if boundary is None:
+        return None
+    boundary = _as_utc(boundary)
+    return await earliest_snapshot_from(session, boundary) or boundary
+
+
+async def _require_retained(session: AsyncSession, moment: datetime) -> None:
+    horizon = await ledger_horizon(session)
+    if horizon is not None and moment < horizon:
+        raise ValueError(f"Stock history before {horizon.isoformat()} has been archived")
+
+
+async def write_snapshot(session: AsyncSession, period_end: datetime) -> int:
+    """Write closing balances for every item/location as of ``period_end`` (exclusive).
+
+    Closing = previous snapshot + movements since it, computed in one INSERT ... SELECT.
+    Boundaries that were already written are left alone. Returns rows written.
+    """
+    period_end = _as_utc(period_end)
+    await _require_retained(session, period_end)
+    exists = await session.execute(
+        select(StockSnapshot.period_end).where(StockSnapshot.period_end == period_end).limit(1)
+    )
+    if exists.first():
+        return 0
+
+    previous = await latest_snapshot_before(session, period_end - timedelta(microseconds=1))
+    movement_filter = [StockMovement.created_at < period_end]
+    parts = []
+    if previous is not None:
+        movement_filter.append(StockMovement.created_at >= previous)
+        parts.append(
+            select(
+                StockSnapshot.item_id, StockSnapshot.location_id, StockSnapshot.qty.label("qty")
+            ).where(StockSnapshot.period_end == previous)
+        )
+    parts.append(
+        select(
+            StockMovement.item_id,
+            StockMovement.location_id,
+            StockMovement.qty_delta.label("qty"),
+        ).where(and_(*movement_filter))
+    )
+    combined = union_all(*parts).subquery()
+    closing = select(
+        literal(period_end, StockSnapshot.period_end.type),
+        combined.c.item_id,
+        combined.c.location_id,
+        func.sum(combined.c.qty),
+    ).group_by(combined.c.item_id, combined.c.location_id)
+
+    result = await session.execute(
+        StockSnapshot.__table__.insert().from_select(
+            ["period_end", "item_id", "location_id", "qty"], closing
+        )
+    )
+    await session.commit()
+    return result.rowcount or 0
+
+
+async def write_due_snapshots(
+    session: AsyncSession, now: Optional[datetime] = None, period: Optional[str] = None
+) -> list[datetime]:
+    """Close every boundary that has passed (plus the grace window) and is not yet written."""
+    period = period or settings.stock_snapshot_period
+    now = _as_utc(now or datetime.now(UTC))
+    cutoff = now - timedelta(minutes=settings.stock_snapshot_grace_minutes)
+
+    latest = await latest_snapshot_before(session, cutoff)
+    if latest is not None:
+        boundary = next_boundary(period_floor(latest, period), period)
+    else:
+        first = (await session.execute(select(func.min(StockMovement.created_at)))).scalar()
+        if first is None:
+            return []
+        boundary = next_boundary(period_floor(first, period), period)
+
+    written: list[datetime] = []
+    while boundary <= cutoff:
+        await write_snapshot(session, boundary)
+        written.append(boundary)
+        boundary = next_boundary(boundary, period)
+    return written
+
+
+async def get_balances_as_of(
+    session: AsyncSession,
+    as_of: datetime,
+    *,
+    item_id=None,
+    location_id=None,
+) -> dict[tuple, Decimal]:
+    """Return ``(item_id, location_id) -> qty`` on hand at ``as_of``.
+
+    Reads the nearest snapshot at or before ``as_of`` and adds only the movements after it,
+    so the cost is one snapshot lookup plus a range scan bounded by one period. Raises
+    ``ValueError`` for moments before the ledger horizon (see ``ledger_horizon``).
+    """
+    as_of = _as_utc(as_of)
+    await _require_retained(session, as_of)
+    snapshot_at = await latest_snapshot_before(session, as_of)
+
+    balances: dict[tuple, Decimal] = {}
+    if snapshot_at is not None:
+        snap_stmt = select(
+            StockSnapshot.item_id, StockSnapshot.location_id, StockSnapshot.qty
+        ).where(StockSnapshot.period_end == snapshot_at)
+        if item_id is not None:
+            snap_stmt = snap_stmt.where(StockSnapshot.item_id == item_id)
+        if location_id is not None:
+            snap_stmt = snap_stmt.where(StockSnapshot.location_id == location_id)
+        for row_item, row_location, qty in await session.execute(snap_stmt):
+            balances[(row_item, row_location)] = Decimal(qty)
+
+    move_stmt = select(
+        StockMovement.item_id,
+        StockMovement.location_id,
+        func.sum(StockMovement.qty_delta),
+    ).where(StockMovement.created_at < as_of)
+    if snapshot_at is not None:
+        move_stmt = move_stmt.where(StockMovement.created_at >= snapshot_at)
+    if item_id is not None:
+        move_stmt = move_stmt.where(StockMovement.item_id == item_id)
+    if location_id is not None:
+        move_stmt = move_stmt.where(StockMovement.location_id == location_id)
+    move_stmt = move_stmt.group_by(StockMovement.item_id, StockMovement.location_id)
+    for row_item, row_location, qty in await session.execute(move_stmt):
+        key = (row_item, row_location)
+        balances[key] = balances.get(key, Decimal(0)) + Decimal(qty)
+    return balances
@@ -1,12 +1,172 @@
 from __future__ import annotations
 
-from typing import Any, Optional
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Iterable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import func, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.entities import MovementType, StockMovement
-from app.services.reorder_service import handle_stock_movement
+from app.core.config import settings
+from app.core.db import upsert_insert
+from app.models.entities import MovementType, StockBalance, StockMovement, StockMovementRef
+from app.services.reorder_evaluator import request_reorder_check
+from app.services.valuation_service import value_movements
+
+
+@dataclass
+class MovementLine:
+    """One document line to post; ``qty_delta`` is signed (negative for stock going out)."""
+
+    item_id: Any
+    qty_delta: Any
+    unit_cost: Any = None
+    details: Optional[dict[str, Any]] = None
+
+
+async def apply_balance_deltas(
+    session: AsyncSession,
+    deltas: dict[tuple, Any],
+    values: Optional[dict[tuple, Any]] = None,
+) -> None:
+    """Apply many ``(item_id, location_id) -> qty_delta`` changes with one multi-row upsert.
+
+    ``values`` carries the matching inventory value deltas from the valuation engine.
+    """
+    if not deltas:
+        return
+    values = values or {}
+    stmt = upsert_insert(session)(StockBalance).values(
+        [
+            {
+                "item_id": item_id,
+                "location_id": location_id,
+                "qty": qty,
+                "value": values.get((item_id, location_id), 0),
+            }
+            for (item_id, location_id), qty in deltas.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StockBalance.item_id, StockBalance.location_id],
+        set_={
+            "qty": StockBalance.qty + stmt.excluded.qty,
+            "value": StockBalance.value + stmt.excluded.value,
+            "updated_at": func.now(),
+        },
+    )
+    await session.execute(stmt)
+
+
+class InsufficientStockError(ValueError):
+    """Raised in strict mode when an outbound movement would take a balance below zero."""
+
+    def __init__(self, shortages: dict[tuple, Decimal]):
+        self.shortages = shortages
+        detail = ", ".join(
+            f"item {item_id} at {location_id} short by {qty}"
+            for (item_id, location_id), qty in shortages.items()
+        )
+        super().__init__(f"Insufficient stock: {detail}")
+
+
+async def lock_balances(session: AsyncSession, pairs: Iterable[tuple]) -> dict[tuple, Decimal]:
+    """Lock the balance rows of ``pairs`` and return their current quantities.
+
+    Missing rows are created first so there is always a row to lock. Rows are inserted and
+    locked in ``(item_id, location_id)`` order, so documents touching overlapping items wait
+    on each other instead of deadlocking. Locks are held until the caller's commit.
+    """
+    ordered = sorted(set(pairs))
+    if not ordered:
+        return {}
+    await session.execute(
+        upsert_insert(session)(StockBalance)
+        .values(
+            [
+                {"item_id": item_id, "location_id": location_id, "qty": 0, "value": 0}
+                for item_id, location_id in ordered
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=[StockBalance.item_id, StockBalance.location_id])
+    )
+    rows = await session.execute(
+        select(StockBalance.item_id, StockBalance.location_id, StockBalance.qty)
+        .where(tuple_(StockBalance.item_id, StockBalance.location_id).in_(ordered))
+        .order_by(StockBalance.item_id, StockBalance.location_id)
+        .with_for_update()
+    )
+    return {(item_id, location_id): Decimal(qty) for item_id, location_id, qty in rows}
+
+
+async def _guard_balances(
+    session: AsyncSession, location_id, movements: list[StockMovement]
+) -> None:
+    """Serialize writers per item/location and, in strict mode, reject oversells."""
+    deltas: dict[tuple, Decimal] = {}
+    for m in movements:
+        key = (m.item_id, location_id)
+        deltas[key] = deltas.get(key, Decimal(0)) + Decimal(m.qty_delta)
+    available = await lock_balances(session, deltas)
+    if not settings.stock_strict_mode:
+        return
+    shortages = {
+        key: -(available[key] + delta)
+        for key, delta in deltas.items()
+        if delta < 0 and available[key] + delta < 0
+    }
+    if shortages:
+        raise InsufficientStockError(shortages)
+
+
+@dataclass
+class PostingResult:
+    """Outcome of an idempotent post; ``created`` is False when the movement already existed."""
+
+    movement: StockMovement
+    created: bool
+
+
+async def _insert_movements(
+    session: AsyncSession, rows: list[dict[str, Any]]
+) -> list[StockMovement]:
+    """Insert the movements whose idempotency key is not taken yet and return them.
+
+    Keys are claimed with INSERT ... ON CONFLICT DO NOTHING RETURNING on
+    ``stock_movement_refs``; only the winners are written to the (partitioned) ledger, so
+    concurrent or retried posts of the same reference neither fail nor double-count.
+    """
+    claimed = await session.execute(
+        upsert_insert(session)(StockMovementRef)
+        .values(
+            [
+                {
+                    "ref_type": row["ref_type"],
+                    "ref_id": row["ref_id"],
+                    "movement_type": row["movement_type"],
+                    "item_id": row["item_id"],
+                    "movement_id": row["id"],
+                }
+                for row in rows
+            ]
+        )
+        .on_conflict_do_nothing(
+            index_elements=[
+                StockMovementRef.ref_type,
+                StockMovementRef.ref_id,
+                StockMovementRef.movement_type,
+                StockMovementRef.item_id,
+            ]
+        )
+        .returning(StockMovementRef.movement_id)
+    )
+    claimed_ids = set(claimed.scalars())
+    new_rows = [row for row in rows if row["id"] in claimed_ids]
+    if not new_rows:
+        return []
+    result = await session.scalars(insert(StockMovement).values(new_rows).returning(StockMovement))
+    return list(result.all())
 
 
 async def post_stock_movement(
@@ -21,32 +181,163 @@ async def post_stock_movement(
     ref_id,
     details: Optional[dict[str, Any]] = None,
 ) -> StockMovement:
-    """Idempotently post a stock movement for a given reference and item."""
-    result = await session.execute(
-        select(StockMovement).where(
-            StockMovement.ref_type == ref_type,
-            StockMovement.ref_id == ref_id,
-            StockMovement.movement_type == movement_type,
-            StockMovement.item_id == item_id,
-        )
-    )
-    existing = result.scalar_one_or_none()
-    if existing:
-        return existing
+    """Idempotently post a stock movement for a given reference and item.
 
-    movement = StockMovement(
+    The movement, the matching ``stock_balances`` quantity and value update and (inline
+    mode) the reorder outcome are committed together.
+    """
+    result = await post_stock_movement_once(
+        session,
         item_id=item_id,
         location_id=location_id,
-        ref_type=ref_type,
-        ref_id=ref_id,
         movement_type=movement_type,
         qty_delta=qty_delta,
         unit_cost=unit_cost,
-        details=details or {},
+        ref_type=ref_type,
+        ref_id=ref_id,
+        details=details,
+    )
+    return result.movement
+
+
+async def post_stock_movement_once(
+    session: AsyncSession,
+    *,
+    item_id,
+    location_id,
+    movement_type: MovementType,
+    qty_delta,
+    unit_cost=None,
+    ref_type: str,
+    ref_id,
+    details: Optional[dict[str, Any]] = None,
+) -> PostingResult:
+    """Post a movement with a single conflict-tolerant INSERT and report whether it was new.
+
+    Balance, reorder and alert work only happens for new rows; a retry costs one round-trip
+    plus a lookup of the row that won. In strict mode an oversell rolls the post back and
+    raises ``InsufficientStockError``. Reorder evaluation is handed to the background
+    evaluator when it runs, keeping rule and endpoint counts off the posting latency.
+    """
+    created = await _insert_movements(
+        session,
+        [
+            {
+                "id": uuid.uuid4(),
+                "item_id": item_id,
+                "location_id": location_id,
+                "ref_type": ref_type,
+                "ref_id": ref_id,
+                "movement_type": movement_type,
+                "qty_delta": qty_delta,
+                "unit_cost": unit_cost,
+                "details": details or {},
+            }
+        ],
     )
-    session.add(movement)
+    if not created:
+        existing = (
+            await session.execute(
+                select(StockMovement)
+                .join(StockMovementRef, StockMovementRef.movement_id == StockMovement.id)
+                .where(
+                    StockMovementRef.ref_type == ref_type,
+                    StockMovementRef.ref_id == ref_id,
+                    StockMovementRef.movement_type == movement_type,
+                    StockMovementRef.item_id == item_id,
+                )
+            )
+        ).scalar_one()
+        return PostingResult(movement=existing, created=False)
+    movement = created[0]
+
+    try:
+        await _guard_balances(session, location_id, created)
+    except InsufficientStockError:
+        await session.rollback()
+        raise
+    values = await value_movements(session, location_id, created)
+    await apply_balance_deltas(session, {(item_id, location_id): qty_delta}, values)
+    await request_reorder_check(session, [(item_id, location_id)])
     await session.commit()
-    await session.refresh(movement)
-    await handle_stock_movement(session, item_id=item_id, location_id=location_id)
-    return movement
+    return PostingResult(movement=movement, created=True)
+
+
+def _merge_lines(lines: Iterable[MovementLine]) -> dict[Any, MovementLine]:
+    """Collapse repeated items into one line; the ledger holds one movement per item and ref."""
+    merged: dict[Any, MovementLine] = {}
+    for line in lines:
+        current = merged.get(line.item_id)
+        if current is None:
+            merged[line.item_id] = MovementLine(
+                item_id=line.item_id,
+                qty_delta=Decimal(str(line.qty_delta)),
+                unit_cost=line.unit_cost,
+                details=line.details,
+            )
+            continue
+        qty = Decimal(str(line.qty_delta))
+        total = current.qty_delta + qty
+        if current.unit_cost is not None and line.unit_cost is not None and total:
+            current.unit_cost = (
+                Decimal(str(current.unit_cost)) * current.qty_delta
+                + Decimal(str(line.unit_cost)) * qty
+            ) / total
+        current.qty_delta = total
+    return merged
+
+
+async def post_stock_movements(
+    session: AsyncSession,
+    *,
+    location_id,
+    movement_type: MovementType,
+    ref_type: str,
+    ref_id,
+    lines: Iterable[MovementLine],
+) -> list[StockMovement]:
+    """Idempotently post every line of one document as a single unit of work.
+
+    Idempotency keys are claimed with one multi-row INSERT ... ON CONFLICT DO NOTHING
+    RETURNING and only the new movements are inserted, so lines already posted for the
+    reference are skipped without a lookup. The inserted rows are costed incrementally,
+    their quantity and value changes are one multi-row upsert and the reorder check is
+    requested once for all touched items. Nothing is committed here: the caller commits
+    together with its document status change, so a failure leaves the whole document
+    unposted.
+    Returns the movements that were newly created.
 
+    Balance rows are locked in a fixed order before costing; in strict mode an oversell on
+    any line raises ``InsufficientStockError`` and the caller must roll back.
+    """
+    merged = _merge_lines(lines)
+    if not merged:
+        return []
+
+    movements = await _insert_movements(
+        session,
+        [
+            {
+                "id": uuid.uuid4(),
+                "item_id": line.item_id,
+                "location_id": location_id,
+                "ref_type": ref_type,
+                "ref_id": ref_id,
+                "movement_type": movement_type,
+                "qty_delta": line.qty_delta,
+                "unit_cost": line.unit_cost,
+                "details": line.details or {},
+            }
+            for line in merged.values()
+        ],
+    )
+    if not movements:
+        return []
+
+    await _guard_balances(session, location_id, movements)
+    values = await value_movements(session, location_id, movements)
+    await apply_balance_deltas(
+        session, {(m.item_id, location_id): m.qty_delta for m in movements}, values
+    )
+    await request_reorder_check(session, [(m.item_id, location_id) for m in movements])
+    return movements
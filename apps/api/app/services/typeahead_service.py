@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import chain, count
+from typing import Any, Iterable, Optional
+
+from rapidfuzz import fuzz, process
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.entities import Item
+
+logger = logging.getLogger(__name__)
+
+_CHANGES_KEY = "typeahead_item_changes"
+# Word prefixes are indexed up to this length; longer query words are cut to it and left
+# to the rapidfuzz ranking to tell apart.
+_PREFIX_LEN = 8
+# Batches larger than this rebuild the sorted phrase list in one sort instead of inserting
+# each key into it.
+_BULK_APPLY = 1000
+
+
+@dataclass(frozen=True)
+class TypeaheadEntry:
+    id: Any
+    item_code: str
+    sku: str
+    name: str
+    barcode: Optional[str]
+    uom: Optional[str]
+
+    @property
+    def label(self) -> str:
+        return f"{self.name} {self.item_code}".lower()
+
+    @property
+    def codes(self) -> set[str]:
+        return {c.lower() for c in (self.item_code, self.sku, self.barcode) if c}
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _prefixes(text: str) -> set[str]:
+    return {word[:n] for word in text.split() for n in range(1, min(len(word), _PREFIX_LEN) + 1)}
+
+
+def _phrases(entry: TypeaheadEntry) -> set[str]:
+    """Keys of the sorted phrase list: the codes, and the name from each word onwards."""
+    words = entry.name.lower().split()
+    return {" ".join(words[n:]) for n in range(len(words))} | entry.codes
+
+
+def _entry(item: Item) -> TypeaheadEntry:
+    return TypeaheadEntry(
+        id=item.id,
+        item_code=item.item_code,
+        sku=item.sku,
+        name=item.name,
+        barcode=item.barcode,
+        uom=item.uom,
+    )
+
+
+class ItemTypeahead:
+    """In-memory lookup of active items by partial name, code or barcode.
+
+    Exact codes and barcodes resolve through a dict; other queries collect at most
+    ``max_candidates`` candidates (see :meth:`_candidates`) and rank them with rapidfuzz.
+    Local commits patch the index through session hooks; changes made by other processes
+    are picked up by polling ``updated_at`` every ``refresh_interval`` seconds, and hard
+    deletes by reconciling ids whenever the active-item count disagrees with the index.
+    """
+
+    def __init__(self, refresh_interval: float, max_candidates: int):
+        self.refresh_interval = refresh_interval
+        self.max_candidates = max_candidates
+        # Postings hold small integer slots rather than item ids: hashing a UUID is a Python
+        # method call and dominated lookup time on large catalogs.
+        self._slots: dict[Any, int] = {}
+        self._next_slot = count()
+        self._entries: dict[int, TypeaheadEntry] = {}
+        self._labels: dict[int, str] = {}
+        self._codes: dict[str, set[int]] = {}
+        self._prefixes: dict[str, set[int]] = {}
+        self._grams: dict[str, set[int]] = {}
+        # (phrase, slot) pairs kept sorted, so prefix matches come out in key order.
+        self._ordered: list[tuple[str, int]] = []
+        self._bind: Any = None
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._bind is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _keys(self, entry: TypeaheadEntry):
+        words = " ".join((entry.name, *entry.codes)).lower()
+        yield self._codes, entry.codes
+        yield self._prefixes, _prefixes(words)
+        yield self._grams, _trigrams(entry.name.lower())
+
+    def _add(self, entry: TypeaheadEntry, ordered: bool = True) -> None:
+        self._discard(entry.id, ordered)
+        slot = self._slots[entry.id] = next(self._next_slot)
+        self._entries[slot] = entry
+        self._labels[slot] = entry.label
+        for index, keys in self._keys(entry):
+            for key in keys:
+                index.setdefault(key, set()).add(slot)
+        if ordered:
+            for phrase in _phrases(entry):
+                insort(self._ordered, (phrase, slot))
+
+    def _discard(self, item_id, ordered: bool = True) -> None:
+        slot = self._slots.pop(item_id, None)
+        if slot is None:
+            return
+        entry = self._entries.pop(slot)
+        del self._labels[slot]
+        if ordered:
+            for phrase in _phrases(entry):
+                at = bisect_left(self._ordered, (phrase, slot))
+                if at < len(self._ordered) and self._ordered[at] == (phrase, slot):
+                    del self._ordered[at]
+        for index, keys in self._keys(entry):
+            for key in keys:
+                slots = index.get(key)
+                if slots is not None:
+                    slots.discard(slot)
+                    if not slots:
+                        del index[key]
+
+    def apply(self, changes: Iterable[tuple[TypeaheadEntry, bool]]) -> None:
+        """Apply ``(entry, keep)`` pairs; ``keep`` is False for deleted or inactive items."""
+        changes = list(changes)
+        ordered = len(changes) <= _BULK_APPLY
+        for entry, keep in changes:
+            if keep:
+                self._add(entry, ordered)
+            else:
+                self._discard(entry.id, ordered)
+        if not ordered:
+            entries = self._entries.items()
+            self._ordered = sorted(
+                (phrase, slot) for slot, entry in entries for phrase in _phrases(entry)
+            )
+
+    async def load(self, session: AsyncSession) -> None:
+        """(Re)build the whole index from the items table."""
+        self._slots, self._entries, self._labels = {}, {}, {}
+        self._codes, self._prefixes, self._grams = {}, {}, {}
+        self._ordered = []
+        self._watermark = None
+        self._bind = None
+        await self.refresh(session)
+        self._bind = session.get_bind()
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        if self._bind is not session.get_bind():
+            await self.load(session)
+
+    async def refresh(self, session: AsyncSession) -> int:
+        """Pull items changed since the last refresh; returns how many rows were applied."""
+        stmt = select(
+            Item.id,
+            Item.item_code,
+            Item.sku,
+            Item.name,
+            Item.barcode,
+            Item.uom,
+            Item.active,
+            Item.updated_at,
+        )
+        if self._watermark is not None:
+            stmt = stmt.where(Item.updated_at >= self._watermark)
+        rows = (await session.execute(stmt)).all()
+        self.apply((TypeaheadEntry(*row[:6]), row.active) for row in rows)
+        stamps = [row.updated_at for row in rows if row.updated_at is not None]
+        if self._watermark is not None:
+            stamps.append(self._watermark)
+        if stamps:
+            self._watermark = max(stamps)
+        await self._reconcile(session)
+        return len(rows)
+
+    async def _reconcile(self, session: AsyncSession) -> None:
+        """Drop items hard-deleted elsewhere; they leave no ``updated_at`` to poll for.
+
+        Inactive items are discarded by the delta above, so after it the index can only be
+        larger than the active count if rows disappeared; only then are the ids compared.
+        """
+        active = Item.active.is_(True)
+        total = await session.scalar(select(func.count()).select_from(Item).where(active))
+        if total == len(self._entries):
+            return
+        live = set((await session.execute(select(Item.id).where(active))).scalars())
+        for item_id in [item_id for item_id in self._slots if item_id not in live]:
+            self._discard(item_id)
+
+    def _phrase_matches(self, query: str) -> list[int]:
+        matched: list[int] = []
+        seen: set[int] = set()
+        at = bisect_left(self._ordered, (query,))
+        while at < len(self._ordered) and len(matched) < self.max_candidates:
+            phrase, slot = self._ordered[at]
+            if not phrase.startswith(query):
+                break
+            if slot not in seen:
+                seen.add(slot)
+                matched.append(slot)
+            at += 1
+        return matched
+
+    def _word_matches(self, query: str) -> set[int]:
+        words = [word[:_PREFIX_LEN] for word in query.split()]
+        postings = sorted((self._prefixes.get(word, set()) for word in words), key=len)
+        if postings and postings[0]:
+            # Every query word starts a word of the item: intersect from the rarest prefix.
+            matched = postings[0]
+            for slots in postings[1:]:
+                matched = matched & slots
+            if matched:
+                return matched
+        # A typo: narrow from the rarest name trigram but stop before the set empties, keeping
+        # the items that share most of the query's trigrams.
+        postings = sorted((self._grams.get(gram, set()) for gram in _trigrams(query)), key=len)
+        postings = [slots for slots in postings if slots]
+        if not postings:
+            # No trigram in common either: rank whatever shares the first two characters.
+            return set(chain.from_iterable(self._prefixes.get(word[:2], ()) for word in words))
+        matched = postings[0]
+        for slots in postings[1:]:
+            narrowed = matched & slots
+            if not narrowed:
+                break
+            matched = narrowed
+        return matched
+
+    def _candidates(self, query: str) -> list[int]:
+        """Slots worth scoring for ``query``: at most ``max_candidates``, strongest first.
+
+        Items where the query starts a code or a run of name words come first, walked in key
+        order from the sorted phrase list, so the cap never drops them for weaker matches.
+        Any room left goes to items matching every query word as a word prefix (or, for a
+        typo, sharing most of its trigrams), shortest label first.
+        """
+        found = self._phrase_matches(query)
+        room = self.max_candidates - len(found)
+        if room > 0:
+            rest = self._word_matches(query).difference(found)
+            labels = self._labels
+            found.extend(heapq.nsmallest(room, rest, key=lambda slot: len(labels[slot])))
+        return found
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[TypeaheadEntry, float]]:
+        """Return up to ``limit`` ``(entry, score)`` pairs, best first (score 0-100)."""
+        query = query.strip().lower()
+        if not query:
+            return []
+        seen = self._codes.get(query, set())
+        exact = [(self._entries[slot], 100.0) for slot in seen]
+        choices = {slot: self._labels[slot] for slot in self._candidates(query) if slot not in seen}
+        ranked = process.extract(
+            query, choices, scorer=fuzz.partial_ratio, processor=None, limit=limit, score_cutoff=50
+        )
+        fuzzy = [(self._entries[slot], score) for _, score, slot in ranked]
+        return (exact + fuzzy)[:limit]
+
+    def start(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(session_maker))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        while True:
+            try:
+                async with session_maker() as session:
+                    if self._bind is not session.get_bind():
+                        await self.load(session)
+                        logger.info("Typeahead index loaded with %d items", len(self))
+                    else:
+                        await self.refresh(session)
+            except Exception:  # noqa: BLE001
+                logger.exception("Typeahead index refresh failed")
+            await asyncio.sleep(self.refresh_interval)
+
+
+item_typeahead = ItemTypeahead(
+    refresh_interval=settings.typeahead_refresh_seconds,
+    max_candidates=settings.typeahead_max_candidates,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_item_changes(session: Session, _flush_context) -> None:
+    changes = session.info.setdefault(_CHANGES_KEY, [])
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Item):
+            changes.append((_entry(obj), bool(obj.active)))
+    for obj in session.deleted:
+        if isinstance(obj, Item):
+            changes.append((_entry(obj), False))
+    if not changes:
+        session.info.pop(_CHANGES_KEY)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_item_changes(session: Session) -> None:
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes and item_typeahead._bind is session.get_bind():
+        item_typeahead.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_item_changes(session: Session) -> None:
+    session.info.pop(_CHANGES_KEY, None)
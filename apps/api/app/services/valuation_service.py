@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from decimal import Decimal
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import insert_many
+from app.models.entities import (
+    CostLayer,
+    Item,
+    ItemCategory,
+    StockBalance,
+    StockMovement,
+    StockSnapshot,
+    StoreLocation,
+)
+from app.services.snapshot_service import ledger_horizon
+
+VALUATION_METHODS = ("average", "fifo")
+_VALUE_PLACES = Decimal("0.0001")
+
+
+def _method(method: Optional[str]) -> str:
+    method = method or settings.stock_valuation_method
+    if method not in VALUATION_METHODS:
+        raise ValueError(f"Unknown valuation method: {method}")
+    return method
+
+
+@dataclass
+class _Layer:
+    unit_cost: Decimal
+    qty: Decimal
+    received_at: datetime
+    movement_id: Any = None
+    id: Any = None
+    # Quantity as loaded from the database; None for layers created in this unit of work.
+    stored_qty: Optional[Decimal] = None
+
+
+@dataclass
+class CostState:
+    """On-hand quantity, value and open FIFO layers of one item/location.
+
+    Only stock on hand carries value: receipts first cover any negative quantity and
+    issues beyond the quantity on hand are valued at zero.
+    """
+
+    method: str
+    qty: Decimal = Decimal(0)
+    value: Decimal = Decimal(0)
+    layers: list[_Layer] = field(default_factory=list)
+    consumed: list[_Layer] = field(default_factory=list)
+
+    def unit_cost(self) -> Decimal:
+        if self.method == "fifo" and self.layers:
+            return self.layers[-1].unit_cost
+        if self.qty > 0:
+            return self.value / self.qty
+        return Decimal(0)
+
+    def apply(self, qty_delta, unit_cost, received_at: datetime, movement_id=None) -> Decimal:
+        """Apply one movement and return the resulting change in value."""
+        qty_delta = Decimal(str(qty_delta))
+        before = self.value
+        on_hand = max(self.qty, Decimal(0))
+        if qty_delta > 0:
+            cost = Decimal(str(unit_cost)) if unit_cost is not None else self.unit_cost()
+            valued = min(qty_delta, max(self.qty + qty_delta, Decimal(0)))
+            if self.method == "fifo":
+                if valued > 0:
+                    self.layers.append(_Layer(cost, valued, received_at, movement_id))
+                self.value = self._layer_value()
+            else:
+                self.value += valued * cost
+        elif qty_delta < 0:
+            issued = min(-qty_delta, on_hand)
+            if self.method == "fifo":
+                self._consume(issued)
+                self.value = self._layer_value()
+            elif issued == on_hand:
+                self.value = Decimal(0)
+            else:
+                self.value -= self.value * issued / on_hand
+        self.qty += qty_delta
+        self.value = self.value.quantize(_VALUE_PLACES)
+        return self.value - before
+
+    def _consume(self, qty: Decimal) -> None:
+        while qty > 0 and self.layers:
+            layer = self.layers[0]
+            taken = min(layer.qty, qty)
+            layer.qty -= taken
+            qty -= taken
+            if layer.qty == 0:
+                self.consumed.append(self.layers.pop(0))
+
+    def _layer_value(self) -> Decimal:
+        return sum((layer.qty * layer.unit_cost for layer in self.layers), Decimal(0))
+
+
+async def _load_states(
+    session: AsyncSession, location_id, item_ids: set, method: str
+) -> dict[Any, CostState]:
+    states = {item_id: CostState(method) for item_id in item_ids}
+    balances = await session.execute(
+        select(StockBalance.item_id, StockBalance.qty, StockBalance.value).where(
+            StockBalance.location_id == location_id, StockBalance.item_id.in_(item_ids)
+        )
+    )
+    for item_id, qty, value in balances:
+        states[item_id].qty = Decimal(qty)
+        states[item_id].value = Decimal(value)
+    if method == "fifo":
+        layers = await session.scalars(
+            select(CostLayer)
+            .where(CostLayer.location_id == location_id, CostLayer.item_id.in_(item_ids))
+            .order_by(CostLayer.item_id, CostLayer.received_at, CostLayer.id)
+        )
+        for layer in layers:
+            qty = Decimal(layer.qty_remaining)
+            states[layer.item_id].layers.append(
+                _Layer(
+                    Decimal(layer.unit_cost),
+                    qty,
+                    layer.received_at,
+                    layer.movement_id,
+                    layer.id,
+                    qty,
+                )
+            )
+    return states
+
+
+def _new_layer_rows(states: dict[tuple, CostState]) -> list[dict]:
+    return [
+        {
+            "item_id": item_id,
+            "location_id": location_id,
+            "movement_id": layer.movement_id,
+            "unit_cost": layer.unit_cost,
+            "qty_remaining": layer.qty,
+            "received_at": layer.received_at,
+        }
+        for (item_id, location_id), state in states.items()
+        for layer in state.layers
+        if layer.id is None
+    ]
+
+
+async def _save_layers(session: AsyncSession, states: dict[tuple, CostState]) -> None:
+    """Write back only the layers that changed: delete consumed, update partial, add new."""
+    consumed = [
+        layer.id for s in states.values() for layer in s.consumed if layer.id is not None
+    ]
+    changed = [
+        {"id": layer.id, "qty_remaining": layer.qty}
+        for s in states.values()
+        for layer in s.layers
+        if layer.id is not None and layer.qty != layer.stored_qty
+    ]
+    if consumed:
+        await session.execute(delete(CostLayer).where(CostLayer.id.in_(consumed)))
+    if changed:
+        await session.execute(update(CostLayer), changed)
+    await insert_many(session, CostLayer, _new_layer_rows(states))
+
+
+async def value_movements(
+    session: AsyncSession,
+    location_id,
+    movements: Sequence[StockMovement],
+    method: Optional[str] = None,
+) -> dict[tuple, Decimal]:
+    """Cost newly posted movements of one location and return value deltas per balance key.
+
+    Only the touched balances (and, for FIFO, their open layers) are read, so the work is
+    proportional to the document rather than the ledger. Must run before the quantity
+    deltas are applied to ``stock_balances``.
+    """
+    if not movements:
+        return {}
+    method = _method(method)
+    states = await _load_states(session, location_id, {m.item_id for m in movements}, method)
+    # Layers are ordered by when they were costed; ledger timestamps can tie within a
+    # transaction or on coarse clocks.
+    costed_at = datetime.now(UTC)
+    deltas: dict[tuple, Decimal] = {}
+    for movement in movements:
+        key = (movement.item_id, location_id)
+        deltas[key] = deltas.get(key, Decimal(0)) + states[movement.item_id].apply(
+            movement.qty_delta, movement.unit_cost, costed_at, movement.id
+        )
+    if method == "fifo":
+        await _save_layers(
+            session, {(item_id, location_id): state for item_id, state in states.items()}
+        )
+    return deltas
+
+
+async def _seed_from_snapshot(
+    session: AsyncSession, period_end: datetime, method: str
+) -> dict[tuple, CostState]:
+    """Opening states from a valued snapshot; FIFO stock opens as one layer at average cost."""
+    rows = await session.execute(
+        select(
+            StockSnapshot.item_id, StockSnapshot.location_id, StockSnapshot.qty, StockSnapshot.value
+        ).where(StockSnapshot.period_end == period_end)
+    )
+    states: dict[tuple, CostState] = {}
+    for item_id, location_id, qty, value in rows:
+        if value is None:
+            raise ValueError(f"Stock snapshot at {period_end.isoformat()} has not been valued")
+        state = states[(item_id, location_id)] = CostState(method, Decimal(qty), Decimal(value))
+        if method == "fifo" and state.qty > 0 and state.value > 0:
+            unit_cost = (state.value / state.qty).quantize(_VALUE_PLACES)
+            state.layers.append(_Layer(unit_cost, state.qty, period_end))
+    return states
+
+
+async def _replay(
+    session: AsyncSession, method: str, until: Optional[datetime], chunk_size: int
+) -> dict[tuple, CostState]:
+    """Cost the retained ledger up to ``until`` (exclusive), starting at the ledger horizon.
+
+    With no detached partitions this is the whole ledger; otherwise the valued snapshot at
+    the horizon stands in for the movements before it.
+    """
+    horizon = await ledger_horizon(session)
+    states = await _seed_from_snapshot(session, horizon, method) if horizon else {}
+    stmt = select(
+        StockMovement.item_id,
+        StockMovement.location_id,
+        StockMovement.qty_delta,
+        StockMovement.unit_cost,
+        StockMovement.created_at,
+        StockMovement.id,
+    )
+    if horizon is not None:
+        stmt = stmt.where(StockMovement.created_at >= horizon)
+    if until is not None:
+        stmt = stmt.where(StockMovement.created_at < until)
+    result = await session.stream(
+        # Receipts sort before issues that share a timestamp so ties never fake a shortfall.
+        stmt.order_by(StockMovement.created_at, StockMovement.qty_delta.desc(), StockMovement.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    async for item_id, location_id, qty_delta, unit_cost, created_at, movement_id in result:
+        state = states.get((item_id, location_id))
+        if state is None:
+            state = states[(item_id, location_id)] = CostState(method)
+        state.apply(qty_delta, unit_cost, created_at, movement_id)
+    return states
+
+
+async def value_snapshot(
+    session: AsyncSession,
+    period_end: datetime,
+    method: Optional[str] = None,
+    chunk_size: int = 5000,
+) -> int:
+    """Store the inventory value of every row of the snapshot at ``period_end``.
+
+    Done before detaching the partitions that precede it, so ``rebuild_valuation`` can start
+    from this snapshot. Nothing is committed; returns the number of rows valued.
+    """
+    method = _method(method)
+    states = await _replay(session, method, period_end, chunk_size)
+    await session.execute(
+        update(StockSnapshot).where(StockSnapshot.period_end == period_end).values(value=0)
+    )
+    values = [
+        {
+            "period_end": period_end,
+            "item_id": item_id,
+            "location_id": location_id,
+            "value": state.value,
+        }
+        for (item_id, location_id), state in states.items()
+        if state.value
+    ]
+    for start in range(0, len(values), chunk_size):
+        await session.execute(update(StockSnapshot), values[start : start + chunk_size])
+    return len(values)
+
+
+async def rebuild_valuation(
+    session: AsyncSession, method: Optional[str] = None, chunk_size: int = 5000
+) -> dict[str, int]:
+    """Replay the retained ledger and rewrite balance values and cost layers.
+
+    Used for backfills and after changing ``STOCK_VALUATION_METHOD``; normal posting keeps
+    valuation current incrementally. Once partitions are detached the replay opens from the
+    valued snapshot at the ledger horizon, whose value was costed with the method in force
+    when it was written.
+    """
+    method = _method(method)
+    states = await _replay(session, method, None, chunk_size)
+
+    await session.execute(delete(CostLayer))
+    await session.execute(update(StockBalance).values(value=0))
+    values = [
+        {"item_id": item_id, "location_id": location_id, "value": state.value}
+        for (item_id, location_id), state in states.items()
+        if state.value
+    ]
+    for start in range(0, len(values), chunk_size):
+        await session.execute(update(StockBalance), values[start : start + chunk_size])
+    layers = _new_layer_rows(states)
+    await insert_many(session, CostLayer, layers)
+    await session.commit()
+    return {"balances": len(values), "layers": len(layers)}
+
+
+async def get_valuation(session: AsyncSession, location_id=None) -> dict[str, list[dict]]:
+    """Return on-hand quantity and value totals grouped by location and by item category."""
+    qty = func.coalesce(func.sum(StockBalance.qty), 0)
+    value = func.coalesce(func.sum(StockBalance.value), 0)
+    filters = [StockBalance.location_id == location_id] if location_id is not None else []
+
+    by_location = await session.execute(
+        select(StoreLocation.id, StoreLocation.name, qty, value)
+        .select_from(StockBalance)
+        .join(StoreLocation, StoreLocation.id == StockBalance.location_id)
+        .where(*filters)
+        .group_by(StoreLocation.id, StoreLocation.name)
+        .order_by(StoreLocation.name)
+    )
+    category_name = func.coalesce(ItemCategory.name, ItemCategory.category1)
+    by_category = await session.execute(
+        select(ItemCategory.id, category_name, qty, value)
+        .select_from(StockBalance)
+        .join(Item, Item.id == StockBalance.item_id)
+        .outerjoin(ItemCategory, ItemCategory.id == Item.category_id)
+        .where(*filters)
+        .group_by(ItemCategory.id, category_name)
+        .order_by(category_name)
+    )
+    return {
+        "by_location": [
+            {"id": id_, "name": name, "qty": Decimal(q), "value": Decimal(v)}
+            for id_, name, q, v in by_location
+        ],
+        "by_category": [
+            {"id": id_, "name": name, "qty": Decimal(q), "value": Decimal(v)}
+            for id_, name, q, v in by_category
+        ],
+    }
@@ -3,94 +3,733 @@ from __future__ import annotations
 import asyncio
 import hmac
 import json
-from datetime import datetime, timedelta, timezone
-from typing import Any, Iterable
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
+from typing import Any, Iterable, Optional
 
 import httpx
-from sqlalchemy import and_, select
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import and_, bindparam, case, cast, event, func, select, text, true, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, selectinload
 
+from app.core.config import settings
+from app.core.db import dialect_name, insert_many
 from app.models.entities import WebhookDelivery, WebhookDeliveryStatus, WebhookEndpoint
 
+logger = logging.getLogger(__name__)
+
+
+NOTIFY_CHANNEL = "webhook_deliveries"
+ENDPOINTS_CHANNEL = "webhook_endpoints_changed"
+_ENDPOINTS_CHANGED_KEY = "webhook_endpoints_changed"
+
 
 def _signature(secret: str, body: bytes) -> str:
     return hmac.new(secret.encode("utf-8"), body, "sha256").hexdigest()
 
 
 async def enqueue_event(session: AsyncSession, event_type: str, payload: dict) -> None:
-    endpoints = (
-        await session.execute(
-            select(WebhookEndpoint).where(
-                WebhookEndpoint.active.is_(True),
-                WebhookEndpoint.events.contains([event_type]),
+    await enqueue_events(session, [(event_type, payload)])
+    await session.commit()
+
+
+class WebhookSubscriptions:
+    """Process-local index of ``event_type -> active endpoint ids``.
+
+    Built with one query and reused until invalidated: locally after any commit that
+    changed an endpoint, from other replicas through ``NOTIFY webhook_endpoints_changed``
+    (on PostgreSQL), and otherwise after ``ttl`` seconds as a backstop. The index is tied
+    to the engine it was loaded from.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._index: Optional[dict[str, tuple]] = None
+        self._bind: Any = None
+        self._loaded_at = 0.0
+        self._generation = 0
+
+    def invalidate(self, *_args) -> None:
+        """Drop the index; also the asyncpg NOTIFY callback."""
+        self._index = None
+        self._generation += 1
+
+    @staticmethod
+    async def _load(session: AsyncSession) -> dict[str, tuple]:
+        index: dict[str, list] = {}
+        rows = await session.execute(
+            select(WebhookEndpoint.id, WebhookEndpoint.events).where(
+                WebhookEndpoint.active.is_(True)
             )
         )
-    ).scalars()
-
-    for ep in endpoints:
-        delivery = WebhookDelivery(
-            endpoint_id=ep.id,
-            event_type=event_type,
-            payload=payload,
-            status=WebhookDeliveryStatus.PENDING,
-            attempts=0,
+        for endpoint_id, events in rows:
+            for event_type in events:
+                index.setdefault(event_type, []).append(endpoint_id)
+        return {event_type: tuple(ids) for event_type, ids in index.items()}
+
+    async def get(self, session: AsyncSession) -> dict[str, tuple]:
+        # A transaction that changed endpoints itself must see its own, uncommitted rows.
+        if session.info.get(_ENDPOINTS_CHANGED_KEY):
+            return await self._load(session)
+        bind = session.bind
+        fresh = time.monotonic() - self._loaded_at < self.ttl
+        if self._index is not None and self._bind is bind and fresh:
+            return self._index
+        generation = self._generation
+        index = await self._load(session)
+        # An invalidation that raced with the load means the rows may already be stale.
+        if generation == self._generation:
+            self._index, self._bind, self._loaded_at = index, bind, time.monotonic()
+        return index
+
+
+webhook_subscriptions = WebhookSubscriptions(ttl=settings.webhook_subscription_ttl_seconds)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_endpoint_changes(session: Session, _flush_context) -> None:
+    changed = (*session.new, *session.dirty, *session.deleted)
+    if not any(isinstance(obj, WebhookEndpoint) for obj in changed):
+        return
+    notify = session.get_bind().dialect.name == "postgresql"
+    if notify and not session.info.get(_ENDPOINTS_CHANGED_KEY):
+        session.connection().execute(
+            text("SELECT pg_notify(:channel, '')"), {"channel": ENDPOINTS_CHANNEL}
         )
-        session.add(delivery)
-    await session.commit()
+    session.info[_ENDPOINTS_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_subscriptions(session: Session) -> None:
+    if session.info.pop(_ENDPOINTS_CHANGED_KEY, None):
+        webhook_subscriptions.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_endpoint_changes(session: Session) -> None:
+    session.info.pop(_ENDPOINTS_CHANGED_KEY, None)
+
+
+async def enqueue_events(session: AsyncSession, events: Iterable[tuple[str, dict]]) -> None:
+    """Stage deliveries for many ``(event_type, payload)`` pairs without committing.
+
+    Subscribers come from the in-memory subscription index, so a warm enqueue is a single
+    multi-row INSERT with no endpoint lookup. On PostgreSQL a NOTIFY is queued in the same
+    transaction, so listening workers wake as soon as the caller commits (and not at all
+    on rollback).
+    """
+    events = list(events)
+    if not events:
+        return
+    subscribers = await webhook_subscriptions.get(session)
+    rows = [
+        {
+            "endpoint_id": endpoint_id,
+            "event_type": event_type,
+            "payload": payload,
+            "status": WebhookDeliveryStatus.PENDING,
+            "attempts": 0,
+        }
+        for event_type, payload in events
+        for endpoint_id in subscribers.get(event_type, ())
+    ]
+    await insert_many(session, WebhookDelivery, rows)
+    if rows and dialect_name(session) == "postgresql":
+        await session.execute(text("SELECT pg_notify(:channel, '')"), {"channel": NOTIFY_CHANNEL})
+
 
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
-async def deliver_pending(session: AsyncSession, limit: int = 20) -> None:
-    now = datetime.now(timezone.utc)
-    deliveries = (
+
+class WebhookDispatcher:
+    """Sends pending deliveries concurrently over one long-lived, pooled HTTP client.
+
+    At most ``concurrency`` requests are in flight overall and ``per_endpoint`` per
+    receiver; a request takes its endpoint slot before a global one, so a slow endpoint
+    only ties up its own slots. Batches are leased to ``worker_id`` so any number of
+    processes can drain the queue without sending a delivery twice while its lease holds.
+    Keep-alive connections (and HTTP/2 when enabled and ``h2`` is installed) are reused
+    across polls. Endpoints that opt into batching receive many deliveries per request as
+    one signed JSON array.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int,
+        concurrency: int,
+        per_endpoint: int,
+        timeout: float,
+        http2: bool = False,
+        lease_seconds: int = 300,
+        max_attempts: int = 12,
+        max_backoff: int = 3600,
+        breaker_threshold: int = 5,
+        breaker_cooldown: int = 60,
+        subscriptions: Optional[WebhookSubscriptions] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.per_endpoint = per_endpoint
+        self.timeout = timeout
+        self.http2 = http2
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.subscriptions = subscriptions
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._global = asyncio.Semaphore(concurrency)
+        self._endpoint_slots: dict[Any, asyncio.Semaphore] = {}
+        self._wake = asyncio.Event()
+        self._flush_in: Optional[float] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            http2 = self.http2 and _http2_available()
+            if self.http2 and not http2:
+                logger.warning("WEBHOOK_HTTP2 is set but h2 is not installed; using HTTP/1.1")
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _slots(self, endpoint_id) -> asyncio.Semaphore:
+        slots = self._endpoint_slots.get(endpoint_id)
+        if slots is None:
+            slots = self._endpoint_slots[endpoint_id] = asyncio.Semaphore(self.per_endpoint)
+        return slots
+
+    @staticmethod
+    def _body(deliveries: list[WebhookDelivery]) -> tuple[bytes, str]:
+        """Serialize one request: the bare payload, or an array envelope for a batch."""
+        if len(deliveries) == 1 and deliveries[0].endpoint.batch_max_events <= 1:
+            delivery = deliveries[0]
+            return json.dumps(delivery.payload).encode("utf-8"), delivery.event_type
+        envelope = [
+            {"id": str(d.id), "event_type": d.event_type, "payload": d.payload}
+            for d in deliveries
+        ]
+        return json.dumps(envelope).encode("utf-8"), "batch"
+
+    async def _send(self, deliveries: list[WebhookDelivery]) -> Optional[str]:
+        """POST deliveries for one endpoint as a single signed request.
+
+        Returns the error text, or None on success; the outcome applies to every delivery.
+        """
+        endpoint = deliveries[0].endpoint
+        body, event_type = self._body(deliveries)
+        headers = {
+            "Content-Type": "application/json",
+            "X-Event-Type": event_type,
+            "X-Signature": _signature(endpoint.secret, body),
+        }
+        if event_type == "batch":
+            headers["X-Batch-Size"] = str(len(deliveries))
+        # Endpoint slot first: requests queued behind a slow endpoint must not sit on global
+        # slots while they wait for their own.
+        async with self._slots(endpoint.id), self._global:
+            try:
+                resp = await self.client.post(endpoint.url, content=body, headers=headers)
+            except Exception as exc:  # noqa: BLE001
+                return str(exc) or exc.__class__.__name__
+        if resp.status_code >= 300:
+            return f"Failed with status {resp.status_code}"
+        return None
+
+    @staticmethod
+    def _group(
+        deliveries: list[WebhookDelivery], now: datetime
+    ) -> tuple[list[list[WebhookDelivery]], list[WebhookDelivery], Optional[float]]:
+        """Split a claim into requests, holding back batches that are not worth sending yet.
+
+        Endpoints with ``batch_max_events > 1`` get their deliveries packed into chunks of
+        that size. If the whole claim for such an endpoint is a partial batch whose oldest
+        delivery is younger than ``batch_max_wait_ms``, it is held so more events can join.
+        Returns ``(requests, held, seconds until the earliest held batch is due)``.
+        """
+        by_endpoint: dict[Any, list[WebhookDelivery]] = {}
+        for delivery in deliveries:
+            by_endpoint.setdefault(delivery.endpoint_id, []).append(delivery)
+        requests: list[list[WebhookDelivery]] = []
+        held: list[WebhookDelivery] = []
+        flush_in: Optional[float] = None
+        for group in by_endpoint.values():
+            endpoint = group[0].endpoint
+            size = max(1, endpoint.batch_max_events)
+            # A half-open endpoint's single probe is never held back for batching.
+            if size == 1 or endpoint.circuit_open_until is not None:
+                requests.extend([d] for d in group)
+                continue
+            oldest = min(d.created_at for d in group)
+            if oldest.tzinfo is None:
+                oldest = oldest.replace(tzinfo=UTC)
+            due_in = endpoint.batch_max_wait_ms / 1000 - (now - oldest).total_seconds()
+            if len(group) < size and due_in > 0:
+                held.extend(group)
+                flush_in = due_in if flush_in is None else min(flush_in, due_in)
+                continue
+            requests.extend(group[i : i + size] for i in range(0, len(group), size))
+        return requests, held, flush_in
+
+    async def _release(self, session: AsyncSession, deliveries: list[WebhookDelivery]) -> None:
+        """Give up the lease on held deliveries so the next poll (by any worker) sees them."""
+        await self._release_ids(session, [d.id for d in deliveries])
+
+    async def _release_ids(self, session: AsyncSession, delivery_ids: list) -> None:
         await session.execute(
-            select(WebhookDelivery)
-            .join(WebhookEndpoint, WebhookDelivery.endpoint_id == WebhookEndpoint.id)
+            update(WebhookDelivery)
             .where(
-                WebhookDelivery.status == WebhookDeliveryStatus.PENDING,
-                WebhookEndpoint.active.is_(True),
-                (WebhookDelivery.next_retry_at.is_(None)) | (WebhookDelivery.next_retry_at <= now),
+                WebhookDelivery.id.in_(delivery_ids),
+                WebhookDelivery.locked_by == self.worker_id,
             )
-            .limit(limit)
+            .values(locked_by=None, locked_until=None)
         )
-    ).scalars().all()
 
-    if not deliveries:
-        return
+    @staticmethod
+    def _due(now: datetime):
+        """Deliveries that may be claimed at ``now``: pending, due and not leased."""
+        return and_(
+            WebhookDelivery.status == WebhookDeliveryStatus.PENDING,
+            (WebhookDelivery.next_retry_at.is_(None)) | (WebhookDelivery.next_retry_at <= now),
+            (WebhookDelivery.locked_until.is_(None)) | (WebhookDelivery.locked_until < now),
+        )
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        for delivery in deliveries:
-            endpoint = delivery.endpoint
-            body = json.dumps(delivery.payload).encode("utf-8")
-            signature = _signature(endpoint.secret, body)
-            try:
-                resp = await client.post(
-                    endpoint.url,
-                    content=body,
-                    headers={
-                        "Content-Type": "application/json",
-                        "X-Event-Type": delivery.event_type,
-                        "X-Signature": signature,
-                    },
+    @staticmethod
+    def _reachable(now: datetime):
+        """Endpoints that may receive traffic: closed, or half-open without a probe out."""
+        return and_(
+            WebhookEndpoint.active.is_(True),
+            WebhookEndpoint.circuit_open_until.is_(None)
+            | (
+                (WebhookEndpoint.circuit_open_until <= now)
+                & (
+                    WebhookEndpoint.circuit_probe_until.is_(None)
+                    | (WebhookEndpoint.circuit_probe_until < now)
+                )
+            ),
+        )
+
+    def _candidates(self, dialect: str, now: datetime, limit: int):
+        """Due deliveries ranked per endpoint (1 = the endpoint's oldest), as a subquery.
+
+        Only endpoints that may receive traffic are considered: closed circuits, and
+        half-open ones without a probe in flight. On PostgreSQL each endpoint contributes at
+        most ``limit`` rows through a LATERAL top-N on ``ix_webhook_delivery_endpoint_pending``,
+        so the cost follows the number of endpoints rather than the size of the backlog.
+        Elsewhere (SQLite in tests) the window ranks every due row.
+        """
+        endpoints = self._reachable(now)
+        due = self._due(now)
+        if dialect == "postgresql":
+            top = (
+                select(
+                    WebhookDelivery.id,
+                    WebhookDelivery.created_at,
+                    func.row_number().over(order_by=WebhookDelivery.created_at).label("rank"),
+                )
+                .where(WebhookDelivery.endpoint_id == WebhookEndpoint.id, due)
+                .order_by(WebhookDelivery.created_at)
+                .limit(limit)
+                .lateral()
+            )
+            return (
+                select(top.c.id, top.c.created_at, top.c.rank, WebhookEndpoint.circuit_open_until)
+                .select_from(WebhookEndpoint)
+                .join(top, true())
+                .where(endpoints)
+                .subquery()
+            )
+        return (
+            select(
+                WebhookDelivery.id,
+                WebhookDelivery.created_at,
+                func.row_number()
+                .over(partition_by=WebhookDelivery.endpoint_id, order_by=WebhookDelivery.created_at)
+                .label("rank"),
+                WebhookEndpoint.circuit_open_until,
+            )
+            .join(WebhookEndpoint, WebhookDelivery.endpoint_id == WebhookEndpoint.id)
+            .where(endpoints, due)
+            .subquery()
+        )
+
+    async def _lease_probes(
+        self, session: AsyncSession, claimed: list, now: datetime, until: datetime
+    ) -> list:
+        """Mark half-open endpoints in ``claimed`` as probing; returns the ids to keep.
+
+        The marker is written in the claim transaction and only if no other probe is out,
+        so two workers racing for the same half-open endpoint cannot both send. Deliveries
+        whose endpoint already has a probe out are released and dropped from the claim.
+        """
+        rows = (
+            await session.execute(
+                select(WebhookDelivery.id, WebhookDelivery.endpoint_id)
+                .join(WebhookEndpoint, WebhookDelivery.endpoint_id == WebhookEndpoint.id)
+                .where(
+                    WebhookDelivery.id.in_(claimed),
+                    WebhookEndpoint.circuit_open_until.is_not(None),
                 )
-                if resp.status_code < 300:
-                    delivery.status = WebhookDeliveryStatus.SUCCESS
-                else:
-                    raise httpx.HTTPStatusError(
-                        f"Failed with status {resp.status_code}", request=resp.request, response=resp
+            )
+        ).all()
+        if not rows:
+            return claimed
+        probing = set(
+            (
+                await session.execute(
+                    update(WebhookEndpoint)
+                    .where(
+                        WebhookEndpoint.id.in_({endpoint_id for _, endpoint_id in rows}),
+                        WebhookEndpoint.circuit_probe_until.is_(None)
+                        | (WebhookEndpoint.circuit_probe_until < now),
                     )
-            except Exception as exc:  # noqa: BLE001
-                delivery.attempts += 1
-                delay = min(60, 2 ** delivery.attempts)
-                delivery.next_retry_at = now + timedelta(seconds=delay)
-                delivery.last_error = str(exc)
-            finally:
-                session.add(delivery)
+                    .values(circuit_probe_until=until)
+                    .returning(WebhookEndpoint.id)
+                )
+            ).scalars()
+        )
+        lost = [delivery_id for delivery_id, endpoint_id in rows if endpoint_id not in probing]
+        if lost:
+            await self._release_ids(session, lost)
+        return [delivery_id for delivery_id in claimed if delivery_id not in set(lost)]
+
+    async def claim(
+        self, session: AsyncSession, limit: Optional[int] = None
+    ) -> list[WebhookDelivery]:
+        """Lease up to ``limit`` due deliveries to this worker and commit the claim.
+
+        Candidates are ranked per endpoint and taken round-robin (every endpoint's oldest
+        delivery first, then every endpoint's second, ...), so a backlog on one receiver
+        cannot crowd out the others. Endpoints with an open circuit are skipped. A half-open
+        endpoint gets a single probe: claiming it sets ``circuit_probe_until`` (for the
+        lease) and no further deliveries are claimed for it until the probe's outcome is
+        recorded or the lease lapses. Rows are locked with ``FOR UPDATE SKIP LOCKED`` so
+        concurrent workers take disjoint rows without waiting on each other; rows whose
+        lease expired (crashed worker) are eligible again.
+        """
+        now = datetime.now(UTC)
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        stmt = self._claim_statement(
+            dialect_name(session), now, limit or self.batch_size, lease_until
+        )
+        claimed = (await session.execute(stmt)).scalars().all()
+        if claimed:
+            claimed = await self._lease_probes(session, list(claimed), now, lease_until)
         await session.commit()
+        if not claimed:
+            return []
+        return list(
+            (
+                await session.execute(
+                    select(WebhookDelivery)
+                    .options(selectinload(WebhookDelivery.endpoint))
+                    .where(WebhookDelivery.id.in_(claimed))
+                    .order_by(WebhookDelivery.created_at)
+                    .execution_options(populate_existing=True)
+                )
+            ).scalars()
+        )
+
+    def _claim_statement(self, dialect: str, now: datetime, limit: int, lease_until: datetime):
+        """The UPDATE that leases the fair share of due deliveries, returning their ids."""
+        ranked = self._candidates(dialect, now, limit)
+        fair = (
+            select(ranked.c.id)
+            .where(ranked.c.circuit_open_until.is_(None) | (ranked.c.rank == 1))
+            .order_by(ranked.c.rank, ranked.c.created_at)
+            .limit(limit)
+        )
+        # Window functions cannot be combined with FOR UPDATE, so lock in an outer query.
+        # It repeats the due and endpoint checks: when a row was claimed and committed by
+        # another worker after this statement's snapshot, PostgreSQL re-evaluates only the
+        # locking query's own WHERE against the new row version, not the ranked subquery.
+        candidates = (
+            select(WebhookDelivery.id)
+            .join(WebhookEndpoint, WebhookDelivery.endpoint_id == WebhookEndpoint.id)
+            .where(
+                WebhookDelivery.id.in_(fair.scalar_subquery()),
+                self._due(now),
+                self._reachable(now),
+            )
+            .with_for_update(skip_locked=True, of=WebhookDelivery)
+        )
+        return (
+            update(WebhookDelivery)
+            .where(WebhookDelivery.id.in_(candidates.scalar_subquery()))
+            .values(locked_by=self.worker_id, locked_until=lease_until)
+            .returning(WebhookDelivery.id)
+        )
+
+    async def _record(
+        self, session: AsyncSession, requests: list[list[WebhookDelivery]], errors: list
+    ) -> None:
+        """Store outcomes, release leases and update each endpoint's circuit breaker.
+
+        ``errors`` holds one outcome per request. Rows whose lease was taken over by another
+        worker are left alone. Failures back off exponentially and move to FAILED (dead
+        letter) once ``max_attempts`` is reached.
+        """
+        now = datetime.now(UTC)
+        deliveries = [d for request in requests for d in request]
+        outcomes = [e for request, e in zip(requests, errors, strict=True) for _ in request]
+        table = WebhookDelivery.__table__
+        owned = and_(table.c.id == bindparam("delivery_id"), table.c.locked_by == self.worker_id)
+        paired = list(zip(deliveries, outcomes, strict=True))
+        succeeded = [{"delivery_id": d.id} for d, e in paired if e is None]
+        failed = [
+            {
+                "delivery_id": d.id,
+                "retry_at": now
+                + timedelta(seconds=min(self.max_backoff, 2 ** (d.attempts + 1))),
+                "error": e,
+            }
+            for d, e in paired
+            if e is not None
+        ]
+        if succeeded:
+            await session.execute(
+                update(table)
+                .where(owned)
+                .values(status=WebhookDeliveryStatus.SUCCESS, locked_by=None, locked_until=None),
+                succeeded,
+            )
+        if failed:
+            exhausted = table.c.attempts + 1 >= self.max_attempts
+            await session.execute(
+                update(table)
+                .where(owned)
+                .values(
+                    attempts=table.c.attempts + 1,
+                    status=cast(
+                        case(
+                            (exhausted, WebhookDeliveryStatus.FAILED.value),
+                            else_=WebhookDeliveryStatus.PENDING.value,
+                        ),
+                        table.c.status.type,
+                    ),
+                    next_retry_at=case((exhausted, None), else_=bindparam("retry_at")),
+                    last_error=bindparam("error"),
+                    locked_by=None,
+                    locked_until=None,
+                ),
+                failed,
+            )
+        await self._update_breakers(session, requests, errors, now)
+        await session.commit()
+
+    async def _update_breakers(
+        self, session: AsyncSession, requests: list[list[WebhookDelivery]], errors: list, now
+    ) -> None:
+        """Close the circuit on any success; open it after ``breaker_threshold`` failures.
+
+        Failures are counted per request, so one failed batch counts once.
+        """
+        failures: dict[Any, int] = {}
+        healthy: set = set()
+        for request, error in zip(requests, errors, strict=True):
+            endpoint_id = request[0].endpoint_id
+            if error is None:
+                healthy.add(endpoint_id)
+            else:
+                failures[endpoint_id] = failures.get(endpoint_id, 0) + 1
+        if healthy:
+            await session.execute(
+                update(WebhookEndpoint)
+                .where(WebhookEndpoint.id.in_(healthy))
+                .values(
+                    consecutive_failures=0, circuit_open_until=None, circuit_probe_until=None
+                )
+            )
+        endpoints = WebhookEndpoint.__table__
+        tripped = endpoints.c.consecutive_failures + bindparam("failures") >= self.breaker_threshold
+        rows = [
+            {"endpoint_id": endpoint_id, "failures": count}
+            for endpoint_id, count in failures.items()
+            if endpoint_id not in healthy
+        ]
+        if rows:
+            await session.execute(
+                update(endpoints)
+                .where(endpoints.c.id == bindparam("endpoint_id"))
+                .values(
+                    consecutive_failures=endpoints.c.consecutive_failures + bindparam("failures"),
+                    circuit_open_until=case(
+                        (tripped, now + timedelta(seconds=self.breaker_cooldown)),
+                        else_=endpoints.c.circuit_open_until,
+                    ),
+                    circuit_probe_until=None,
+                ),
+                rows,
+            )
+
+    async def deliver_pending(self, session: AsyncSession, limit: Optional[int] = None) -> int:
+        """Claim one batch, send it concurrently and record outcomes as requests finish.
+
+        Requests that complete together are recorded in one commit, so a slow endpoint does
+        not keep the others' outcomes (and their breakers) waiting. Returns the number of
+        deliveries attempted; partial batches that are held back for batching endpoints are
+        released and not counted.
+        """
+        self._flush_in = None
+        deliveries = await self.claim(session, limit)
+        if not deliveries:
+            return 0
+        requests, held, self._flush_in = self._group(deliveries, datetime.now(UTC))
+        if held:
+            await self._release(session, held)
+        pending = {asyncio.ensure_future(self._send(request)): request for request in requests}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                finished = [pending.pop(task) for task in done]
+                await self._record(session, finished, [task.result() for task in done])
+        finally:
+            for task in pending:
+                task.cancel()
+        return len(deliveries) - len(held)
+
+    def wake(self, *_args) -> None:
+        """Wake the run loop now; also the asyncpg NOTIFY callback."""
+        self._wake.set()
+
+    async def _listen(self, engine: AsyncEngine) -> Optional[AsyncConnection]:
+        """LISTEN for new deliveries on a dedicated connection (PostgreSQL/asyncpg only).
+
+        The same connection carries endpoint-change notifications for the subscription
+        index, which is dropped on (re)connect since changes may have been missed meanwhile.
+        """
+        if engine.dialect.name != "postgresql":
+            return None
+        try:
+            conn = await engine.connect()
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.add_listener(NOTIFY_CHANNEL, self.wake)
+            if self.subscriptions is not None:
+                await raw.driver_connection.add_listener(
+                    ENDPOINTS_CHANNEL, self.subscriptions.invalidate
+                )
+                self.subscriptions.invalidate()
+        except Exception:  # noqa: BLE001
+            logger.exception("Could not LISTEN on %s; falling back to polling", NOTIFY_CHANNEL)
+            return None
+        return conn
+
+    @staticmethod
+    async def _listening(conn: Optional[AsyncConnection]) -> bool:
+        if conn is None or conn.closed:
+            return False
+        raw = await conn.get_raw_connection()
+        return not raw.driver_connection.is_closed()
+
+    @staticmethod
+    async def _seconds_until_next_retry(session: AsyncSession) -> Optional[float]:
+        now = datetime.now(UTC)
+        next_retry = await session.scalar(
+            select(func.min(WebhookDelivery.next_retry_at)).where(
+                WebhookDelivery.status == WebhookDeliveryStatus.PENDING,
+                WebhookDelivery.next_retry_at > now,
+            )
+        )
+        if next_retry is None:
+            return None
+        if next_retry.tzinfo is None:
+            next_retry = next_retry.replace(tzinfo=UTC)
+        return max(0.0, (next_retry - now).total_seconds())
+
+    async def run(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        interval: float,
+        fallback_interval: Optional[float] = None,
+    ) -> None:
+        """Deliver until cancelled, sleeping only while there is nothing due.
+
+        With a LISTEN connection the loop wakes on NOTIFY, at the next scheduled retry or
+        held batch flush, or after ``fallback_interval`` at the latest. Without one it polls
+        every ``interval``. A full batch is always followed immediately by the next one.
+        """
+        engine = session_maker.kw.get("bind")
+        listener: Optional[AsyncConnection] = None
+        try:
+            while True:
+                if engine is not None and not await self._listening(listener):
+                    if listener is not None:
+                        await listener.close()
+                    listener = await self._listen(engine)
+                # Cleared before claiming so a NOTIFY that lands mid-batch is not lost.
+                self._wake.clear()
+                try:
+                    async with session_maker() as session:
+                        sent = await self.deliver_pending(session)
+                        retry_in = await self._seconds_until_next_retry(session)
+                except Exception:  # noqa: BLE001
+                    logger.exception("Webhook delivery batch failed")
+                    sent, retry_in = 0, None
+                if sent >= self.batch_size:
+                    continue
+                timeout = interval if listener is None else (fallback_interval or interval)
+                for due_in in (retry_in, self._flush_in):
+                    if due_in is not None:
+                        timeout = min(timeout, due_in)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+                except TimeoutError:
+                    pass
+        finally:
+            if listener is not None:
+                await listener.close()
+
+
+webhook_dispatcher = WebhookDispatcher(
+    batch_size=settings.webhook_batch_size,
+    concurrency=settings.webhook_concurrency,
+    per_endpoint=settings.webhook_per_endpoint_concurrency,
+    timeout=settings.webhook_timeout_seconds,
+    http2=settings.webhook_http2,
+    lease_seconds=settings.webhook_lease_seconds,
+    max_attempts=settings.webhook_max_attempts,
+    max_backoff=settings.webhook_max_backoff_seconds,
+    breaker_threshold=settings.webhook_breaker_threshold,
+    breaker_cooldown=settings.webhook_breaker_cooldown_seconds,
+    subscriptions=webhook_subscriptions,
+)
+
 
+async def deliver_pending(session: AsyncSession, limit: int = 20) -> int:
+    return await webhook_dispatcher.deliver_pending(session, limit)
 
-async def webhook_worker(session_maker: async_sessionmaker[AsyncSession], interval: int = 15) -> None:
-    while True:
-        async with session_maker() as session:
-            await deliver_pending(session)
-        await asyncio.sleep(interval)
 
+async def webhook_worker(
+    session_maker: async_sessionmaker[AsyncSession], interval: Optional[float] = None
+) -> None:
+    await webhook_dispatcher.run(
+        session_maker,
+        interval or settings.webhook_poll_interval_seconds,
+        settings.webhook_fallback_poll_seconds,
+    )
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from app.core.config import settings
+from app.services.retention_service import apply_retention
+from scripts.utils import common_argparser, session_scope
+
+
+def _size(num_bytes: int | None) -> str:
+    if num_bytes is None:
+        return "size n/a"
+    return f"~{num_bytes / (1024 * 1024):.1f} MiB"
+
+
+async def run(db_url: str, archive: bool, batch_size: int):
+    started = time.perf_counter()
+    async with session_scope(db_url) as session:
+        results = await apply_retention(session, archive=archive, batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    for result in results:
+        action = "archived" if result.archived else "deleted"
+        print(
+            f"{result.table} {result.status}: {action} {result.rows} rows ({_size(result.bytes)})"
+        )
+    print(f"Retention finished in {elapsed:.2f}s")
+
+
+def build_parser():
+    parser = common_argparser("apply_retention")
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        default=settings.retention_archive,
+        help="Move expired rows to the *_archive tables instead of deleting them",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.retention_batch_size,
+        help="Rows deleted per transaction",
+    )
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    asyncio.run(run(args.db_url, args.archive, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
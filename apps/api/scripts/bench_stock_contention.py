@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.models.entities import Item, MovementType, StockBalance, StoreLocation
+from app.services.stock_service import InsufficientStockError, post_stock_movement_once
+from scripts.utils import common_argparser
+
+
+async def _seed(session_maker, skus: int, initial_qty: int):
+    run_id = uuid.uuid4().hex[:8]
+    async with session_maker() as session:
+        location = StoreLocation(code=f"BENCH-{run_id}", name=f"Benchmark {run_id}")
+        items = [
+            Item(item_code=f"BENCH-{run_id}-{n}", sku=f"BENCH-{run_id}-{n}", name=f"Hot SKU {n}")
+            for n in range(skus)
+        ]
+        session.add(location)
+        session.add_all(items)
+        await session.commit()
+        for item in items:
+            await post_stock_movement_once(
+                session,
+                item_id=item.id,
+                location_id=location.id,
+                movement_type=MovementType.PURCHASE_RECEIPT,
+                qty_delta=Decimal(initial_qty),
+                unit_cost=Decimal("1"),
+                ref_type="benchmark",
+                ref_id=uuid.uuid4(),
+            )
+        return location.id, [item.id for item in items]
+
+
+async def _seller(session_maker, location_id, item_ids, sales: int, latencies, outcomes):
+    async with session_maker() as session:
+        for _ in range(sales):
+            started = time.perf_counter()
+            try:
+                await post_stock_movement_once(
+                    session,
+                    item_id=random.choice(item_ids),
+                    location_id=location_id,
+                    movement_type=MovementType.SALE,
+                    qty_delta=Decimal(-1),
+                    ref_type="benchmark",
+                    ref_id=uuid.uuid4(),
+                )
+                outcomes["posted"] += 1
+            except InsufficientStockError:
+                outcomes["rejected"] += 1
+            latencies.append(time.perf_counter() - started)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run(db_url: str, sellers: int, skus: int, sales: int, initial_qty: int, strict: bool):
+    settings.stock_strict_mode = strict
+    engine = create_async_engine(db_url, future=True, pool_size=sellers, max_overflow=0)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        location_id, item_ids = await _seed(session_maker, skus, initial_qty)
+        latencies: list[float] = []
+        outcomes = {"posted": 0, "rejected": 0}
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                _seller(session_maker, location_id, item_ids, sales, latencies, outcomes)
+                for _ in range(sellers)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+        async with session_maker() as session:
+            balances = (
+                await session.execute(
+                    select(StockBalance.qty).where(StockBalance.location_id == location_id)
+                )
+            ).scalars().all()
+    finally:
+        await engine.dispose()
+
+    attempts = outcomes["posted"] + outcomes["rejected"]
+    print(f"mode={'strict' if strict else 'lenient'} sellers={sellers} skus={skus}")
+    print(f"attempts={attempts} posted={outcomes['posted']} rejected={outcomes['rejected']}")
+    print(f"throughput={attempts / elapsed:.1f} posts/s over {elapsed:.2f}s")
+    print(
+        "latency ms: "
+        f"p50={statistics.median(latencies) * 1000:.1f} "
+        f"p95={_percentile(latencies, 0.95) * 1000:.1f} "
+        f"p99={_percentile(latencies, 0.99) * 1000:.1f}"
+    )
+    print(f"lowest closing balance={min(balances)}")
+
+
+def build_parser():
+    parser = common_argparser("bench_stock_contention")
+    parser.add_argument("--sellers", type=int, default=50, help="Concurrent sellers")
+    parser.add_argument("--skus", type=int, default=3, help="Hot SKUs shared by all sellers")
+    parser.add_argument("--sales", type=int, default=20, help="Sales posted per seller")
+    parser.add_argument(
+        "--initial-qty",
+        type=int,
+        default=200,
+        help="Opening quantity per SKU; keep it below sellers x sales to force oversells",
+    )
+    parser.add_argument(
+        "--strict", action="store_true", help="Reject oversells (STOCK_STRICT_MODE)"
+    )
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    asyncio.run(
+        run(args.db_url, args.sellers, args.skus, args.sales, args.initial_qty, args.strict)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from app.services.typeahead_service import ItemTypeahead, TypeaheadEntry
+
+WORDS = (
+    "hex bolt nut washer screw anchor hinge bracket cable charger fuse relay switch socket "
+    "pipe elbow valve tape glue brush paint roller drill bit blade saw chain lock hook"
+).split()
+SIZES = "M4 M5 M6 M8 M10 M12 10mm 20mm 1in 2in 3in small large".split()
+
+
+def _catalog(size: int, rng: random.Random) -> list[TypeaheadEntry]:
+    entries = []
+    for n in range(size):
+        words = rng.sample(WORDS, 3)
+        code = f"{words[0][:3].upper()}-{n:06d}"
+        entries.append(
+            TypeaheadEntry(
+                id=uuid.uuid4(),
+                item_code=code,
+                sku=code,
+                name=f"{' '.join(w.title() for w in words)} {rng.choice(SIZES)}",
+                barcode=f"{rng.randrange(10**12):012d}" if n % 2 else None,
+                uom="ea",
+            )
+        )
+    return entries
+
+
+def run(size: int, queries: int, limit: int) -> None:
+    rng = random.Random(7)
+    entries = _catalog(size, rng)
+    index = ItemTypeahead(refresh_interval=30, max_candidates=256)
+    started = time.perf_counter()
+    index.apply((entry, True) for entry in entries)
+    print(f"Indexed {len(index)} items in {time.perf_counter() - started:.2f}s")
+
+    samples = []
+    for _ in range(queries):
+        entry = rng.choice(entries)
+        kind = rng.random()
+        if kind < 0.3 and entry.barcode:
+            query = entry.barcode
+        elif kind < 0.6:
+            query = entry.item_code[: rng.randint(3, len(entry.item_code))]
+        else:
+            name = entry.name.lower()
+            query = name[: rng.randint(2, min(len(name), 12))]
+        started = time.perf_counter()
+        index.search(query, limit)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    print(
+        f"{queries} lookups: median {statistics.median(samples):.3f} ms, "
+        f"p95 {samples[int(len(samples) * 0.95)]:.3f} ms, max {samples[-1]:.3f} ms"
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser("bench_typeahead")
+    parser.add_argument("--items", type=int, default=100_000, help="Synthetic catalog size")
+    parser.add_argument("--queries", type=int, default=2000, help="Lookups to time")
+    parser.add_argument("--limit", type=int, default=10, help="Results per lookup")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    run(args.items, args.queries, args.limit)
+
+
+if __name__ == "__main__":
+    main()
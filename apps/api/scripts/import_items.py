@@ -6,6 +6,7 @@ from typing import Optional
 
 from sqlalchemy import select
 
+from app.core.cache import cache
 from app.core.db import Base
 from app.core.db import engine as app_engine
 from app.models.entities import Item, ItemCategory, ItemSourceFields
@@ -93,6 +94,8 @@ async def import_items(path: str, db_url: str, reject_log: str):
                 except Exception as exc:  # noqa: BLE001
                     logger.log(row_num, str(exc))
             await session.commit()
+    # Imported rows bypass the repositories, so drop cached copies explicitly.
+    await cache.invalidate("items")
 
 
 def build_parser():
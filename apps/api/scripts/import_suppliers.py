@@ -4,6 +4,7 @@ import argparse
 
 from sqlalchemy import select
 
+from app.core.cache import cache
 from app.models.entities import Supplier, SupplierSourceFields
 from scripts.utils import RejectLogger, common_argparser, iter_dict_rows, session_scope, utcnow
 
@@ -65,6 +66,8 @@ async def import_suppliers(path: str, db_url: str, reject_log: str):
                 except Exception as exc:  # noqa: BLE001
                     logger.log(row_num, str(exc))
             await session.commit()
+    # Imported rows bypass the repositories, so drop cached copies explicitly.
+    await cache.invalidate("suppliers")
 
 
 def build_parser():
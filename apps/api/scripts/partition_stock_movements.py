@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+
+from app.core.config import settings
+from app.services.partition_service import detach_partitions_before, ensure_future_partitions
+from scripts.utils import common_argparser, session_scope
+
+
+async def run(
+    db_url: str,
+    months_ahead: int,
+    detach_before: str | None,
+    archive_schema: str | None,
+    drop: bool,
+):
+    async with session_scope(db_url) as session:
+        for name in await ensure_future_partitions(session, months_ahead):
+            print(f"created {name}")
+        if detach_before:
+            cutoff = date.fromisoformat(f"{detach_before}-01")
+            detached = await detach_partitions_before(
+                session, cutoff, archive_schema=archive_schema, drop=drop
+            )
+            for name in detached:
+                print(f"detached {name}")
+
+
+def build_parser():
+    parser = common_argparser("partition_stock_movements")
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=settings.stock_partition_months_ahead,
+        help="Monthly partitions to pre-create beyond the current month",
+    )
+    parser.add_argument(
+        "--detach-before",
+        required=False,
+        help="Detach partitions for months before this YYYY-MM",
+    )
+    parser.add_argument(
+        "--archive-schema",
+        required=False,
+        help="Move detached partitions into this schema instead of leaving them in public",
+    )
+    parser.add_argument("--drop", action="store_true", help="Drop detached partitions")
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    asyncio.run(
+        run(args.db_url, args.months_ahead, args.detach_before, args.archive_schema, args.drop)
+    )
+
+
+if __name__ == "__main__":
+    main()
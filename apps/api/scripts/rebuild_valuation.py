@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.core.config import settings
+from app.services.valuation_service import VALUATION_METHODS, rebuild_valuation
+from scripts.utils import common_argparser, session_scope
+
+
+async def run(db_url: str, method: str):
+    async with session_scope(db_url) as session:
+        counts = await rebuild_valuation(session, method)
+    print(
+        f"Rebuilt {method} valuation: "
+        f"{counts['balances']} balances, {counts['layers']} cost layers"
+    )
+
+
+def build_parser():
+    parser = common_argparser("rebuild_valuation")
+    parser.add_argument(
+        "--method",
+        choices=VALUATION_METHODS,
+        default=settings.stock_valuation_method,
+        help="Valuation method to replay the ledger with",
+    )
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    asyncio.run(run(args.db_url, args.method))
+
+
+if __name__ == "__main__":
+    main()
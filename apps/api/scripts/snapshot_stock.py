@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+
+from app.core.config import settings
+from app.services.snapshot_service import PERIODS, write_due_snapshots, write_snapshot
+from scripts.utils import common_argparser, session_scope
+
+
+async def run(db_url: str, period: str, period_end: str | None):
+    async with session_scope(db_url) as session:
+        if period_end:
+            boundary = datetime.fromisoformat(period_end)
+            rows = await write_snapshot(session, boundary)
+            print(f"{boundary.isoformat()}: {rows} balances")
+            return
+        for boundary in await write_due_snapshots(session, period=period):
+            print(f"{boundary.isoformat()}: written")
+
+
+def build_parser():
+    parser = common_argparser("snapshot_stock")
+    parser.add_argument(
+        "--period",
+        choices=PERIODS,
+        default=settings.stock_snapshot_period,
+        help="Boundary granularity used when closing due periods",
+    )
+    parser.add_argument(
+        "--period-end",
+        required=False,
+        help="Write a single snapshot at this ISO timestamp instead of all due boundaries",
+    )
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    asyncio.run(run(args.db_url, args.period, args.period_end))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from app.services.reorder_service import sweep_reorder_rules
+from scripts.utils import common_argparser, session_scope
+
+
+async def run(db_url: str):
+    started = time.perf_counter()
+    async with session_scope(db_url) as session:
+        counts = await sweep_reorder_rules(session)
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{name}={count}" for name, count in counts.items())
+    print(f"Reorder sweep finished in {elapsed:.2f}s: {summary}")
+
+
+def main():
+    parser = common_argparser("sweep_reorder_rules")
+    args = parser.parse_args()
+    asyncio.run(run(args.db_url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import AsyncGenerator
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db import Base, get_session
+from app.main import create_app
+
+
+@pytest.fixture
+async def app_and_session() -> AsyncGenerator[tuple[FastAPI, async_sessionmaker], None]:
+    app = create_app()
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def override_get_session() -> AsyncGenerator[AsyncSession, None]:
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    yield app, session_maker
+    app.dependency_overrides.clear()
+    await engine.dispose()
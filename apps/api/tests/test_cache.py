@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.cache import MemoryBackend, ReadThroughCache, cache
+from app.core.security import get_current_user
+from app.models import Item, StaffUser
+from app.models.entities import StaffRole
+from app.repositories.items import ItemRepository
+
+
+class FlakyBackend(MemoryBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.down = False
+
+    def _check(self) -> None:
+        if self.down:
+            raise RedisConnectionError("connection refused")
+
+    async def get(self, key: str):
+        self._check()
+        return await super().get(key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self._check()
+        await super().set(key, value, ttl)
+
+    async def incr(self, key: str) -> int:
+        self._check()
+        return await super().incr(key)
+
+
+@pytest.mark.asyncio
+async def test_read_through_versions_and_memory_fallback():
+    backend = FlakyBackend()
+    store = ReadThroughCache(backend, ttls={"items": 60}, prefix="t", retry_seconds=60)
+    loads: list[str] = []
+
+    async def loader():
+        loads.append("items")
+        return {"n": loads.count("items")}
+
+    assert await store.get_or_load("items", "a", loader) == {"n": 1}
+    assert await store.get_or_load("items", "a", loader) == {"n": 1}
+    await store.invalidate("items")
+    assert await store.get_or_load("items", "a", loader) == {"n": 2}
+
+    async def missing():
+        loads.append("missing")
+        return None
+
+    # Misses for absent rows are not cached.
+    assert await store.get_or_load("items", "gone", missing) is None
+    assert await store.get_or_load("items", "gone", missing) is None
+    assert store.stats()["entities"]["items"] == {"hits": 1, "misses": 4}
+
+    # Redis down: serve from process memory until the retry window passes.
+    backend.down = True
+    assert await store.get_or_load("items", "b", loader) == {"n": 3}
+    assert await store.get_or_load("items", "b", loader) == {"n": 3}
+    assert store.errors == 1 and len(loads) == 5
+
+
+@pytest.mark.asyncio
+async def test_invalidations_during_outage_reach_redis_on_recovery():
+    backend = FlakyBackend()
+    store = ReadThroughCache(backend, ttls={"items": 60}, prefix="t", retry_seconds=0)
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        return {"n": loads}
+
+    assert await store.get_or_load("items", "a", loader) == {"n": 1}
+    backend.down = True
+    assert await store.get_or_load("items", "a", loader) == {"n": 2}
+    await store.invalidate("items")
+
+    # Back on Redis, the invalidation made in memory during the outage is replayed.
+    backend.down = False
+    assert await store.get_or_load("items", "a", loader) == {"n": 3}
+    assert await store.get_or_load("items", "a", loader) == {"n": 3}
+    assert await backend.get("t:items:version") == "1"
+
+    # The next outage starts from an empty memory copy rather than the previous one.
+    backend.down = True
+    assert await store.get_or_load("items", "a", loader) == {"n": 4}
+
+
+@pytest.mark.asyncio
+async def test_item_reads_are_cached_until_repository_update(app_and_session):
+    app, session_maker = app_and_session
+    async with session_maker() as session:
+        item = Item(item_code="CCH-1", sku="CCH-1", name="Cable Tie", uom="ea")
+        manager = StaffUser(
+            email="manager@example.com",
+            full_name="manager",
+            password_hash="x",
+            role=StaffRole.MANAGER,
+            is_active=True,
+        )
+        session.add_all([item, manager])
+        await session.commit()
+
+    before = cache.stats()["entities"].get("items", {"hits": 0, "misses": 0})
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        first = (await client.get(f"/items/{item.id}")).json()
+        second = (await client.get(f"/items/{item.id}")).json()
+        async with session_maker() as session:
+            repo = ItemRepository(session)
+            await repo.update(await repo.get(item.id), {"name": "Cable Tie 200mm"})
+        updated = (await client.get(f"/items/{item.id}")).json()
+        anonymous = await client.get("/health/cache")
+        app.dependency_overrides[get_current_user] = lambda: manager
+        stats = (await client.get("/health/cache")).json()
+
+    assert anonymous.status_code == 401
+    assert first == second and first["name"] == "Cable Tie"
+    assert updated["name"] == "Cable Tie 200mm"
+    after = stats["entities"]["items"]
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 2
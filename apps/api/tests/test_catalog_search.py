@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import delete
+
+from app.models import Customer, Item
+from app.services.typeahead_service import ItemTypeahead
+
+
+@pytest.mark.asyncio
+async def test_substring_search_across_columns(app_and_session):
+    app, session_maker = app_and_session
+    async with session_maker() as session:
+        session.add_all(
+            [
+                Item(item_code="BLT-10", sku="BLT-10", name="Hex Bolt M10", uom="ea"),
+                Item(item_code="NUT-10", sku="NUT-10", name="Hex Nut", barcode="99010", uom="ea"),
+                Item(item_code="PCT-50", sku="PCT-50", name="50% off voucher", uom="ea"),
+                Customer(customer_code="C-1", name="Bolton Hardware", phone="555-0101"),
+            ]
+        )
+        await session.commit()
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        by_name = await client.get("/items", params={"search": "hEx"})
+        by_barcode = await client.get("/items", params={"search": "9901"})
+        wildcard = await client.get("/items", params={"search": "0%"})
+        customers = await client.get("/customers", params={"search": "0101"})
+
+    assert {i["item_code"] for i in by_name.json()["items"]} == {"BLT-10", "NUT-10"}
+    assert [i["item_code"] for i in by_barcode.json()["items"]] == ["NUT-10"]
+    # LIKE wildcards in the term are matched literally.
+    assert [i["item_code"] for i in wildcard.json()["items"]] == ["PCT-50"]
+    assert customers.json()["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_typeahead_ranks_matches_and_follows_commits(app_and_session):
+    app, session_maker = app_and_session
+    async with session_maker() as session:
+        bolt = Item(item_code="BLT-10", sku="BLT-10", name="Hex Bolt M10", uom="ea")
+        nut = Item(item_code="NUT-10", sku="NUT-10", name="Hex Nut", barcode="99010", uom="ea")
+        washer = Item(item_code="WSH-1", sku="WSH-1", name="Flat Washer", uom="ea")
+        session.add_all([bolt, nut, washer])
+        await session.commit()
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            async def lookup(q):
+                resp = await client.get("/items/typeahead", params={"q": q})
+                assert resp.status_code == 200
+                return [i["item_code"] for i in resp.json()["items"]]
+
+            assert (await lookup("99010"))[0] == "NUT-10"
+            assert (await lookup("hex b"))[0] == "BLT-10"
+            assert (await lookup("wahser"))[0] == "WSH-1"  # typo tolerant
+            assert "WSH-1" in await lookup("fl")
+
+            # Committed changes patch the index without a reload.
+            washer.name = "Spring Washer"
+            nut.active = False
+            session.add(Item(item_code="ANC-8", sku="ANC-8", name="Wall Anchor", uom="ea"))
+            await session.commit()
+            assert (await lookup("spring"))[0] == "WSH-1"
+            assert "NUT-10" not in await lookup("hex")
+            assert (await lookup("anchor"))[0] == "ANC-8"
+
+
+@pytest.mark.asyncio
+async def test_typeahead_cap_keeps_best_matches_and_drops_hard_deletes(app_and_session):
+    _, session_maker = app_and_session
+    index = ItemTypeahead(refresh_interval=60, max_candidates=2)
+    async with session_maker() as session:
+        session.add_all(
+            Item(item_code=f"BB-{n}", sku=f"BB-{n}", name=f"Brass Bolt {n}", uom="ea")
+            for n in range(20)
+        )
+        session.add(Item(item_code="BLT", sku="BLT", name="Bolt", uom="ea"))
+        await session.commit()
+        await index.load(session)
+
+        # Only two of the 21 matches are scored; the cap walks names in order, not at random.
+        assert index.search("bolt")[0][0].item_code == "BLT"
+
+        # A hard delete elsewhere leaves no updated_at to poll; refresh reconciles ids.
+        await session.execute(delete(Item).where(Item.item_code == "BLT"))
+        await session.commit()
+        await index.refresh(session)
+        assert len(index) == 20
+        assert "BLT" not in [entry.item_code for entry, _ in index.search("bolt")]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import uuid
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event, update
+
+from app.core.cache import cache
+from app.models import Item, StoreLocation
+
+
+@pytest.mark.asyncio
+async def test_detail_and_collection_answer_conditional_gets(app_and_session):
+    app, session_maker = app_and_session
+    async with session_maker() as session:
+        item = Item(item_code="ETG-1", sku="ETG-1", name="Tap Washer", uom="ea")
+        session.add_all([item, StoreLocation(code="MAIN", name="Main")])
+        await session.commit()
+
+    statements: list[str] = []
+    engine = session_maker.kw["bind"].sync_engine
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        url = f"/items/{item.id}"
+        fresh = await client.get(url)
+        etag, modified = fresh.headers["ETag"], fresh.headers["Last-Modified"]
+        queried = len(statements)
+        by_tag = await client.get(url, headers={"If-None-Match": etag})
+        # Validators come from the cache with the body: a hit does not query the database.
+        assert len(statements) == queried
+        by_date = await client.get(url, headers={"If-Modified-Since": modified})
+        other_tag = await client.get(url, headers={"If-None-Match": 'W/"other"'})
+
+        # SQLite timestamps have one-second resolution, so move updated_at explicitly.
+        async with session_maker() as session:
+            later = datetime.now(UTC) + timedelta(minutes=1)
+            await session.execute(
+                update(Item)
+                .where(Item.id == item.id)
+                .values(name="Tap Washer 1/2", updated_at=later)
+            )
+            await session.commit()
+        # Raw writes bypass the repository, so they invalidate explicitly (as imports do).
+        await cache.invalidate("items")
+        changed = await client.get(url, headers={"If-None-Match": etag})
+
+        locations = await client.get("/locations")
+        locations_tag = locations.headers["ETag"]
+        unchanged = await client.get("/locations", headers={"If-None-Match": locations_tag})
+        async with session_maker() as session:
+            session.add(StoreLocation(code="YARD", name="Yard"))
+            await session.commit()
+        await cache.invalidate("locations")
+        added = await client.get("/locations", headers={"If-None-Match": locations_tag})
+
+    assert fresh.status_code == 200 and etag.startswith('W/"')
+    assert by_tag.status_code == 304 and by_tag.content == b""
+    assert by_tag.headers["ETag"] == etag
+    assert by_date.status_code == 304
+    assert other_tag.status_code == 200
+    assert changed.status_code == 200 and changed.json()["name"] == "Tap Washer 1/2"
+    assert changed.headers["ETag"] != etag
+    assert unchanged.status_code == 304
+    assert added.status_code == 200 and len(added.json()["items"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_missing_detail_is_404_without_validators(app_and_session):
+    app, _ = app_and_session
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        for path in ("items", "customers", "suppliers"):
+            resp = await client.get(f"/{path}/{uuid.uuid4()}")
+            assert resp.status_code == 404
+            assert resp.json()["detail"] == "Not found"
+            assert "etag" not in resp.headers
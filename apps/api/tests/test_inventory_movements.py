@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import uuid
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from httpx import AsyncClient
+
+from app.models import Item, MovementType, StockMovement, StoreLocation
+
+
+@pytest.mark.asyncio
+async def test_movement_history_pages_by_keyset(app_and_session):
+    app, session_maker = app_and_session
+    start = datetime(2024, 3, 1, tzinfo=UTC)
+    async with session_maker() as session:
+        location = StoreLocation(code="HIST", name="History")
+        item = Item(item_code="HIST1", sku="HIST1", name="Hinge", uom="ea")
+        session.add_all([location, item])
+        await session.flush()
+        # Three movements share a timestamp so paging must break ties on id.
+        stamps = [start, start + timedelta(hours=1)] + [start + timedelta(hours=2)] * 3
+        movements = [
+            StockMovement(
+                item_id=item.id,
+                location_id=location.id,
+                ref_type="test",
+                ref_id=uuid.uuid4(),
+                movement_type=MovementType.SALE if n % 2 else MovementType.PURCHASE_RECEIPT,
+                qty_delta=Decimal(1),
+                created_at=stamp,
+            )
+            for n, stamp in enumerate(stamps)
+        ]
+        session.add_all(movements)
+        await session.commit()
+        expected = [
+            str(m.id)
+            for m in sorted(movements, key=lambda m: (m.created_at, m.id), reverse=True)
+        ]
+
+    seen: list[str] = []
+    params = {"item_id": str(item.id), "location_id": str(location.id), "limit": 2}
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        cursor = None
+        while True:
+            resp = await client.get(
+                "/inventory/movements", params={**params, **({"cursor": cursor} if cursor else {})}
+            )
+            assert resp.status_code == 200
+            body = resp.json()
+            seen.extend(row["id"] for row in body["items"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        sales = await client.get(
+            "/inventory/movements", params={**params, "movement_type": MovementType.SALE.value}
+        )
+        bad = await client.get("/inventory/movements", params={"cursor": "not-a-cursor"})
+
+    assert seen == expected
+    assert len(sales.json()["items"]) == 2
+    assert bad.status_code == 400
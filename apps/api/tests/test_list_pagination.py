@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.core.pagination import encode_cursor, keyset_page
+from app.models import Item
+from app.repositories.items import ItemRepository
+
+
+@pytest.mark.asyncio
+async def test_list_endpoints_page_by_cursor_with_optional_totals(app_and_session):
+    app, session_maker = app_and_session
+    # Repeated names: pages must break ties on id to neither skip nor repeat rows.
+    names = ["Anchor", "Bolt", "Bolt", "Bolt", "Clamp", "Drill", "Drill"]
+    async with session_maker() as session:
+        items = [
+            Item(item_code=f"P-{n}", sku=f"P-{n}", name=name, uom="ea")
+            for n, name in enumerate(names)
+        ]
+        session.add_all(items)
+        await session.commit()
+        expected = [i.item_code for i in sorted(items, key=lambda i: (i.name, i.id))]
+
+    seen: list[str] = []
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        cursor = None
+        while True:
+            params = {"limit": 3, "total": "none", **({"cursor": cursor} if cursor else {})}
+            body = (await client.get("/items", params=params)).json()
+            assert body["total"] is None
+            seen.extend(i["item_code"] for i in body["items"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        exact = (await client.get("/items", params={"limit": 2})).json()
+        # Planner estimates are PostgreSQL-only; elsewhere "estimate" counts exactly.
+        estimate = (await client.get("/items", params={"total": "estimate"})).json()
+        bad = await client.get("/customers", params={"cursor": "bm90LWEtY3Vyc29y"})
+        short = await client.get("/items", params={"cursor": encode_cursor(["Saw"])})
+        cursor = exact["next_cursor"]
+        with_offset = await client.get("/items", params={"cursor": cursor, "offset": 2})
+
+    assert seen == expected
+    assert exact["total"] == estimate["total"] == len(names)
+    assert bad.status_code == short.status_code == 400
+    # A cursor already fixes the position; an offset on top of it is rejected.
+    assert with_offset.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_keyset_mixed_directions_and_repository_pages(app_and_session):
+    _, session_maker = app_and_session
+    async with session_maker() as session:
+        items = [
+            Item(item_code=f"R-{n}", sku=f"R-{n}", name=name, uom="ea")
+            for n, name in enumerate(["Saw", "Saw", "Hammer", "Level", "Level"])
+        ]
+        session.add_all(items)
+        await session.commit()
+
+        keys = [(Item.name, True), (Item.id, False)]
+        seen, cursor = [], None
+        while True:
+            rows, cursor = await keyset_page(session, select(Item), keys, cursor, 2)
+            seen.extend(row[0].id for row in rows)
+            if cursor is None:
+                break
+        # Name descending, id ascending within a name (sort is stable under reverse=True).
+        by_id = sorted(items, key=lambda i: i.id)
+        assert seen == [i.id for i in sorted(by_id, key=lambda i: i.name, reverse=True)]
+
+        repo = ItemRepository(session)
+        pages, cursor = [], None
+        while True:
+            page, cursor = await repo.list_page(cursor=cursor, limit=2)
+            pages.append(len(page))
+            if cursor is None:
+                break
+        assert pages == [2, 2, 1]
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import uuid
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.db import Base
+from app.models import Alert, Item, MovementType, OutboxEvent, ReorderRule, StoreLocation
+from app.services.outbox_service import add_outbox_events
+from app.services.reorder_evaluator import STOCK_CHANGED_TOPIC, reorder_evaluator
+from app.services.stock_service import post_stock_movement
+
+
+@pytest.fixture
+async def session_maker(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'reorder.db'}", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await reorder_evaluator.stop()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_background_evaluator_relays_outbox_events(session_maker):
+    async with session_maker() as session:
+        location = StoreLocation(code="EVAL", name="Evaluator store")
+        item = Item(item_code="EVAL1", sku="EVAL1", name="Nut", uom="ea")
+        session.add_all([location, item])
+        await session.flush()
+        session.add(
+            ReorderRule(
+                item_id=item.id,
+                location_id=location.id,
+                min_level=Decimal("5"),
+                max_level=Decimal("10"),
+                reorder_qty=Decimal("5"),
+            )
+        )
+        await session.commit()
+
+        reorder_evaluator.start(session_maker)
+        for _ in range(3):
+            await post_stock_movement(
+                session,
+                item_id=item.id,
+                location_id=location.id,
+                movement_type=MovementType.SALE,
+                qty_delta=Decimal("-1"),
+                ref_type="pos_sale",
+                ref_id=uuid.uuid4(),
+            )
+        # Nothing is evaluated on the posting path; each post committed one outbox event.
+        assert (await session.execute(select(Alert))).scalars().all() == []
+        assert len((await session.execute(select(OutboxEvent))).scalars().all()) == 3
+
+    await reorder_evaluator.stop()
+
+    async with session_maker() as session:
+        alerts = (await session.execute(select(Alert))).scalars().all()
+        assert (await session.execute(select(OutboxEvent))).scalars().all() == []
+    assert {a.type.value for a in alerts} == {"LOW_STOCK", "NEGATIVE_STOCK"}
+    assert len(alerts) == 2
+
+
+@pytest.mark.asyncio
+async def test_evaluator_drains_events_left_before_a_restart(session_maker):
+    async with session_maker() as session:
+        location = StoreLocation(code="CRASH", name="Crashed store")
+        item = Item(item_code="CRASH1", sku="CRASH1", name="Bolt", uom="ea")
+        session.add_all([location, item])
+        await session.flush()
+        session.add(
+            ReorderRule(
+                item_id=item.id,
+                location_id=location.id,
+                min_level=Decimal("5"),
+                max_level=Decimal("10"),
+                reorder_qty=Decimal("5"),
+            )
+        )
+        # Written by a process that committed the movement and died before relaying it.
+        await add_outbox_events(
+            session, STOCK_CHANGED_TOPIC, [{"pairs": [[str(item.id), str(location.id)]]}]
+        )
+        await session.commit()
+
+    reorder_evaluator.start(session_maker)
+    await reorder_evaluator.stop()
+
+    async with session_maker() as session:
+        alerts = (await session.execute(select(Alert))).scalars().all()
+        assert (await session.execute(select(OutboxEvent))).scalars().all() == []
+    assert [a.type.value for a in alerts] == ["LOW_STOCK"]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db import Base
+from app.models.entities import (
+    Alert,
+    AlertSeverity,
+    AlertStatus,
+    AlertType,
+    WebhookDelivery,
+    WebhookDeliveryStatus,
+    WebhookEndpoint,
+    alerts_archive,
+    webhook_deliveries_archive,
+)
+from app.services.retention_service import apply_retention, parse_policies
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_retention_archives_expired_rows_in_batches(session: AsyncSession):
+    now = datetime(2024, 6, 1, tzinfo=UTC)
+    old, recent = now - timedelta(days=40), now - timedelta(days=1)
+    endpoint = WebhookEndpoint(name="ep", url="https://ep.test", secret="s", events=["e"])
+    session.add(endpoint)
+    await session.flush()
+
+    def delivery(status, updated_at):
+        return WebhookDelivery(
+            endpoint_id=endpoint.id,
+            event_type="e",
+            payload={"at": updated_at.isoformat()},
+            status=status,
+            updated_at=updated_at,
+        )
+
+    def alert(status, updated_at):
+        return Alert(
+            type=AlertType.LOW_STOCK,
+            severity=AlertSeverity.WARNING,
+            message="low",
+            context={},
+            status=status,
+            updated_at=updated_at,
+        )
+
+    session.add_all(
+        [delivery(WebhookDeliveryStatus.SUCCESS, old) for _ in range(5)]
+        + [
+            delivery(WebhookDeliveryStatus.SUCCESS, recent),
+            delivery(WebhookDeliveryStatus.PENDING, old),
+            delivery(WebhookDeliveryStatus.FAILED, old),
+            alert(AlertStatus.DONE, old),
+            alert(AlertStatus.OPEN, old),
+        ]
+    )
+    await session.commit()
+
+    policies = parse_policies({"webhook_deliveries:SUCCESS": 7, "alerts:DONE": 30})
+    results = await apply_retention(session, policies, archive=True, batch_size=2, now=now)
+
+    assert [(r.table, r.status, r.rows) for r in results] == [
+        ("webhook_deliveries", "SUCCESS", 5),
+        ("alerts", "DONE", 1),
+    ]
+    remaining = Counter(
+        (await session.execute(select(WebhookDelivery.status))).scalars().all()
+    )
+    assert remaining == {
+        WebhookDeliveryStatus.SUCCESS: 1,
+        WebhookDeliveryStatus.PENDING: 1,
+        WebhookDeliveryStatus.FAILED: 1,
+    }
+    assert (await session.execute(select(Alert.status))).scalars().all() == [AlertStatus.OPEN]
+    archived = (await session.execute(select(webhook_deliveries_archive.c.status))).all()
+    assert len(archived) == 5
+    assert len((await session.execute(select(alerts_archive.c.id))).all()) == 1
+
+
+def test_live_statuses_cannot_be_purged():
+    with pytest.raises(ValueError):
+        parse_policies({"webhook_deliveries:PENDING": 1})
+    with pytest.raises(ValueError):
+        # ACK alerts are unresolved: de-duplication still counts occurrences on them.
+        parse_policies({"alerts:ACK": 30})
+    with pytest.raises(ValueError):
+        parse_policies({"stock_movements:SALE": 1})
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import uuid
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db import Base
+from app.models import (
+    DetachedStockPartition,
+    Item,
+    MovementType,
+    StockMovement,
+    StockSnapshot,
+    StoreLocation,
+)
+from app.services.snapshot_service import (
+    get_balances_as_of,
+    ledger_horizon,
+    write_due_snapshots,
+    write_snapshot,
+)
+
+
+@pytest.fixture(scope="module")
+async def async_engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def session(async_engine):
+    session_maker = async_sessionmaker(async_engine, expire_on_commit=False)
+    async with session_maker() as session:
+        yield session
+        await session.rollback()
+
+
+def _at(month: int, day: int) -> datetime:
+    return datetime(2026, month, day, 12, tzinfo=UTC)
+
+
+@pytest.mark.asyncio
+async def test_as_of_combines_snapshot_with_later_movements(session: AsyncSession):
+    location = StoreLocation(code="SNAP", name="Snapshot store")
+    item = Item(item_code="SNAP1", sku="SNAP1", name="Bolt", uom="ea")
+    session.add_all([location, item])
+    await session.commit()
+
+    ledger = [(_at(1, 10), "10"), (_at(1, 20), "-3"), (_at(2, 5), "-2"), (_at(3, 2), "4")]
+    for created_at, qty in ledger:
+        session.add(
+            StockMovement(
+                item_id=item.id,
+                location_id=location.id,
+                ref_type="test",
+                ref_id=uuid.uuid4(),
+                movement_type=MovementType.PURCHASE_RECEIPT,
+                qty_delta=Decimal(qty),
+                created_at=created_at,
+            )
+        )
+    await session.commit()
+
+    written = await write_due_snapshots(session, now=_at(3, 15), period="month")
+    assert written == [
+        datetime(2026, 2, 1, tzinfo=UTC),
+        datetime(2026, 3, 1, tzinfo=UTC),
+    ]
+    closing = (
+        await session.execute(select(StockSnapshot.qty).order_by(StockSnapshot.period_end))
+    ).scalars().all()
+    assert closing == [Decimal("7"), Decimal("5")]
+
+    key = (item.id, location.id)
+    assert (await get_balances_as_of(session, _at(1, 15)))[key] == Decimal("10")
+    assert (await get_balances_as_of(session, _at(2, 10)))[key] == Decimal("5")
+    assert (await get_balances_as_of(session, _at(3, 10), item_id=item.id))[key] == Decimal("9")
+
+
+@pytest.mark.asyncio
+async def test_as_of_before_detached_partitions_is_rejected(session: AsyncSession):
+    location = StoreLocation(code="ARCH", name="Archived store")
+    item = Item(item_code="ARCH1", sku="ARCH1", name="Nut", uom="ea")
+    session.add_all([location, item])
+    await session.commit()
+    ledger = [(datetime(2025, 1, 10, tzinfo=UTC), "6"), (datetime(2025, 3, 3, tzinfo=UTC), "-1")]
+    for created_at, qty in ledger:
+        session.add(
+            StockMovement(
+                item_id=item.id,
+                location_id=location.id,
+                ref_type="test",
+                ref_id=uuid.uuid4(),
+                movement_type=MovementType.PURCHASE_RECEIPT,
+                qty_delta=Decimal(qty),
+                created_at=created_at,
+            )
+        )
+    await session.commit()
+    await write_snapshot(session, datetime(2025, 1, 1, tzinfo=UTC))
+    await write_snapshot(session, datetime(2025, 3, 1, tzinfo=UTC))
+
+    # January's partition is detached: its movements are gone from the ledger.
+    await session.execute(
+        delete(StockMovement).where(StockMovement.created_at < datetime(2025, 2, 1, tzinfo=UTC))
+    )
+    session.add(
+        DetachedStockPartition(
+            name="stock_movements_p202501",
+            range_start=datetime(2025, 1, 1, tzinfo=UTC),
+            range_end=datetime(2025, 2, 1, tzinfo=UTC),
+        )
+    )
+    await session.commit()
+
+    # The March snapshot is the first one that does not need the detached month.
+    assert await ledger_horizon(session) == datetime(2025, 3, 1, tzinfo=UTC)
+    with pytest.raises(ValueError):
+        await get_balances_as_of(session, datetime(2025, 2, 10, tzinfo=UTC))
+    with pytest.raises(ValueError):
+        await write_snapshot(session, datetime(2025, 2, 1, tzinfo=UTC))
+    balances = await get_balances_as_of(session, datetime(2025, 3, 10, tzinfo=UTC), item_id=item.id)
+    assert balances[(item.id, location.id)] == Decimal("5")
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import uuid
 from decimal import Decimal
 
 import pytest
@@ -8,20 +9,28 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 
 from app.core.db import Base
 from app.models import (
+    Alert,
     Customer,
     GoodsReceipt,
     GoodsReceiptLine,
     GoodsReceiptStatus,
     Item,
     MovementType,
+    ReorderRule,
     SalesInvoice,
     SalesInvoiceLine,
     StoreLocation,
     Supplier,
+    StockBalance,
     StockMovement,
 )
+from app.models.entities import AlertStatus, AlertType, WebhookDelivery, WebhookEndpoint
+from app.services.alert_service import resolve_alert
 from app.services.purchase_service import post_goods_receipt
+from app.services.reorder_service import sweep_reorder_rules
 from app.services.sales_service import post_sales_invoice, post_sales_return
+from app.core.config import settings
+from app.services.stock_service import InsufficientStockError, post_stock_movement_once
 
 
 @pytest.fixture(scope="module")
@@ -41,6 +50,11 @@ async def session(async_engine):
         await session.rollback()
 
 
+async def _balance(session: AsyncSession, item_id, location_id) -> Decimal:
+    balance = await session.get(StockBalance, {"item_id": item_id, "location_id": location_id})
+    return Decimal(balance.qty) if balance else Decimal(0)
+
+
 async def _count_movements(session: AsyncSession) -> int:
     result = await session.execute(select(StockMovement))
     return len(result.scalars().all())
@@ -75,6 +89,7 @@ async def test_grn_sale_return_lifecycle(session: AsyncSession):
     grn = await post_goods_receipt(session, grn.id)
     assert grn.status == GoodsReceiptStatus.POSTED
     assert await _count_movements(session) == 1
+    assert await _balance(session, item.id, location.id) == Decimal("10")
 
     # Create sales invoice
     invoice = SalesInvoice(
@@ -101,11 +116,13 @@ async def test_grn_sale_return_lifecycle(session: AsyncSession):
 
     invoice = await post_sales_invoice(session, invoice.id)
     assert await _count_movements(session) == 2
+    assert await _balance(session, item.id, location.id) == Decimal("8")
 
     # Post return (idempotent)
     await post_sales_return(session, invoice.id)
     await post_sales_return(session, invoice.id)
     assert await _count_movements(session) == 3
+    assert await _balance(session, item.id, location.id) == Decimal("10")
 
     result = await session.execute(
         select(StockMovement).where(StockMovement.movement_type == MovementType.SALE_RETURN)
@@ -113,3 +130,309 @@ async def test_grn_sale_return_lifecycle(session: AsyncSession):
     sale_return = result.scalar_one()
     assert sale_return.qty_delta == Decimal("2")
 
+
+
+@pytest.mark.asyncio
+async def test_batched_document_posting_merges_lines_and_checks_rules(session: AsyncSession):
+    location = StoreLocation(code="LOC2", name="Branch")
+    customer = Customer(customer_code="CUST2", name="Bob")
+    supplier = Supplier(supplier_code="SUP2", name="Globex")
+    item = Item(item_code="ITM2", sku="SKU2", name="Gadget", uom="ea")
+    other = Item(item_code="ITM3", sku="SKU3", name="Gizmo", uom="ea")
+    session.add_all([location, customer, supplier, item, other])
+    await session.commit()
+
+    session.add(
+        ReorderRule(
+            item_id=item.id,
+            location_id=location.id,
+            min_level=Decimal("5"),
+            max_level=Decimal("20"),
+            reorder_qty=Decimal("10"),
+        )
+    )
+    grn = GoodsReceipt(grn_no="GRN-2", supplier_id=supplier.id, location_id=location.id)
+    grn.lines.extend(
+        [
+            GoodsReceiptLine(
+                item_id=item.id, qty=Decimal("4"), unit_cost=Decimal("2"), line_total=Decimal("8")
+            ),
+            GoodsReceiptLine(
+                item_id=item.id, qty=Decimal("2"), unit_cost=Decimal("5"), line_total=Decimal("10")
+            ),
+            GoodsReceiptLine(
+                item_id=other.id, qty=Decimal("1"), unit_cost=Decimal("1"), line_total=Decimal("1")
+            ),
+        ]
+    )
+    session.add(grn)
+    await session.commit()
+
+    await post_goods_receipt(session, grn.id)
+    movements = (
+        await session.execute(select(StockMovement).where(StockMovement.ref_id == grn.id))
+    ).scalars().all()
+    assert len(movements) == 2
+    merged = next(m for m in movements if m.item_id == item.id)
+    assert merged.qty_delta == Decimal("6")
+    assert merged.unit_cost == Decimal("3")
+    assert await _balance(session, item.id, location.id) == Decimal("6")
+
+    invoice = SalesInvoice(invoice_no="INV-2", customer_id=customer.id, location_id=location.id)
+    invoice.lines.append(
+        SalesInvoiceLine(
+            item_id=item.id,
+            qty=Decimal("3"),
+            unit_price=Decimal("8"),
+            line_total=Decimal("24"),
+        )
+    )
+    session.add(invoice)
+    await session.commit()
+    await post_sales_invoice(session, invoice.id)
+
+    assert await _balance(session, item.id, location.id) == Decimal("3")
+    alerts = (
+        await session.execute(
+            select(Alert).where(Alert.item_id == item.id, Alert.type == AlertType.LOW_STOCK)
+        )
+    ).scalars().all()
+    assert len(alerts) == 1
+    assert alerts[0].context["available"] == "3.000"
+
+
+@pytest.mark.asyncio
+async def test_single_post_reports_whether_movement_was_new(session: AsyncSession):
+    location = StoreLocation(code="LOC3", name="Kiosk")
+    item = Item(item_code="ITM4", sku="SKU4", name="Doohickey", uom="ea")
+    session.add_all([location, item])
+    await session.commit()
+
+    kwargs = dict(
+        item_id=item.id,
+        location_id=location.id,
+        movement_type=MovementType.SALE,
+        qty_delta=Decimal("-1"),
+        ref_type="pos_sale",
+        ref_id=uuid.uuid4(),
+    )
+    first = await post_stock_movement_once(session, **kwargs)
+    retry = await post_stock_movement_once(session, **kwargs)
+
+    assert first.created is True
+    assert retry.created is False
+    assert retry.movement.id == first.movement.id
+    assert await _balance(session, item.id, location.id) == Decimal("-1")
+
+
+@pytest.mark.asyncio
+async def test_sweep_evaluates_every_active_rule(session: AsyncSession):
+    location = StoreLocation(code="LOC4", name="Depot")
+    idle = Item(item_code="ITM5", sku="SKU5", name="Washer", uom="ea")
+    paused = Item(item_code="ITM6", sku="SKU6", name="Bolt", uom="ea")
+    session.add_all([location, idle, paused])
+    await session.flush()
+    session.add_all(
+        [
+            ReorderRule(
+                item_id=idle.id,
+                location_id=location.id,
+                min_level=Decimal("5"),
+                max_level=Decimal("12"),
+                reorder_qty=Decimal("4"),
+            ),
+            ReorderRule(
+                item_id=paused.id,
+                location_id=location.id,
+                min_level=Decimal("5"),
+                max_level=Decimal("12"),
+                reorder_qty=Decimal("4"),
+                active=False,
+            ),
+            WebhookEndpoint(
+                name="buyer",
+                url="https://example.test/hook",
+                secret="s",
+                events=["purchase.suggested"],
+            ),
+        ]
+    )
+    await session.commit()
+
+    counts = await sweep_reorder_rules(session)
+
+    # The rule fires without any movement on the SKU; inactive rules are skipped.
+    assert counts["low_stock"] >= 1 and counts["purchase_suggested"] >= 1
+    alerts = (
+        await session.execute(select(Alert).where(Alert.location_id == location.id))
+    ).scalars().all()
+    assert [(a.type, a.item_id) for a in alerts] == [(AlertType.LOW_STOCK, idle.id)]
+    deliveries = (await session.execute(select(WebhookDelivery))).scalars().all()
+    suggested = [d.payload for d in deliveries if d.payload["location_id"] == str(location.id)]
+    assert [(p["item_id"], p["suggested_qty"]) for p in suggested] == [(str(idle.id), "12.000")]
+
+    # A second sweep finds nothing new: the alert is still open and the shortfall announced.
+    counts = await sweep_reorder_rules(session)
+    assert (counts["low_stock"], counts["purchase_suggested"]) == (0, 0)
+    assert len((await session.execute(select(WebhookDelivery))).scalars().all()) == len(deliveries)
+    await session.refresh(alerts[0])
+    assert alerts[0].occurrences == 1
+
+    # Once stock is back at max_level and drops again, the shortfall is suggested again.
+    balance = StockBalance(item_id=idle.id, location_id=location.id, qty=Decimal("12"))
+    session.add(balance)
+    await session.commit()
+    await sweep_reorder_rules(session)
+    balance.qty = Decimal("10")
+    await session.commit()
+    counts = await sweep_reorder_rules(session)
+    assert counts["purchase_suggested"] == 1
+    deliveries = (await session.execute(select(WebhookDelivery))).scalars().all()
+    suggested = [d.payload for d in deliveries if d.payload["location_id"] == str(location.id)]
+    assert [p["suggested_qty"] for p in suggested] == ["12.000", "4.000"]
+
+
+@pytest.mark.asyncio
+async def test_strict_mode_rejects_oversell_atomically(session: AsyncSession, monkeypatch):
+    monkeypatch.setattr(settings, "stock_strict_mode", True)
+    location = StoreLocation(code="LOC5", name="Till")
+    customer = Customer(customer_code="CUST5", name="Cara")
+    plenty = Item(item_code="ITM7", sku="SKU7", name="Cable", uom="ea")
+    scarce = Item(item_code="ITM8", sku="SKU8", name="Charger", uom="ea")
+    session.add_all([location, customer, plenty, scarce])
+    await session.commit()
+    for item, qty in ((plenty, "10"), (scarce, "1")):
+        await post_stock_movement_once(
+            session,
+            item_id=item.id,
+            location_id=location.id,
+            movement_type=MovementType.PURCHASE_RECEIPT,
+            qty_delta=Decimal(qty),
+            ref_type="opening",
+            ref_id=uuid.uuid4(),
+        )
+
+    invoice = SalesInvoice(invoice_no="INV-5", customer_id=customer.id, location_id=location.id)
+    invoice.lines.extend(
+        [
+            SalesInvoiceLine(
+                item_id=item.id, qty=Decimal("2"), unit_price=Decimal("1"), line_total=Decimal("2")
+            )
+            for item in (plenty, scarce)
+        ]
+    )
+    session.add(invoice)
+    await session.commit()
+    location_id, plenty_id, scarce_id, invoice_id = location.id, plenty.id, scarce.id, invoice.id
+
+    with pytest.raises(InsufficientStockError) as excinfo:
+        await post_sales_invoice(session, invoice_id)
+    await session.rollback()
+
+    assert excinfo.value.shortages == {(scarce_id, location_id): Decimal("1")}
+    # Neither line was posted: the whole document stays untouched.
+    assert await _balance(session, plenty_id, location_id) == Decimal("10")
+    assert await _balance(session, scarce_id, location_id) == Decimal("1")
+    posted = await session.execute(select(StockMovement).where(StockMovement.ref_id == invoice_id))
+    assert posted.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_repeated_alerts_bump_one_open_row(session: AsyncSession):
+    location = StoreLocation(code="LOC6", name="Counter")
+    item = Item(item_code="ITM9", sku="SKU9", name="Fuse", uom="ea")
+    session.add_all([location, item])
+    await session.flush()
+    session.add(
+        ReorderRule(
+            item_id=item.id,
+            location_id=location.id,
+            min_level=Decimal("5"),
+            max_level=Decimal("10"),
+            reorder_qty=Decimal("5"),
+        )
+    )
+    await session.commit()
+
+    async def sell():
+        await post_stock_movement_once(
+            session,
+            item_id=item.id,
+            location_id=location.id,
+            movement_type=MovementType.SALE,
+            qty_delta=Decimal("-1"),
+            ref_type="pos_sale",
+            ref_id=uuid.uuid4(),
+        )
+
+    async def alerts():
+        result = await session.execute(
+            select(Alert.type, Alert.status, Alert.occurrences)
+            .where(Alert.location_id == location.id)
+            .order_by(Alert.type, Alert.status)
+        )
+        return result.all()
+
+    for _ in range(3):
+        await sell()
+    assert await alerts() == [
+        (AlertType.LOW_STOCK, AlertStatus.OPEN, 3),
+        (AlertType.NEGATIVE_STOCK, AlertStatus.OPEN, 3),
+    ]
+
+    # Once resolved, the next occurrence opens a fresh alert.
+    low = await session.scalar(
+        select(Alert.id).where(Alert.location_id == location.id, Alert.type == AlertType.LOW_STOCK)
+    )
+    await resolve_alert(session, low)
+    await sell()
+    assert await alerts() == [
+        (AlertType.LOW_STOCK, AlertStatus.DONE, 3),
+        (AlertType.LOW_STOCK, AlertStatus.OPEN, 1),
+        (AlertType.NEGATIVE_STOCK, AlertStatus.OPEN, 4),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_alerts_resolve_when_stock_recovers(session: AsyncSession):
+    location = StoreLocation(code="LOC7", name="Annex")
+    item = Item(item_code="ITM10", sku="SKU10", name="Relay", uom="ea")
+    session.add_all([location, item])
+    await session.flush()
+    session.add(
+        ReorderRule(
+            item_id=item.id,
+            location_id=location.id,
+            min_level=Decimal("5"),
+            max_level=Decimal("10"),
+            reorder_qty=Decimal("5"),
+        )
+    )
+    await session.commit()
+
+    async def move(movement_type, qty):
+        await post_stock_movement_once(
+            session,
+            item_id=item.id,
+            location_id=location.id,
+            movement_type=movement_type,
+            qty_delta=Decimal(qty),
+            ref_type="test",
+            ref_id=uuid.uuid4(),
+        )
+
+    async def open_alerts():
+        result = await session.execute(
+            select(Alert.type).where(
+                Alert.location_id == location.id, Alert.status != AlertStatus.DONE
+            )
+        )
+        return set(result.scalars())
+
+    await move(MovementType.SALE, "-2")
+    assert await open_alerts() == {AlertType.LOW_STOCK, AlertType.NEGATIVE_STOCK}
+    # Back to 1: no longer negative, still low.
+    await move(MovementType.PURCHASE_RECEIPT, "3")
+    assert await open_alerts() == {AlertType.LOW_STOCK}
+    await move(MovementType.PURCHASE_RECEIPT, "10")
+    assert await open_alerts() == set()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import uuid
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.core.db import Base
+from app.models import (
+    CostLayer,
+    DetachedStockPartition,
+    Item,
+    MovementType,
+    StockBalance,
+    StockMovement,
+    StockSnapshot,
+    StoreLocation,
+)
+from app.services.snapshot_service import write_snapshot
+from app.services.stock_service import post_stock_movement
+from app.services.valuation_service import (
+    CostState,
+    get_valuation,
+    rebuild_valuation,
+    value_snapshot,
+)
+
+NOW = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+def test_average_and_fifo_cost_issues_differently():
+    average, fifo = CostState("average"), CostState("fifo")
+    for state in (average, fifo):
+        state.apply(10, Decimal("2"), NOW)
+        state.apply(10, Decimal("4"), NOW)
+    assert average.apply(-15, None, NOW) == Decimal("-45.0000")
+    assert fifo.apply(-15, None, NOW) == Decimal("-40.0000")
+    assert (average.qty, average.value) == (Decimal(5), Decimal("15.0000"))
+    assert (fifo.qty, fifo.value) == (Decimal(5), Decimal("20.0000"))
+
+
+def test_negative_stock_carries_no_value():
+    state = CostState("fifo")
+    state.apply(2, Decimal("3"), NOW)
+    state.apply(-5, None, NOW)
+    assert (state.qty, state.value, state.layers) == (Decimal(-3), Decimal(0), [])
+    # The receipt first covers the shortfall; only the remaining unit is layered.
+    state.apply(4, Decimal("5"), NOW)
+    assert [(layer.qty, layer.unit_cost) for layer in state.layers] == [(Decimal(1), Decimal(5))]
+    assert state.value == Decimal("5.0000")
+
+
+async def _post(session: AsyncSession, item, location, qty, unit_cost=None):
+    await post_stock_movement(
+        session,
+        item_id=item.id,
+        location_id=location.id,
+        movement_type=MovementType.PURCHASE_RECEIPT if qty > 0 else MovementType.SALE,
+        qty_delta=Decimal(qty),
+        unit_cost=unit_cost,
+        ref_type="test",
+        ref_id=uuid.uuid4(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_fifo_valuation_is_incremental_and_rebuildable(session: AsyncSession, monkeypatch):
+    monkeypatch.setattr(settings, "stock_valuation_method", "fifo")
+    location = StoreLocation(code="VAL", name="Valued")
+    item = Item(item_code="VAL1", sku="VAL1", name="Bracket", uom="ea")
+    session.add_all([location, item])
+    await session.commit()
+
+    await _post(session, item, location, 10, Decimal("2"))
+    await _post(session, item, location, 10, Decimal("4"))
+    await _post(session, item, location, -15)
+
+    balance = await session.get(StockBalance, {"item_id": item.id, "location_id": location.id})
+    assert balance.value == Decimal("20")
+    layers = (await session.execute(select(CostLayer))).scalars().all()
+    remaining = [(layer.qty_remaining, layer.unit_cost) for layer in layers]
+    assert remaining == [(Decimal(5), Decimal(4))]
+
+    await rebuild_valuation(session, "average")
+    await session.refresh(balance)
+    assert balance.value == Decimal("15")
+    assert (await session.execute(select(CostLayer))).scalars().all() == []
+
+    valuation = await get_valuation(session)
+    assert [(g["name"], g["value"]) for g in valuation["by_location"]] == [
+        ("Valued", Decimal("15"))
+    ]
+    assert [(g["id"], g["value"]) for g in valuation["by_category"]] == [(None, Decimal("15"))]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_starts_from_valued_snapshot_after_detach(
+    session: AsyncSession, monkeypatch
+):
+    monkeypatch.setattr(settings, "stock_valuation_method", "fifo")
+    location = StoreLocation(code="ARC", name="Archive")
+    item = Item(item_code="ARC1", sku="ARC1", name="Hinge", uom="ea")
+    session.add_all([location, item])
+    await session.commit()
+
+    for day, (qty, unit_cost) in enumerate([(10, Decimal("2")), (10, Decimal("4")), (-15, None)]):
+        await _post(session, item, location, qty, unit_cost)
+        await session.execute(
+            update(StockMovement)
+            .where(StockMovement.created_at > datetime(2024, 2, 1, tzinfo=UTC))
+            .values(created_at=datetime(2024, 1, 10 + day, tzinfo=UTC))
+        )
+    horizon = datetime(2024, 2, 1, tzinfo=UTC)
+    await write_snapshot(session, horizon)
+    assert await value_snapshot(session, horizon) == 1
+    assert (await session.execute(select(StockSnapshot.value))).scalar_one() == Decimal("20")
+
+    # January is detached; only the snapshot remembers it.
+    await session.execute(delete(StockMovement).where(StockMovement.created_at < horizon))
+    session.add(
+        DetachedStockPartition(
+            name="stock_movements_p202401",
+            range_start=datetime(2024, 1, 1, tzinfo=UTC),
+            range_end=horizon,
+        )
+    )
+    await session.commit()
+    await _post(session, item, location, 5, Decimal("6"))
+    await _post(session, item, location, -8)
+
+    balance = await session.get(StockBalance, {"item_id": item.id, "location_id": location.id})
+    assert balance.value == Decimal("12")
+    await rebuild_valuation(session, "fifo")
+    await session.refresh(balance)
+    assert balance.value == Decimal("12")
+    layers = (await session.execute(select(CostLayer))).scalars().all()
+    assert [(layer.qty_remaining, layer.unit_cost) for layer in layers] == [
+        (Decimal(2), Decimal(6))
+    ]
@@ -0,0 +1,476 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+from collections import Counter
+from datetime import UTC, datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app.core.db import Base
+from app.models.entities import WebhookDelivery, WebhookDeliveryStatus, WebhookEndpoint
+from app.services.webhook_service import (
+    WebhookDispatcher,
+    _signature,
+    enqueue_events,
+    webhook_subscriptions,
+)
+
+# Set to a scratch PostgreSQL database to run the tests that need SKIP LOCKED and LATERAL.
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_sends_concurrently_within_endpoint_limits(session: AsyncSession):
+    in_flight: Counter = Counter()
+    peak: Counter = Counter()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        await asyncio.sleep(0.05)
+        in_flight[host] -= 1
+        return httpx.Response(500 if host == "down.test" else 204)
+
+    session.add_all(
+        [
+            WebhookEndpoint(name="ok", url="https://ok.test/hook", secret="a", events=["e"]),
+            WebhookEndpoint(name="down", url="https://down.test/hook", secret="b", events=["e"]),
+        ]
+    )
+    await session.flush()
+    await enqueue_events(session, [("e", {"n": n}) for n in range(6)])
+    await session.commit()
+
+    dispatcher = WebhookDispatcher(
+        batch_size=50,
+        concurrency=10,
+        per_endpoint=2,
+        timeout=5,
+        transport=httpx.MockTransport(handler),
+    )
+    try:
+        sent = await dispatcher.deliver_pending(session)
+    finally:
+        await dispatcher.aclose()
+
+    assert sent == 12
+    assert peak == {"ok.test": 2, "down.test": 2}
+    deliveries = (
+        await session.execute(
+            select(WebhookDelivery).options(selectinload(WebhookDelivery.endpoint))
+        )
+    ).scalars().all()
+    outcomes = Counter((d.endpoint.name, d.status, d.attempts) for d in deliveries)
+    assert outcomes == {
+        ("ok", WebhookDeliveryStatus.SUCCESS, 0): 6,
+        ("down", WebhookDeliveryStatus.PENDING, 1): 6,
+    }
+    assert all(d.next_retry_at for d in deliveries if d.endpoint.name == "down")
+
+
+@pytest.mark.asyncio
+async def test_slow_endpoint_does_not_hold_up_other_endpoints(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    release = asyncio.Event()
+    fast_sent = asyncio.Event()
+    sent: Counter = Counter()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        sent[request.url.host] += 1
+        if request.url.host == "slow.test":
+            await release.wait()
+        elif sent["fast.test"] == 2:
+            fast_sent.set()
+        return httpx.Response(204)
+
+    dispatcher = WebhookDispatcher(
+        batch_size=10,
+        concurrency=2,
+        per_endpoint=1,
+        timeout=5,
+        transport=httpx.MockTransport(handler),
+    )
+    try:
+        async with session_maker() as session:
+            session.add_all(
+                [
+                    WebhookEndpoint(name="slow", url="https://slow.test", secret="a", events=["s"]),
+                    WebhookEndpoint(name="fast", url="https://fast.test", secret="b", events=["f"]),
+                ]
+            )
+            await session.flush()
+            # The slow endpoint's deliveries are older, so its requests are started first.
+            await enqueue_events(session, [("s", {"n": n}) for n in range(4)])
+            await session.commit()
+            await enqueue_events(session, [("f", {"n": n}) for n in range(2)])
+            await session.commit()
+            worker = asyncio.create_task(dispatcher.deliver_pending(session))
+            await asyncio.wait_for(fast_sent.wait(), timeout=2)
+
+            # The fast endpoint's outcomes are committed while the slow one is still busy.
+            async with session_maker() as other:
+                for _ in range(100):
+                    statuses = Counter(
+                        (
+                            await other.execute(
+                                select(WebhookDelivery.event_type, WebhookDelivery.status)
+                            )
+                        ).all()
+                    )
+                    if statuses[("f", WebhookDeliveryStatus.SUCCESS)] == 2:
+                        break
+                    await asyncio.sleep(0.01)
+            assert statuses[("f", WebhookDeliveryStatus.SUCCESS)] == 2
+            assert statuses[("s", WebhookDeliveryStatus.PENDING)] == 4
+            release.set()
+            assert await worker == 6
+    finally:
+        await dispatcher.aclose()
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_workers_claim_disjoint_batches_and_reclaim_expired_leases(session: AsyncSession):
+    session.add(WebhookEndpoint(name="ok", url="https://ok.test/hook", secret="a", events=["e"]))
+    await session.flush()
+    await enqueue_events(session, [("e", {"n": n}) for n in range(5)])
+    await session.commit()
+
+    options = dict(batch_size=3, concurrency=4, per_endpoint=2, timeout=5)
+    first, second = WebhookDispatcher(**options), WebhookDispatcher(**options)
+    claimed_first = await first.claim(session)
+    claimed_second = await second.claim(session)
+
+    assert len(claimed_first) == 3 and len(claimed_second) == 2
+    assert not {d.id for d in claimed_first} & {d.id for d in claimed_second}
+    assert await second.claim(session) == []
+
+    # The first worker "crashes": once its lease lapses the rows are claimable again.
+    expired = datetime.now(UTC) - timedelta(seconds=1)
+    await session.execute(
+        update(WebhookDelivery)
+        .where(WebhookDelivery.locked_by == first.worker_id)
+        .values(locked_until=expired)
+    )
+    await session.commit()
+    reclaimed = await second.claim(session)
+    assert {d.id for d in reclaimed} == {d.id for d in claimed_first}
+    assert {d.locked_by for d in reclaimed} == {second.worker_id}
+
+
+@pytest.mark.asyncio
+async def test_worker_wakes_on_notify_instead_of_waiting_for_the_poll(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'wake.db'}", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    delivered = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        delivered.set()
+        return httpx.Response(204)
+
+    dispatcher = WebhookDispatcher(
+        batch_size=10,
+        concurrency=2,
+        per_endpoint=1,
+        timeout=5,
+        transport=httpx.MockTransport(handler),
+    )
+    worker = asyncio.create_task(dispatcher.run(session_maker, interval=60))
+    try:
+        await asyncio.sleep(0.1)  # first, empty poll
+        async with session_maker() as session:
+            session.add(WebhookEndpoint(name="ok", url="https://ok.test", secret="a", events=["e"]))
+            await session.flush()
+            await enqueue_events(session, [("e", {})])
+            await session.commit()
+        # SQLite has no NOTIFY; wake() is what the asyncpg listener calls on PostgreSQL.
+        dispatcher.wake()
+        await asyncio.wait_for(delivered.wait(), timeout=2)
+    finally:
+        worker.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await worker
+        await dispatcher.aclose()
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_fair_claims_circuit_breaker_and_dead_letter(session: AsyncSession):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503 if request.url.host == "down.test" else 204)
+
+    down = WebhookEndpoint(name="down", url="https://down.test", secret="a", events=["d"])
+    ok = WebhookEndpoint(name="ok", url="https://ok.test", secret="b", events=["o"])
+    session.add_all([down, ok])
+    await session.flush()
+    await enqueue_events(session, [("d", {"n": n}) for n in range(6)])
+    await enqueue_events(session, [("o", {"n": n}) for n in range(2)])
+    await session.commit()
+    down_id = down.id
+
+    dispatcher = WebhookDispatcher(
+        batch_size=4,
+        concurrency=4,
+        per_endpoint=4,
+        timeout=5,
+        max_attempts=2,
+        breaker_threshold=2,
+        transport=httpx.MockTransport(handler),
+    )
+    try:
+        # The older backlog on "down" does not crowd "ok" out of the batch.
+        claimed = await dispatcher.claim(session)
+        assert Counter(d.endpoint.name for d in claimed) == {"down": 2, "ok": 2}
+        requests = [[d] for d in claimed]
+        errors = await asyncio.gather(*(dispatcher._send(r) for r in requests))
+        await dispatcher._record(session, requests, list(errors))
+
+        await session.refresh(down)
+        assert down.consecutive_failures == 2 and down.circuit_open_until is not None
+        # Open circuit: nothing is claimed for the failing endpoint, even once retries are due.
+        await session.execute(update(WebhookDelivery).values(next_retry_at=None))
+        await session.commit()
+        assert await dispatcher.claim(session) == []
+
+        # Cooldown over: the half-open circuit lets exactly one probe through.
+        past = datetime.now(UTC) - timedelta(seconds=1)
+        await session.execute(
+            update(WebhookEndpoint)
+            .where(WebhookEndpoint.id == down_id)
+            .values(circuit_open_until=past)
+        )
+        await session.commit()
+        assert await dispatcher.deliver_pending(session) == 1
+    finally:
+        await dispatcher.aclose()
+
+    statuses = Counter(
+        (status, next_retry is None)
+        for status, next_retry in await session.execute(
+            select(WebhookDelivery.status, WebhookDelivery.next_retry_at).where(
+                WebhookDelivery.endpoint_id == down_id
+            )
+        )
+    )
+    # The probe was on its second attempt, so it is dead-lettered without a retry time.
+    assert statuses[(WebhookDeliveryStatus.FAILED, True)] == 1
+    assert statuses[(WebhookDeliveryStatus.PENDING, True)] == 5
+
+
+@pytest.mark.asyncio
+async def test_batching_endpoint_receives_signed_arrays(session: AsyncSession):
+    received: list[httpx.Request] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        received.append(request)
+        return httpx.Response(204)
+
+    batched = WebhookEndpoint(
+        name="bulk",
+        url="https://bulk.test",
+        secret="s3",
+        events=["e"],
+        batch_max_events=4,
+        batch_max_wait_ms=60_000,
+    )
+    session.add(batched)
+    await session.flush()
+    await enqueue_events(session, [("e", {"n": n}) for n in range(3)])
+    await session.commit()
+
+    dispatcher = WebhookDispatcher(
+        batch_size=50,
+        concurrency=4,
+        per_endpoint=2,
+        timeout=5,
+        transport=httpx.MockTransport(handler),
+    )
+    try:
+        # Three events are a partial batch inside the wait window: held, lease released.
+        assert await dispatcher.deliver_pending(session) == 0
+        assert received == [] and 0 < dispatcher._flush_in <= 60
+        await enqueue_events(session, [("e", {"n": n}) for n in range(3, 10)])
+        await session.commit()
+        assert await dispatcher.deliver_pending(session) == 10
+    finally:
+        await dispatcher.aclose()
+
+    assert [len(json.loads(r.content)) for r in received] == [4, 4, 2]
+    for request in received:
+        assert request.headers["X-Event-Type"] == "batch"
+        assert request.headers["X-Batch-Size"] == str(len(json.loads(request.content)))
+        assert request.headers["X-Signature"] == _signature("s3", request.content)
+    sent = sorted(e["payload"]["n"] for r in received for e in json.loads(r.content))
+    assert sent == list(range(10))
+    statuses = (await session.execute(select(WebhookDelivery.status))).scalars().all()
+    assert set(statuses) == {WebhookDeliveryStatus.SUCCESS}
+
+
+@pytest.mark.asyncio
+async def test_enqueue_uses_cached_subscriptions_until_endpoints_change(session: AsyncSession):
+    endpoint_queries: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "webhook_endpoints" in statement:
+            endpoint_queries.append(statement)
+
+    event.listen(session.bind.sync_engine, "before_cursor_execute", record)
+    try:
+        session.add(WebhookEndpoint(name="a", url="https://a.test", secret="a", events=["e"]))
+        await session.commit()
+        webhook_subscriptions.invalidate()
+        await enqueue_events(session, [("e", {"n": 1})])
+        await enqueue_events(session, [("e", {"n": 2}), ("other", {})])
+        await session.commit()
+        assert len(endpoint_queries) == 1
+
+        # Committing an endpoint change drops the index; the next enqueue sees the new one.
+        session.add(WebhookEndpoint(name="b", url="https://b.test", secret="b", events=["e"]))
+        await session.commit()
+        await enqueue_events(session, [("e", {"n": 3})])
+        await session.commit()
+        assert len(endpoint_queries) == 2
+    finally:
+        event.remove(session.bind.sync_engine, "before_cursor_execute", record)
+
+    deliveries = (
+        await session.execute(
+            select(WebhookEndpoint.name, WebhookDelivery.payload).join(WebhookDelivery.endpoint)
+        )
+    ).all()
+    assert sorted((name, payload["n"]) for name, payload in deliveries) == [
+        ("a", 1),
+        ("a", 2),
+        ("a", 3),
+        ("b", 3),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_half_open_endpoint_has_one_probe_in_flight(session: AsyncSession):
+    endpoint = WebhookEndpoint(name="flaky", url="https://flaky.test", secret="a", events=["e"])
+    session.add(endpoint)
+    await session.flush()
+    await enqueue_events(session, [("e", {"n": n}) for n in range(3)])
+    past = datetime.now(UTC) - timedelta(seconds=1)
+    endpoint.consecutive_failures = 5
+    endpoint.circuit_open_until = past
+    await session.commit()
+
+    options = dict(batch_size=10, concurrency=2, per_endpoint=2, timeout=5)
+    first, second = WebhookDispatcher(**options), WebhookDispatcher(**options)
+    probe = await first.claim(session)
+    assert len(probe) == 1
+    # The probe is leased and still in flight: neither worker gets a second request out.
+    assert await second.claim(session) == []
+    assert await first.claim(session) == []
+
+    # The probe succeeds: the circuit closes and the rest of the backlog flows again.
+    await first._record(session, [probe], [None])
+    await session.refresh(endpoint)
+    assert endpoint.circuit_open_until is None and endpoint.circuit_probe_until is None
+    assert len(await second.claim(session)) == 2
+
+
+@pytest.mark.asyncio
+async def test_row_claimed_in_one_session_is_not_claimed_in_another(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'claim.db'}", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    options = dict(batch_size=10, concurrency=2, per_endpoint=2, timeout=5)
+    first, second = WebhookDispatcher(**options), WebhookDispatcher(**options)
+    try:
+        async with session_maker() as setup:
+            setup.add(WebhookEndpoint(name="ok", url="https://ok.test", secret="a", events=["e"]))
+            await setup.flush()
+            await enqueue_events(setup, [("e", {})])
+            await setup.commit()
+        async with session_maker() as session_a, session_maker() as session_b:
+            # The second session has read the row as due before the first claims it.
+            assert len((await session_b.execute(select(WebhookDelivery))).all()) == 1
+            assert len(await first.claim(session_a)) == 1
+            assert await second.claim(session_b) == []
+    finally:
+        await engine.dispose()
+
+
+def test_claim_lock_rechecks_due_and_endpoint_conditions():
+    now = datetime.now(UTC)
+    dispatcher = WebhookDispatcher(batch_size=5, concurrency=2, per_endpoint=2, timeout=5)
+    stmt = dispatcher._claim_statement("postgresql", now, 5, now)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "JOIN LATERAL" in sql
+    # PostgreSQL re-checks only the locking query's own WHERE against a row committed by
+    # another worker after the snapshot, so the checks must follow the ranked subquery.
+    locking = sql[sql.rindex("LIMIT") : sql.index("FOR UPDATE")]
+    for condition in (
+        "webhook_deliveries.status =",
+        "webhook_deliveries.next_retry_at <=",
+        "webhook_deliveries.locked_until <",
+        "webhook_endpoints.active IS true",
+        "webhook_endpoints.circuit_probe_until <",
+    ):
+        assert condition in locking
+    assert "FOR UPDATE OF webhook_deliveries SKIP LOCKED" in sql
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+async def test_concurrent_postgres_claimers_never_share_a_row():
+    engine = create_async_engine(POSTGRES_URL, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        async with session_maker() as setup:
+            setup.add_all(
+                WebhookEndpoint(name=f"ep{n}", url=f"https://ep{n}.test", secret="a", events=["e"])
+                for n in range(4)
+            )
+            await setup.flush()
+            await enqueue_events(setup, [("e", {"n": n}) for n in range(100)])
+            await setup.commit()
+
+        async def drain(dispatcher: WebhookDispatcher) -> list:
+            claimed = []
+            async with session_maker() as session:
+                while batch := await dispatcher.claim(session):
+                    claimed.extend(d.id for d in batch)
+            return claimed
+
+        options = dict(batch_size=7, concurrency=2, per_endpoint=2, timeout=5)
+        results = await asyncio.gather(
+            *(drain(WebhookDispatcher(**options)) for _ in range(6))
+        )
+        claimed = [delivery_id for ids in results for delivery_id in ids]
+        assert len(claimed) == len(set(claimed)) == 400
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()